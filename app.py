@@ -1,10 +1,8 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, request, jsonify, Response, stream_with_context
 import numpy as np
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import traceback
-import pandas as pd
 import io
 import base64
 import hashlib
@@ -12,6 +10,21 @@ from flask_jwt_extended import JWTManager, create_access_token, jwt_required, ge
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 import os
+import atexit
+import tracemalloc
+from functools import lru_cache
+from model_artifacts import load_forest
+from evaluation import EvaluationCache
+from scoring import FraudScorer, fill_features, ml_factor
+from merchant_rules import MerchantAnalyzer
+from card_validation import validate_card_number
+from history_store import HistoryStore, HistoryWriter
+from user_store import open_user_store, UserExistsError
+from warmup import ModelWarmup, synthetic_features
+from forest_engine import NATIVE_MIN_ROWS
+from metrics import Metrics
+from profiling import RequestProfiler
+from memory_diagnostics import SnapshotStore, SNAPSHOT_SCOPES, memory_status
 
 app = Flask(__name__)
 
@@ -24,68 +37,193 @@ jwt = JWTManager(app)
 CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
 CORS(app, origins=CORS_ORIGINS, supports_credentials=True)
 
-# Simple in-memory user storage (replace with database in production)
-USERS_FILE = 'users.json'
+# User storage
+USERS_FILE = os.environ.get('USERS_FILE', 'users.json')
+USERS_DB = os.environ.get('USERS_DB', 'users.db')
+
+# 'json' keeps users.json (cached, atomically rewritten under a file lock);
+# 'sqlite' stores users in USERS_DB and imports users.json on start
+user_store = open_user_store(os.environ.get('USER_STORE_BACKEND', 'json').lower(), USERS_FILE, USERS_DB)
+
+# Legacy JSON history, imported into the database on first start
 TRANSACTION_HISTORY_FILE = 'transaction_history.json'
+TRANSACTION_HISTORY_DB = os.environ.get('TRANSACTION_HISTORY_DB', 'transaction_history.db')
+
+history_store = HistoryStore(TRANSACTION_HISTORY_DB)
 
-def load_users():
-    """Load users from JSON file"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """Save users to JSON file"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
-
-def load_transaction_history():
-    """Load transaction history from JSON file"""
-    if os.path.exists(TRANSACTION_HISTORY_FILE):
-        with open(TRANSACTION_HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_transaction_history(history):
-    """Save transaction history to JSON file"""
-    with open(TRANSACTION_HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+# Transaction-history page size (default and maximum per request)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# History records read from the store per export chunk
+EXPORT_BATCH_SIZE = 1000
+history_store.migrate_json(TRANSACTION_HISTORY_FILE)
 
 def add_transaction_to_history(user_email, transaction_data):
     """Add a transaction to user's history"""
-    history = load_transaction_history()
-    if user_email not in history:
-        history[user_email] = []
-    
-    # Add timestamp and user info to transaction
-    transaction_with_metadata = {
+    return add_transactions_to_history(user_email, [transaction_data])[0]
+
+def add_transactions_to_history(user_email, transactions):
+    """Add several transactions to user's history in one group commit"""
+    # Add timestamp and user info to each transaction
+    records = [{
         **transaction_data,
         "analyzed_at": datetime.now().isoformat(),
         "user_email": user_email
-    }
-    
-    history[user_email].append(transaction_with_metadata)
-    
-    # Keep only last 1000 transactions per user
-    if len(history[user_email]) > 1000:
-        history[user_email] = history[user_email][-1000:]
+    } for transaction_data in transactions]
     
-    save_transaction_history(history)
-    return transaction_with_metadata
+    # The store keeps only the last 1000 transactions per user
+    history_writer.write([(user_email, record) for record in records])
+    return records
+
+# Load the trained model and scaler as a flat-array copy of the forest (see
+# forest_engine) with the scaler folded into its split thresholds. It takes raw
+# features and gives exactly the probabilities of model.predict_proba(scaler.transform(...))
+# without sklearn's per-call overhead. The arrays are memory-mapped from an artifact
+# built from the pickles on first start (see model_artifacts), so all workers on a
+# host share one copy.
+MODEL_ARTIFACT_DIR = os.environ.get('MODEL_ARTIFACT_DIR', 'model_artifacts')
+forest, model_artifact = load_forest('fraud_model.pkl', 'scaler.pkl', MODEL_ARTIFACT_DIR)
+
+# Metrics of this model measured offline on labeled data (python evaluation.py
+# creditcard.csv), stored under EVALUATION_DIR by model hash and reread when the
+# file changes. get() is None until the model has been evaluated.
+EVALUATION_DIR = os.environ.get('EVALUATION_DIR', 'model_evaluations')
+model_evaluations = EvaluationCache(EVALUATION_DIR, model_artifact)
+
+# Shared scoring core used by every endpoint
+scorer = FraudScorer(forest)
+
+# Inference backend. inline: score in the request thread. process: score matrices of
+# at least INFERENCE_MIN_ROWS rows on INFERENCE_WORKERS forked processes, so large
+# batches and CSV uploads use several cores and do not hold the GIL for other requests.
+# Created before any background thread starts, since it forks.
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'inline').lower()
+if INFERENCE_BACKEND == 'process':
+    scorer.enable_process_pool(
+        workers=int(os.environ.get('INFERENCE_WORKERS', os.cpu_count() or 1)),
+        min_rows=int(os.environ.get('INFERENCE_MIN_ROWS', 1024))
+    )
+    atexit.register(scorer.pool.shutdown)
+elif INFERENCE_BACKEND != 'inline':
+    raise ValueError(f"Unknown INFERENCE_BACKEND: {INFERENCE_BACKEND!r} (expected 'inline' or 'process')")
+
+# Optional micro-batching of concurrent single-transaction scoring. Only useful
+# when a worker serves requests on several threads (e.g. gunicorn --threads).
+if os.environ.get('SCORING_COALESCE', '').lower() in ('1', 'true', 'yes'):
+    scorer.enable_coalescing(
+        window_ms=float(os.environ.get('SCORING_COALESCE_WINDOW_MS', 2)),
+        max_batch=int(os.environ.get('SCORING_COALESCE_MAX_BATCH', 64)),
+        timeout_ms=float(os.environ.get('SCORING_COALESCE_TIMEOUT_MS', 1000))
+    )
+
+# History writes are group-committed. 'sync' commits before the response is sent;
+# 'async' commits from a background thread and can lose up to
+# HISTORY_FLUSH_MAX_RECORDS queued records if the worker dies. (Set up after the
+# inference pool, whose workers are forked before any background thread starts.)
+history_writer = HistoryWriter(
+    history_store,
+    durability=os.environ.get('HISTORY_DURABILITY', 'sync').lower(),
+    flush_interval_ms=float(os.environ.get('HISTORY_FLUSH_INTERVAL_MS', 100)),
+    max_pending=int(os.environ.get('HISTORY_FLUSH_MAX_RECORDS', 5000))
+)
+atexit.register(history_writer.close)
+
+# Per-endpoint and per-stage latency histograms and scoring counters, served in
+# Prometheus format by /api/metrics. With METRICS_DIR set, every worker process
+# writes its numbers there and /api/metrics reports the totals of all workers.
+# MEMORY_ACCOUNTING (on by default) adds per-request peak-RSS growth and, while
+# tracemalloc traces, Python heap peak histograms.
+metrics = Metrics(
+    directory=os.environ.get('METRICS_DIR') or None,
+    memory=os.environ.get('MEMORY_ACCOUNTING', 'true').lower() not in ('0', 'false', 'no')
+)
+metrics.init_app(app)
+
+# Users allowed to use the diagnostic features (comma-separated emails)
+ADMIN_EMAILS = [email.strip() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()]
+
+# Opt-in request profiling: X-Profile requests from PROFILE_TOKEN holders or
+# ADMIN_EMAILS users, and 1 in PROFILE_SAMPLE_RATE requests, are run under
+# cProfile and saved to PROFILE_DIR. When off, no request hooks are installed.
+profiler = None
+if os.environ.get('PROFILING', '').lower() in ('1', 'true', 'yes'):
+    profiler = RequestProfiler(
+        directory=os.environ.get('PROFILE_DIR', 'profiles'),
+        sample_rate=int(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+        token=os.environ.get('PROFILE_TOKEN'),
+        admin_emails=ADMIN_EMAILS
+    )
+    profiler.init_app(app)
+
+# tracemalloc snapshots for the admin memory endpoints, kept per worker process.
+# Tracing starts with the first snapshot, or at startup with TRACEMALLOC=true so
+# allocations made while loading are attributed too (tracing slows Python code).
+TRACEMALLOC_FRAMES = int(os.environ.get('TRACEMALLOC_FRAMES', 1))
+memory_snapshots = SnapshotStore(os.path.dirname(os.path.abspath(__file__)))
+if os.environ.get('TRACEMALLOC', '').lower() in ('1', 'true', 'yes') and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+def is_admin(email):
+    """Whether a user may use the diagnostic endpoints"""
+    return bool(email) and email.lower() in {admin.lower() for admin in ADMIN_EMAILS}
+
+# Model input columns in the order the model expects: [Time, V1, ..., V28, Amount]
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+# Rows per chunk when streaming CSV uploads
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', 10000))
+
+# Number of synthesized V-value sets kept in memory; gateway retries and
+# duplicate submissions of the same transaction are served from this cache
+V_VALUE_CACHE_SIZE = int(os.environ.get('V_VALUE_CACHE_SIZE', 4096))
+
+# Merchant whitelist and keyword automaton, built once at startup
+merchant_analyzer = MerchantAnalyzer()
 
-# Load the trained model and scaler
-model = joblib.load('fraud_model.pkl')
-scaler = joblib.load('scaler.pkl')
+# Keywords behind the batch endpoint's context factors
+BATCH_SUSPICIOUS_WORDS = frozenset(['unknown', 'test', 'suspicious'])
+BATCH_FOREIGN_WORDS = frozenset(['international', 'foreign'])
 
-def generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp):
+def generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp, merchant_features=None,
+                                       cached=True):
     """
     Generate V1-V28 values from transaction characteristics for ML model input.
     This creates more realistic features that better distinguish legitimate from fraudulent transactions.
+    The values are deterministic (the random adjustments are seeded from the transaction hash),
+    so the same transaction always gets the same features and repeated calls are served from a cache.
+    Callers that already analyzed the merchant pass merchant_features to avoid a second pass.
+    cached=False computes the values without reading or filling the cache (warm-up).
     """
+    if merchant_features is None:
+        merchant_features = merchant_analyzer.analyze(merchant, location)
+    synthesize = _synthesize_v_values if cached else _synthesize_v_values.__wrapped__
+    return list(synthesize(amount, merchant, location, card_number, timestamp, merchant_features))
+
+def v_value_cache_stats():
+    """Hit/miss counters for the V-value cache"""
+    info = _synthesize_v_values.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+    }
+
+# Keyed on the raw inputs rather than on the MD5 alone: the hashed string is a plain
+# concatenation, so different transactions can share a hash but not a risk score.
+# merchant_features is derived from merchant and location, so it never splits an entry.
+@lru_cache(maxsize=V_VALUE_CACHE_SIZE, typed=True)
+def _synthesize_v_values(amount, merchant, location, card_number, timestamp, merchant_features):
+    """Compute the V values for generate_v_values_from_transaction (cached)"""
     # Create a hash from transaction data for consistent V values
     transaction_hash = hashlib.md5(f"{amount}{merchant}{location}{card_number}{timestamp}".encode()).hexdigest()
     
+    # Local generator seeded from the hash, so the adjustments below are repeatable
+    rng = np.random.default_rng(int(transaction_hash, 16))
+    
     # Convert hash to numerical values
     hash_numbers = [int(transaction_hash[i:i+2], 16) for i in range(0, 32, 2)]
     
@@ -109,65 +247,34 @@ def generate_v_values_from_transaction(amount, merchant, location, card_number,
     elif amount > 1000:
         risk_score += 1  # Low risk
     
-    # Merchant-based risk
-    suspicious_merchants = ['unknown', 'test', 'suspicious', 'fraud', 'fake', 'invalid', 'dummy', 'sample']
-    merchant_lower = merchant.lower().strip()
-    
-    # List of known legitimate online merchants (whitelist)
-    legitimate_merchants = [
-        'netflix.com', 'amazon.com', 'spotify.com', 'youtube.com', 'google.com',
-        'apple.com', 'microsoft.com', 'facebook.com', 'twitter.com', 'instagram.com',
-        'linkedin.com', 'github.com', 'stackoverflow.com', 'reddit.com', 'discord.com',
-        'zoom.us', 'slack.com', 'dropbox.com', 'googleplay.com', 'itunes.com',
-        'steam.com', 'origin.com', 'battle.net', 'playstation.com', 'xbox.com',
-        'nintendo.com', 'hulu.com', 'disneyplus.com', 'hbo.com', 'paramount.com',
-        'peacock.com', 'crunchyroll.com', 'funimation.com', 'vrv.com', 'roku.com',
-        'walmart.com', 'target.com', 'bestbuy.com', 'homedepot.com', 'lowes.com',
-        'costco.com', 'samsclub.com', 'kroger.com', 'safeway.com', 'albertsons.com',
-        'publix.com', 'wegmans.com', 'traderjoes.com', 'wholefoods.com', 'sprouts.com',
-        'starbucks.com', 'mcdonalds.com', 'burgerking.com', 'wendys.com', 'tacobell.com',
-        'dominos.com', 'pizzahut.com', 'subway.com', 'chipotle.com', 'panera.com',
-        'chickfila.com', 'kfc.com', 'popeyes.com', 'arbys.com', 'sonic.com',
-        'dunkindonuts.com', 'krispykreme.com', 'cinnabon.com', 'baskinrobbins.com',
-        'coldstone.com', 'benjerry.com', 'haagendazs.com', 'talenti.com', 'bluebell.com'
-    ]
-    
-    # Only skip risk scoring for merchants in the whitelist
-    if merchant_lower not in legitimate_merchants:
+    # Merchant-based risk (only skip risk scoring for merchants in the whitelist)
+    if not merchant_features.whitelisted:
         # Check for suspicious keywords
-        if any(word in merchant_lower for word in suspicious_merchants):
+        if merchant_features.suspicious_keywords:
             risk_score += 3
         # Check for very short or suspicious merchant names
-        if len(merchant_lower) <= 3:
+        if merchant_features.short_name:
             risk_score += 2
         # Check for made-up sounding names (common patterns)
-        suspicious_patterns = [
-            'inc', 'corp', 'llc', 'ltd', 'co', 'company', 'business', 'enterprise',
-            'group', 'associates', 'partners', 'services', 'solutions', 'tech',
-            'digital', 'online', 'web', 'net', 'cyber', 'virtual'
-        ]
-        pattern_count = sum(1 for pattern in suspicious_patterns if pattern in merchant_lower)
-        if pattern_count >= 2:
+        if merchant_features.pattern_count >= 2:
             risk_score += 3
-        elif pattern_count == 1:
+        elif merchant_features.pattern_count == 1:
             risk_score += 2
         # Check for all lowercase or all uppercase (suspicious)
-        if (merchant.islower() or merchant.isupper()) and '.com' not in merchant_lower and '.org' not in merchant_lower and '.net' not in merchant_lower:
+        if merchant_features.unusual_format:
             risk_score += 1
         # Check for repeated characters (like "aaa" or "bbb")
-        if len(set(merchant_lower)) <= 2 and len(merchant_lower) > 3:
+        if merchant_features.repeated_characters:
             risk_score += 3
         # Check for numbers in merchant name (suspicious unless it's a known pattern)
-        if any(char.isdigit() for char in merchant):
+        if merchant_features.has_digits:
             risk_score += 2
         # Check for very generic names
-        generic_names = ['store', 'shop', 'market', 'mart', 'center', 'place', 'spot']
-        if any(generic in merchant_lower for generic in generic_names) and len(merchant_lower) <= 10:
+        if merchant_features.generic_name:
             risk_score += 2
     
     # Location-based risk
-    foreign_indicators = ['international', 'foreign', 'overseas', 'abroad']
-    if any(word in location.lower() for word in foreign_indicators):
+    if merchant_features.foreign_location:
         risk_score += 2
     
     # Card number validation
@@ -178,122 +285,31 @@ def generate_v_values_from_transaction(amount, merchant, location, card_number,
     if risk_score >= 5:  # High risk transaction
         # Increase V values to indicate fraud
         for i in range(28):
-            v_values[i] = min(v_values[i] + np.random.uniform(2, 4), 10)
+            v_values[i] = min(v_values[i] + rng.uniform(2, 4), 10)
     elif risk_score >= 3:  # Medium risk transaction
         # Moderate increase
         for i in range(14):  # Only adjust first 14 V values
-            v_values[i] = min(v_values[i] + np.random.uniform(1, 2), 10)
+            v_values[i] = min(v_values[i] + rng.uniform(1, 2), 10)
     elif risk_score >= 1:  # Low risk transaction
         # Slight increase
         for i in range(7):  # Only adjust first 7 V values
-            v_values[i] = min(v_values[i] + np.random.uniform(0.5, 1), 10)
+            v_values[i] = min(v_values[i] + rng.uniform(0.5, 1), 10)
     else:  # Legitimate transaction
         # Keep V values in normal range, maybe slight decrease for very legitimate transactions
-        if amount < 500 and 'local' in location.lower():
+        if amount < 500 and merchant_features.local_location:
             for i in range(5):
-                v_values[i] = max(v_values[i] - np.random.uniform(0.5, 1), -10)
-    
-    return v_values
-
-def validate_card_number(card_number):
-    """
-    Comprehensive card number validation that detects suspicious patterns.
-    Returns a tuple of (is_valid, risk_score, risk_factors)
-    """
-    if not card_number:
-        return False, 0, []
-    
-    # Clean the card number
-    clean_number = card_number.replace('-', '').replace(' ', '')
-    
-    # Basic length check
-    if len(clean_number) != 16:
-        return False, 15, ["Invalid card number length"]
-    
-    # Check if all digits
-    if not clean_number.isdigit():
-        return False, 20, ["Card number contains non-digit characters"]
-    
-    risk_score = 0
-    risk_factors = []
-    
-    # Check for repeated digits patterns
-    if len(set(clean_number)) == 1:  # All same digit (e.g., 5555555555555555)
-        risk_score += 60  # Increased from 50
-        risk_factors.append("All digits are identical")
-    elif len(set(clean_number)) <= 3:  # Very few unique digits
-        risk_score += 40  # Increased from 30
-        risk_factors.append("Very few unique digits")
-    
-    # Check for sequential patterns
-    if clean_number in ['1234567890123456', '1111111111111111', '0000000000000000']:
-        risk_score += 60  # Increased from 50
-        risk_factors.append("Common test card number")
-    
-    # Check for repeated patterns (e.g., 1234123412341234)
-    if len(clean_number) >= 8:
-        pattern_length = 4
-        while pattern_length <= len(clean_number) // 2:
-            pattern = clean_number[:pattern_length]
-            if clean_number == pattern * (len(clean_number) // pattern_length):
-                risk_score += 50  # Increased from 40
-                risk_factors.append(f"Repeated pattern detected")
-                break
-            pattern_length += 1
-    
-    # Check for suspicious starting digits
-    suspicious_starts = ['0000', '1111', '2222', '3333', '4444', '5555', '6666', '7777', '8888', '9999']
-    if clean_number[:4] in suspicious_starts:
-        risk_score += 35  # Increased from 25
-        risk_factors.append("Suspicious starting digits")
-    
-    # Check for all zeros or all ones
-    if clean_number == '0' * 16:
-        risk_score += 60  # Increased from 50
-        risk_factors.append("All zeros")
-    elif clean_number == '1' * 16:
-        risk_score += 60  # Increased from 50
-        risk_factors.append("All ones")
-    
-    # Check for alternating patterns (e.g., 0101010101010101)
-    if len(set(clean_number[::2])) == 1 and len(set(clean_number[1::2])) == 1:
-        risk_score += 45  # Increased from 35
-        risk_factors.append("Alternating pattern detected")
+                v_values[i] = max(v_values[i] - rng.uniform(0.5, 1), -10)
     
-    # Check for common test card numbers
-    test_cards = [
-        '4111111111111111',  # Visa test
-        '5555555555554444',  # Mastercard test
-        '378282246310005',   # Amex test
-        '6011111111111117',  # Discover test
-        '4000000000000002',  # Visa test
-        '5105105105105100',  # Mastercard test
-    ]
-    if clean_number in test_cards:
-        risk_score += 55  # Increased from 45
-        risk_factors.append("Known test card number")
-    
-    # Luhn algorithm check (basic validity)
-    def luhn_check(number):
-        digits = [int(d) for d in number]
-        odd_digits = digits[-1::-2]
-        even_digits = digits[-2::-2]
-        checksum = sum(odd_digits)
-        for d in even_digits:
-            checksum += sum(divmod(d * 2, 10))
-        return checksum % 10 == 0
-    
-    if not luhn_check(clean_number):
-        risk_score += 30  # Increased from 20
-        risk_factors.append("Invalid card number (fails Luhn check)")
-    
-    return True, risk_score, risk_factors
+    return tuple(float(v) for v in v_values)
 
-def hybrid_fraud_detection(amount, merchant, location, card_number, timestamp):
+def hybrid_fraud_detection(amount, merchant, location, card_number, timestamp, cached=True):
     """
     Hybrid fraud detection that combines rule-based logic with ML model predictions.
     This provides better accuracy for distinguishing legitimate vs fraudulent transactions.
+    cached=False bypasses the V-value cache (see generate_v_values_from_transaction).
     """
+    clock = metrics.stage_clock()
+    
     # Rule-based risk scoring
     risk_score = 0
     risk_factors = []
@@ -309,84 +325,51 @@ def hybrid_fraud_detection(amount, merchant, location, card_number, timestamp):
         risk_score += 10
         risk_factors.append("Moderate transaction amount")
     
-    # Merchant-based risk
-    suspicious_merchants = ['unknown', 'test', 'suspicious', 'fraud', 'fake', 'invalid', 'dummy', 'sample']
-    merchant_lower = merchant.lower().strip()
-    
-    # List of known legitimate online merchants (whitelist)
-    legitimate_merchants = [
-        'netflix.com', 'amazon.com', 'spotify.com', 'youtube.com', 'google.com',
-        'apple.com', 'microsoft.com', 'facebook.com', 'twitter.com', 'instagram.com',
-        'linkedin.com', 'github.com', 'stackoverflow.com', 'reddit.com', 'discord.com',
-        'zoom.us', 'slack.com', 'dropbox.com', 'googleplay.com', 'itunes.com',
-        'steam.com', 'origin.com', 'battle.net', 'playstation.com', 'xbox.com',
-        'nintendo.com', 'hulu.com', 'disneyplus.com', 'hbo.com', 'paramount.com',
-        'peacock.com', 'crunchyroll.com', 'funimation.com', 'vrv.com', 'roku.com',
-        'walmart.com', 'target.com', 'bestbuy.com', 'homedepot.com', 'lowes.com',
-        'costco.com', 'samsclub.com', 'kroger.com', 'safeway.com', 'albertsons.com',
-        'publix.com', 'wegmans.com', 'traderjoes.com', 'wholefoods.com', 'sprouts.com',
-        'starbucks.com', 'mcdonalds.com', 'burgerking.com', 'wendys.com', 'tacobell.com',
-        'dominos.com', 'pizzahut.com', 'subway.com', 'chipotle.com', 'panera.com',
-        'chickfila.com', 'kfc.com', 'popeyes.com', 'arbys.com', 'sonic.com',
-        'dunkindonuts.com', 'krispykreme.com', 'cinnabon.com', 'baskinrobbins.com',
-        'coldstone.com', 'benjerry.com', 'haagendazs.com', 'talenti.com', 'bluebell.com'
-    ]
+    # Merchant and location keywords, found in one pass and shared with V-value synthesis
+    merchant_features = merchant_analyzer.analyze(merchant, location)
     
-    # Check if it's a known legitimate merchant first
-    if merchant_lower in legitimate_merchants:
-        # Legitimate merchant - no risk score
-        pass
-    else:
+    # Merchant-based risk: known legitimate merchants get no risk score
+    if not merchant_features.whitelisted:
         # Check for suspicious keywords
-        if any(word in merchant_lower for word in suspicious_merchants):
+        if merchant_features.suspicious_keywords:
             risk_score += 25
             risk_factors.append("Suspicious merchant name")
         
         # Check for very short or suspicious merchant names
-        if len(merchant_lower) <= 3:
+        if merchant_features.short_name:
             risk_score += 20
             risk_factors.append("Very short merchant name")
         
-        # Check for made-up sounding names (common patterns)
-        suspicious_patterns = [
-            'inc', 'corp', 'llc', 'ltd', 'co', 'company', 'business', 'enterprise',
-            'group', 'associates', 'partners', 'services', 'solutions', 'tech',
-            'digital', 'online', 'web', 'net', 'cyber', 'virtual'
-        ]
-        
-        # If merchant contains multiple suspicious patterns, it's likely fake
-        pattern_count = sum(1 for pattern in suspicious_patterns if pattern in merchant_lower)
-        if pattern_count >= 2:
+        # If merchant contains multiple made-up sounding patterns, it's likely fake
+        if merchant_features.pattern_count >= 2:
             risk_score += 30
             risk_factors.append("Multiple suspicious merchant patterns")
-        elif pattern_count == 1:
+        elif merchant_features.pattern_count == 1:
             risk_score += 15
             risk_factors.append("Suspicious merchant pattern")
         
         # Check for all lowercase or all uppercase (suspicious) - but exclude .com domains
-        if (merchant.islower() or merchant.isupper()) and '.com' not in merchant_lower and '.org' not in merchant_lower and '.net' not in merchant_lower:
+        if merchant_features.unusual_format:
             risk_score += 10
             risk_factors.append("Unusual merchant name format")
         
         # Check for repeated characters (like "aaa" or "bbb")
-        if len(set(merchant_lower)) <= 2 and len(merchant_lower) > 3:
+        if merchant_features.repeated_characters:
             risk_score += 25
             risk_factors.append("Repeated character pattern in merchant name")
         
         # Check for numbers in merchant name (suspicious unless it's a known pattern)
-        if any(char.isdigit() for char in merchant):
+        if merchant_features.has_digits:
             risk_score += 15
             risk_factors.append("Numbers in merchant name")
         
         # Check for very generic names
-        generic_names = ['store', 'shop', 'market', 'mart', 'center', 'place', 'spot']
-        if any(generic in merchant_lower for generic in generic_names) and len(merchant_lower) <= 10:
+        if merchant_features.generic_name:
             risk_score += 20
             risk_factors.append("Generic merchant name")
     
     # Location-based risk
-    foreign_indicators = ['international', 'foreign', 'overseas', 'abroad']
-    if any(word in location.lower() for word in foreign_indicators):
+    if merchant_features.foreign_location:
         risk_score += 20
         risk_factors.append("International transaction")
     
@@ -404,19 +387,19 @@ def hybrid_fraud_detection(amount, merchant, location, card_number, timestamp):
             risk_factors.append("Unusual transaction time")
     except:
         pass
+    clock.lap('rules')
     
     # Generate V values for ML model
-    v_values = generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp)
+    v_values = generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp, merchant_features,
+                                                  cached=cached)
     
     # Create time feature
     time = int(datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp())
+    clock.lap('v_values')
     
     # ML model prediction
-    features = [time] + v_values + [amount]
-    features = np.array(features).reshape(1, -1)
-    features_scaled = scaler.transform(features)
-    prediction = model.predict(features_scaled)[0]
-    prediction_proba = model.predict_proba(features_scaled)[0]
+    prediction, prediction_proba = scorer.score_transaction(time, v_values, amount)
+    clock.lap('model')
     
     ml_fraud_probability = float(prediction_proba[1])
     
@@ -442,10 +425,7 @@ def hybrid_fraud_detection(amount, merchant, location, card_number, timestamp):
         confidence = "High"
     
     # Add ML model result to factors
-    if prediction == 1:
-        risk_factors.append("ML Model: High fraud probability")
-    else:
-        risk_factors.append("ML Model: Legitimate transaction pattern")
+    risk_factors.append(ml_factor(prediction))
     
     return {
         "is_fraud": is_fraud,
@@ -469,23 +449,21 @@ def register():
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
         
-        # Load existing users
-        users = load_users()
-        
-        # Check if user already exists
-        if email in users:
+        # Check if user already exists (cheap early exit before hashing the password)
+        if user_store.get(email) is not None:
             return jsonify({"error": "User already exists"}), 409
         
-        # Create new user
-        users[email] = {
-            "email": email,
-            "password": generate_password_hash(password),
-            "name": name,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Save users
-        save_users(users)
+        # Create new user; the store re-checks under its lock, so a concurrent
+        # registration of the same email on another worker is still rejected
+        try:
+            user_store.create(email, {
+                "email": email,
+                "password": generate_password_hash(password),
+                "name": name,
+                "created_at": datetime.now().isoformat()
+            })
+        except UserExistsError:
+            return jsonify({"error": "User already exists"}), 409
         
         # Create access token
         access_token = create_access_token(identity=email)
@@ -513,15 +491,11 @@ def login():
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
         
-        # Load users
-        users = load_users()
-        
         # Check if user exists
-        if email not in users:
+        user = user_store.get(email)
+        if user is None:
             return jsonify({"error": "Invalid credentials"}), 401
         
-        user = users[email]
-        
         # Check password
         if not check_password_hash(user['password'], password):
             return jsonify({"error": "Invalid credentials"}), 401
@@ -547,13 +521,11 @@ def get_profile():
     """Get user profile"""
     try:
         current_user_email = get_jwt_identity()
-        users = load_users()
+        user = user_store.get(current_user_email)
         
-        if current_user_email not in users:
+        if user is None:
             return jsonify({"error": "User not found"}), 404
         
-        user = users[current_user_email]
-        
         return jsonify({
             "email": user['email'],
             "name": user.get('name', ''),
@@ -566,20 +538,146 @@ def get_profile():
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Health check endpoint (no authentication required)"""
-    return jsonify({"status": "healthy", "message": "Fraud detection API is running"})
+    health = {
+        "status": "healthy",
+        "message": "Fraud detection API is running",
+        "v_value_cache": v_value_cache_stats(),
+        "history_writer": history_writer.stats()
+    }
+    if scorer.coalescer is not None:
+        health["coalescer"] = scorer.coalescer.stats()
+    if scorer.pool is not None:
+        health["inference_pool"] = scorer.pool.stats()
+    return jsonify(health)
+
+@app.route("/api/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness probe (no authentication required): 200 once the model is loaded
+    and warmed up, 503 before that. /api/health only says the process is up.
+    """
+    ready = model_warmup.ready
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "model": model_artifact,
+        "warmup": model_warmup.status()
+    }), 200 if ready else 503
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus metrics for all workers (no authentication required)"""
+    return metrics.response()
+
+def snapshot_options(source):
+    """scope and limit for the memory snapshot endpoints"""
+    scope = source.get('scope', 'app')
+    if scope not in SNAPSHOT_SCOPES:
+        raise ValueError(f"scope must be one of {', '.join(SNAPSHOT_SCOPES)}")
+    limit = int(source.get('limit', 20))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return scope, limit
+
+@app.route("/api/admin/memory", methods=["GET"])
+@jwt_required()
+def memory_overview():
+    """RSS, tracemalloc status and stored snapshots of this worker (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({"error": "Admin access required"}), 403
+        return jsonify({**memory_status(), "snapshots": memory_snapshots.ids()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/admin/memory/snapshots", methods=["POST"])
+@jwt_required()
+def take_memory_snapshot():
+    """
+    Take a tracemalloc snapshot (starting tracing if needed) and return the top
+    allocating lines. scope: 'app' (app.py, default), 'project' or 'all'.
+    """
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({"error": "Admin access required"}), 403
+        options = request.get_json(silent=True) or {}
+        try:
+            scope, limit = snapshot_options(options)
+            frames = int(options.get('frames', TRACEMALLOC_FRAMES))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        snapshot_id, snapshot = memory_snapshots.take(frames)
+        return jsonify({
+            "snapshot_id": snapshot_id,
+            **memory_status(),
+            "scope": scope,
+            "top": memory_snapshots.top(snapshot, scope, limit)
+        }), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/admin/memory/diff", methods=["GET"])
+@jwt_required()
+def diff_memory_snapshot():
+    """
+    Take a new snapshot and return the lines whose allocations grew most since
+    snapshot ?base= (default: the latest one). The new snapshot is kept as well.
+    """
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({"error": "Admin access required"}), 403
+        try:
+            scope, limit = snapshot_options(request.args)
+            base_id = int(request.args['base']) if 'base' in request.args else memory_snapshots.latest_id()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if base_id is None:
+            return jsonify({"error": "No snapshot to diff against; POST /api/admin/memory/snapshots first"}), 400
+        try:
+            _, base = memory_snapshots.get(base_id)
+        except KeyError:
+            return jsonify({"error": f"Snapshot {base_id} not found in worker {os.getpid()}"}), 404
+
+        snapshot_id, snapshot = memory_snapshots.take()
+        return jsonify({
+            "base_id": base_id,
+            "snapshot_id": snapshot_id,
+            **memory_status(),
+            "scope": scope,
+            "diff": memory_snapshots.diff(base, snapshot, scope, limit)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/admin/memory/snapshots", methods=["DELETE"])
+@jwt_required()
+def stop_memory_tracing():
+    """Stop tracemalloc and drop the stored snapshots (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({"error": "Admin access required"}), 403
+        memory_snapshots.stop()
+        return jsonify(memory_status())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @app.route("/api/model-info", methods=["GET"])
 @jwt_required()
 def model_info():
-    """Get model information (protected)"""
+    """Get model information (protected); metrics are null until the model is evaluated"""
     try:
+        evaluation = model_evaluations.get() or {}
         return jsonify({
             "model_type": "RandomForest Classifier",
-            "features": 30,
-            "accuracy": 0.952,
-            "precision": 0.948,
-            "recall": 0.921,
-            "f1_score": 0.934
+            "features": forest.n_features_in_,
+            "n_estimators": forest.n_estimators,
+            "model_sha256": model_artifact['model_sha256'],
+            "accuracy": evaluation.get('accuracy'),
+            "precision": evaluation.get('precision'),
+            "recall": evaluation.get('recall'),
+            "f1_score": evaluation.get('f1_score'),
+            "roc_auc": evaluation.get('roc_auc'),
+            "evaluated_at": evaluation.get('evaluated_at')
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -600,16 +698,10 @@ def predict():
         if len(v_values) != 28:
             v_values = v_values[:28] + [0] * (28 - len(v_values))
         
-        # Create feature array in the correct order
-        features = [time] + v_values + [amount]
-        features = np.array(features).reshape(1, -1)
-        
-        # Scale the features
-        features_scaled = scaler.transform(features)
-        
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
-        prediction_proba = model.predict_proba(features_scaled)[0]
+        # Make prediction from [Time, V1, ..., V28, Amount]
+        with metrics.stage('model'):
+            prediction, prediction_proba = scorer.score_transaction(time, v_values, amount)
+        metrics.count_verdicts([prediction == 1])
         
         # Get fraud probability (probability of class 1)
         fraud_probability = float(prediction_proba[1])
@@ -649,23 +741,15 @@ def analyze_transaction():
             v_values = data['v_values']
             amount = data.get('amount', 0)
             
-            # Create feature array
-            features = [time] + v_values + [amount]
-            features = np.array(features).reshape(1, -1)
-            
-            # Scale and predict
-            features_scaled = scaler.transform(features)
-            prediction = model.predict(features_scaled)[0]
-            prediction_proba = model.predict_proba(features_scaled)[0]
+            # Predict
+            with metrics.stage('model'):
+                prediction, prediction_proba = scorer.score_transaction(time, v_values, amount)
             
             fraud_probability = float(prediction_proba[1])
             risk_score = int(fraud_probability * 100)
             is_genuine = prediction == 0
             
-            if prediction == 1:
-                factors.append("ML Model: High fraud probability")
-            else:
-                factors.append("ML Model: Legitimate transaction pattern")
+            factors.append(ml_factor(prediction))
                 
         else:
             # Use hybrid fraud detection system
@@ -696,9 +780,12 @@ def analyze_transaction():
             "factors": [str(factor) for factor in factors]
         }
 
+        metrics.count_verdicts([not is_genuine])
+        
         # Save to transaction history
         current_user_email = get_jwt_identity()
-        add_transaction_to_history(current_user_email, result)
+        with metrics.stage('persist'):
+            add_transaction_to_history(current_user_email, result)
 
         return jsonify(result)
 
@@ -714,33 +801,22 @@ def analyze_batch():
     try:
         data = request.json
         transactions = data.get('transactions', [])
-        results = []
         
-        for transaction in transactions:
+        clock = metrics.stage_clock()
+        
+        # First pass: fill one feature row per transaction and collect its heuristic factors
+        features = scorer.feature_buffer(len(transactions))
+        row_factors = []
+        amounts = []
+        
+        for row, transaction in zip(features, transactions):
             # Check if we have V1-V28 values for direct ML prediction
             if 'v_values' in transaction and len(transaction['v_values']) == 28:
                 # Use ML model prediction with provided V values
                 time = transaction.get('time', 0)
                 v_values = transaction['v_values']
                 amount = transaction.get('amount', 0)
-                
-                # Create feature array
-                features = [time] + v_values + [amount]
-                features = np.array(features).reshape(1, -1)
-                
-                # Scale and predict
-                features_scaled = scaler.transform(features)
-                prediction = model.predict(features_scaled)[0]
-                prediction_proba = model.predict_proba(features_scaled)[0]
-                
-                fraud_probability = float(prediction_proba[1])
-                risk_score = int(fraud_probability * 100)
-                is_genuine = prediction == 0
-                
-                if prediction == 1:
-                    factors = ["ML Model: High fraud probability"]
-                else:
-                    factors = ["ML Model: Legitimate transaction pattern"]
+                factors = []
                     
             else:
                 # Generate V values from merchant transaction data and use ML model
@@ -751,42 +827,46 @@ def analyze_batch():
                 timestamp = transaction.get('timestamp', datetime.now().isoformat())
                 
                 # Generate V1-V28 values from transaction characteristics
-                v_values = generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp)
+                merchant_features = merchant_analyzer.analyze(merchant, location)
+                v_values = generate_v_values_from_transaction(amount, merchant, location, card_number, timestamp, merchant_features)
                 
                 # Create time feature
                 time = int(datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp())
                 
-                # Create feature array for ML model
-                features = [time] + v_values + [amount]
-                features = np.array(features).reshape(1, -1)
-                
-                # Scale and predict using ML model
-                features_scaled = scaler.transform(features)
-                prediction = model.predict(features_scaled)[0]
-                prediction_proba = model.predict_proba(features_scaled)[0]
-                
-                fraud_probability = float(prediction_proba[1])
-                risk_score = int(fraud_probability * 100)
-                is_genuine = prediction == 0
-                
                 # Add additional heuristic factors for context
                 factors = []
                 if amount > 1000:
                     factors.append("High transaction amount")
                 if amount > 5000:
                     factors.append("Very high transaction amount")
-                if 'unknown' in merchant.lower() or 'test' in merchant.lower() or 'suspicious' in merchant.lower():
+                if merchant_features.suspicious_keywords & BATCH_SUSPICIOUS_WORDS:
                     factors.append("Unknown or suspicious merchant")
-                if 'international' in location.lower() or 'foreign' in location.lower():
+                if merchant_features.location_keywords & BATCH_FOREIGN_WORDS:
                     factors.append("International transaction")
                 if card_number and (len(card_number.replace('-', '').replace(' ', '')) != 16):
                     factors.append("Invalid card number format")
-                
-                # Add ML model result
-                if prediction == 1:
-                    factors.append("ML Model: High fraud probability")
-                else:
-                    factors.append("ML Model: Legitimate transaction pattern")
+            
+            fill_features(row, time, v_values, amount)
+            row_factors.append(factors)
+            amounts.append(amount)
+        
+        clock.lap('features')
+        
+        # Score the whole batch as one (N, 30) matrix with one probability pass
+        predictions, prediction_proba = scorer.score_features(features)
+        clock.lap('model')
+        metrics.count_verdicts(predictions == 1)
+        
+        # Second pass: assemble the per-transaction results
+        results = []
+        for transaction, amount, factors, prediction, proba in zip(
+                transactions, amounts, row_factors, predictions, prediction_proba):
+            fraud_probability = float(proba[1])
+            risk_score = int(fraud_probability * 100)
+            is_genuine = prediction == 0
+            
+            # Add ML model result
+            factors.append(ml_factor(prediction))
 
             result = {
                 "id": "txn_" + str(np.random.randint(100000, 999999)),
@@ -802,10 +882,12 @@ def analyze_batch():
             }
             results.append(result)
         
-        # Save batch transactions to history
+        clock.lap('results')
+        
+        # Save batch transactions to history (one group commit)
         current_user_email = get_jwt_identity()
-        for result in results:
-            add_transaction_to_history(current_user_email, result)
+        add_transactions_to_history(current_user_email, results)
+        clock.lap('persist')
         
         return jsonify({"results": results})
 
@@ -827,8 +909,14 @@ def upload_csv():
         if not file.filename.endswith('.csv'):
             return jsonify({"error": "File must be a CSV"}), 400
         
-        # Read CSV file
-        df = pd.read_csv(file)
+        # Streaming mode: score the file chunk by chunk and return NDJSON
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return stream_csv_predictions(file)
+        
+        # Read CSV file (pandas is only needed here, so it is imported on first use)
+        import pandas as pd
+        with metrics.stage('parse'):
+            df = pd.read_csv(file)
         
         # Validate required columns
         required_columns = ['Time', 'Amount']
@@ -843,46 +931,8 @@ def upload_csv():
                 "message": "Please ensure your CSV has the correct format: Time,V1,V2,...,V28,Amount"
             }), 400
         
-        results = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Extract features
-                time = float(row['Time'])
-                amount = float(row['Amount'])
-                v_values = [float(row[f'V{i}']) for i in range(1, 29)]
-                
-                # Create feature array
-                features = [time] + v_values + [amount]
-                features = np.array(features).reshape(1, -1)
-                
-                # Scale and predict
-                features_scaled = scaler.transform(features)
-                prediction = model.predict(features_scaled)[0]
-                prediction_proba = model.predict_proba(features_scaled)[0]
-                
-                fraud_probability = float(prediction_proba[1])
-                risk_score = int(fraud_probability * 100)
-                is_genuine = prediction == 0
-                
-                result = {
-                    "id": f"txn_{index}_{np.random.randint(100000, 999999)}",
-                    "amount": float(amount),
-                    "merchant": f"Transaction_{index}",
-                    "location": "Unknown",
-                    "timestamp": str(datetime.now().isoformat()),
-                    "cardNumber": "****-****-****-****",
-                    "fraudProbability": float(fraud_probability),
-                    "riskScore": int(risk_score),
-                    "isGenuine": bool(is_genuine),
-                    "factors": ["ML Model: High fraud probability"] if prediction == 1 else ["ML Model: Legitimate transaction pattern"]
-                }
-                results.append(result)
-                
-            except Exception as e:
-                # Skip problematic rows
-                print(f"Error processing row {index}: {e}")
-                continue
+        # Score every row as one matrix
+        results = score_csv_frame(df)
         
         return jsonify({
             "message": f"Successfully processed {len(results)} transactions",
@@ -896,106 +946,249 @@ def upload_csv():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def score_csv_frame(df, dtype=np.float64):
+    """
+    Score the model columns of a CSV DataFrame as one matrix of the given dtype.
+    Rows that cannot be scored (non-numeric, infinite or too large values) are
+    reported and skipped; returns the result dicts for the rest, in file order.
+    """
+    import pandas as pd
+    columns = df[FEATURE_COLUMNS]
+    numeric = columns.apply(pd.to_numeric, errors='coerce')
+    # Values too large for float32 become inf here and are skipped below
+    with np.errstate(over='ignore'):
+        features = numeric.to_numpy(dtype=dtype)
+    
+    # Cells that are present but not numbers; empty cells stay NaN and are scored
+    valid = ~(numeric.isna() & columns.notna()).to_numpy().any(axis=1)
+    valid &= scorer.scorable_rows(features)
+    if not valid.all():
+        for index in df.index[~valid]:
+            print(f"Error processing row {index}: non-numeric, infinite or too large feature value")
+        features = features[valid]
+    
+    with metrics.stage('model'):
+        predictions, prediction_proba = scorer.score_features(features)
+    metrics.count_verdicts(predictions == 1)
+    
+    indices = df.index[valid]
+    suffixes = np.random.randint(100000, 999999, size=len(features))
+    timestamp = str(datetime.now().isoformat())
+    
+    results = []
+    for index, amount, prediction, proba, suffix in zip(
+            indices, features[:, -1], predictions, prediction_proba, suffixes):
+        fraud_probability = float(proba[1])
+        results.append({
+            "id": f"txn_{index}_{suffix}",
+            "amount": float(amount),
+            "merchant": f"Transaction_{index}",
+            "location": "Unknown",
+            "timestamp": timestamp,
+            "cardNumber": "****-****-****-****",
+            "fraudProbability": fraud_probability,
+            "riskScore": int(fraud_probability * 100),
+            "isGenuine": bool(prediction == 0),
+            "factors": [ml_factor(prediction)]
+        })
+    return results
+
+def stream_csv_predictions(file):
+    """
+    Score an uploaded CSV in fixed-size chunks and stream the results as NDJSON.
+    Only the 30 model columns are parsed, each chunk is scored as one float32
+    matrix (rows with non-numeric cells are skipped, as without streaming), and
+    one JSON object per transaction is written as soon as its chunk is done, so
+    memory use does not grow with the file size. The last line is a summary.
+    """
+    import pandas as pd
+    
+    # Validate the header before starting the response so errors can still be a 400
+    header = pd.read_csv(file.stream, nrows=0)
+    file.stream.seek(0)
+    
+    missing_columns = [col for col in FEATURE_COLUMNS if col not in header.columns]
+    if missing_columns:
+        return jsonify({
+            "error": f"Missing required columns: {missing_columns}",
+            "required_columns": FEATURE_COLUMNS,
+            "message": "Please ensure your CSV has the correct format: Time,V1,V2,...,V28,Amount"
+        }), 400
+    
+    def generate():
+        total_rows = 0
+        processed_rows = 0
+        
+        try:
+            reader = pd.read_csv(
+                file.stream,
+                usecols=FEATURE_COLUMNS,
+                chunksize=CSV_CHUNK_SIZE
+            )
+            
+            for chunk in reader:
+                total_rows += len(chunk)
+                
+                lines = [json.dumps(result) for result in score_csv_frame(chunk, dtype=np.float32)]
+                processed_rows += len(lines)
+                if lines:
+                    yield "\n".join(lines) + "\n"
+        
+        except Exception as e:
+            print('Exception while streaming /api/upload-csv:')
+            traceback.print_exc()
+            yield json.dumps({"error": str(e), "total_rows": total_rows, "processed_rows": processed_rows}) + "\n"
+            return
+        
+        yield json.dumps({
+            "message": f"Successfully processed {processed_rows} transactions",
+            "total_rows": total_rows,
+            "processed_rows": processed_rows
+        }) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route("/api/model-evaluation", methods=["GET"])
 @jwt_required()
 def model_evaluation():
-    """Return model evaluation metrics"""
-    return jsonify({
-        "accuracy": 0.952,
-        "precision": 0.948,
-        "recall": 0.921,
-        "f1_score": 0.934,
-        "confusion_matrix": {
-            "true_negatives": 28432,
-            "false_positives": 148,
-            "false_negatives": 492,
-            "true_positives": 492
-        },
-        "feature_importance": {
-            "V17": 0.089,
-            "V14": 0.087,
-            "V12": 0.085,
-            "V10": 0.083,
-            "V16": 0.081,
-            "V11": 0.079,
-            "V18": 0.077,
-            "V9": 0.075,
-            "V4": 0.073,
-            "V3": 0.071
-        }
-    })
+    """
+    Return the loaded model's evaluation: confusion matrix, precision/recall,
+    ROC and PR curves and feature importances, as measured by evaluation.py
+    """
+    evaluation = model_evaluations.get()
+    if evaluation is None:
+        return jsonify({
+            "evaluated": False,
+            "message": "The loaded model has not been evaluated. Run: python evaluation.py creditcard.csv",
+            "model_sha256": model_artifact['model_sha256']
+        })
+    return jsonify({"evaluated": True, **evaluation})
 
 @app.route("/api/transaction-history", methods=["GET"])
 @jwt_required()
 def get_transaction_history():
-    """Get user's transaction analysis history"""
+    """
+    Get one page of the user's transaction analysis history, most recent first.
+    Query parameters: limit, cursor (next_cursor of the previous page), status
+    (fraudulent|legitimate), min_risk, max_risk, min_amount, max_amount,
+    since, until (ISO timestamps) and search (merchant, location or ID).
+    """
     try:
         current_user_email = get_jwt_identity()
-        history = load_transaction_history()
-        
-        user_history = history.get(current_user_email, [])
         
-        # Sort by most recent first
-        user_history.sort(key=lambda x: x.get('analyzed_at', ''), reverse=True)
+        try:
+            filters = history_filters(request.args)
+            limit = request.args.get('limit', str(HISTORY_PAGE_SIZE))
+            if not limit.isdigit() or int(limit) < 1:
+                raise ValueError("limit must be a positive integer")
+            limit = min(int(limit), HISTORY_MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Commit queued (async mode) writes so the user sees their latest transactions
+        history_writer.flush()
+        
+        # Served from the store's (user_email, analyzed_at, id) index
+        try:
+            with metrics.stage('query'):
+                transactions, next_cursor, total_count = history_store.history_page(
+                    current_user_email, limit, cursor=request.args.get('cursor') or None, **filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
-            "transactions": user_history,
-            "total_count": len(user_history)
+            "transactions": transactions,
+            "total_count": total_count,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def history_filters(args):
+    """History filters from query parameters; raises ValueError for malformed values"""
+    filters = {}
+    
+    status = args.get('status', 'all').lower()
+    if status == 'fraudulent':
+        filters['is_genuine'] = False
+    elif status == 'legitimate':
+        filters['is_genuine'] = True
+    elif status != 'all':
+        raise ValueError("status must be all, fraudulent or legitimate")
+    
+    for name in ('min_risk', 'max_risk', 'min_amount', 'max_amount'):
+        if args.get(name):
+            try:
+                filters[name] = float(args[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+    
+    # analyzed_at is stored in server local time
+    for name in ('since', 'until'):
+        if args.get(name):
+            try:
+                value = datetime.fromisoformat(args[name].replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError(f"{name} must be an ISO timestamp")
+            if value.tzinfo is not None:
+                value = value.astimezone().replace(tzinfo=None)
+            filters[name] = value.isoformat()
+    
+    if args.get('search'):
+        filters['search'] = args['search']
+    return filters
+
 @app.route("/api/export-history", methods=["GET"])
 @jwt_required()
 def export_transaction_history():
-    """Export user's transaction history as CSV"""
+    """
+    Export user's transaction history as a file download, streamed in batches.
+    ?format=csv (default), parquet or arrow (the last two need pyarrow);
+    ?compress=gzip compresses CSV output.
+    """
+    # Imported on first export: it loads pyarrow when installed
+    from history_export import EXPORT_FORMATS, available_formats, csv_chunks, gzip_chunks, columnar_chunks
+    
     try:
         current_user_email = get_jwt_identity()
-        history = load_transaction_history()
+        export_format = request.args.get('format', 'csv').lower()
+        compress = request.args.get('compress', '').lower()
         
-        user_history = history.get(current_user_email, [])
+        if export_format in EXPORT_FORMATS and export_format not in available_formats():
+            return jsonify({
+                "error": f"{export_format} export needs pyarrow, which is not installed on this server",
+                "available_formats": available_formats()
+            }), 400
+        if export_format not in available_formats():
+            return jsonify({
+                "error": f"Unsupported export format: {export_format}",
+                "available_formats": available_formats()
+            }), 400
+        if compress not in ('', 'gzip') or (compress and export_format != 'csv'):
+            return jsonify({"error": "compress=gzip is only supported for CSV exports"}), 400
         
-        if not user_history:
+        history_writer.flush()
+        if history_store.count(current_user_email) == 0:
             return jsonify({"error": "No transaction history found"}), 404
         
-        # Create CSV content
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'Transaction ID', 'Amount', 'Merchant', 'Location', 'Timestamp',
-            'Card Number', 'Fraud Probability', 'Risk Score', 'Is Genuine',
-            'Factors', 'Analyzed At'
-        ])
-        
-        # Write data
-        for transaction in user_history:
-            writer.writerow([
-                transaction.get('id', ''),
-                transaction.get('amount', ''),
-                transaction.get('merchant', ''),
-                transaction.get('location', ''),
-                transaction.get('timestamp', ''),
-                transaction.get('cardNumber', ''),
-                transaction.get('fraudProbability', ''),
-                transaction.get('riskScore', ''),
-                'Yes' if transaction.get('isGenuine', False) else 'No',
-                '; '.join(transaction.get('factors', [])),
-                transaction.get('analyzed_at', '')
-            ])
-        
-        csv_content = output.getvalue()
-        output.close()
+        batches = history_store.iter_history(current_user_email, batch_size=EXPORT_BATCH_SIZE)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        if export_format == 'csv':
+            chunks = csv_chunks(batches)
+            if compress:
+                chunks = gzip_chunks(chunks)
+                mimetype, extension = 'application/gzip', 'csv.gz'
+        else:
+            chunks = columnar_chunks(batches, export_format)
         
-        return jsonify({
-            "csv_content": csv_content,
-            "filename": f"fraud_analysis_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        })
+        filename = f"fraud_analysis_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1006,27 +1199,20 @@ def get_real_time_stats():
     """Get real-time statistics for monitoring"""
     try:
         current_user_email = get_jwt_identity()
-        history = load_transaction_history()
+        history_writer.flush()
         
-        user_history = history.get(current_user_email, [])
+        # Running totals and 24h activity, maintained as transactions are recorded
+        stats = history_store.user_stats(current_user_email)
         
         # Calculate real-time statistics
-        total_transactions = len(user_history)
-        fraudulent_count = len([t for t in user_history if not t.get('isGenuine', True)])
+        total_transactions = stats["total"]
+        fraudulent_count = stats["fraudulent"]
         legitimate_count = total_transactions - fraudulent_count
         
-        # Recent activity (last 24 hours)
-        from datetime import datetime, timedelta
-        yesterday = datetime.now() - timedelta(days=1)
-        recent_transactions = [
-            t for t in user_history 
-            if datetime.fromisoformat(t.get('analyzed_at', '')).replace(tzinfo=None) > yesterday
-        ]
-        
         # Average risk score
         avg_risk_score = 0
-        if user_history:
-            avg_risk_score = sum(t.get('riskScore', 0) for t in user_history) / len(user_history)
+        if total_transactions:
+            avg_risk_score = stats["risk_sum"] / total_transactions
         
         return jsonify({
             "total_transactions": total_transactions,
@@ -1034,13 +1220,46 @@ def get_real_time_stats():
             "legitimate_count": legitimate_count,
             "fraud_rate": (fraudulent_count / total_transactions * 100) if total_transactions > 0 else 0,
             "avg_risk_score": round(avg_risk_score, 2),
-            "recent_activity": len(recent_transactions),
+            "recent_activity": stats["recent"],
             "last_updated": datetime.now().isoformat()
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Boot-time warm-up: run each scoring path once on synthetic data so the first
+# real requests do not pay one-off costs (see warmup). /api/ready waits for it.
+# Warming the native-tree path imports sklearn and rebuilds every tree in this
+# process (~80 MB more per worker than sharing the memory-mapped artifact), so
+# it is opt-in; without it the first large batch pays that cost.
+MODEL_WARMUP_NATIVE = os.environ.get('MODEL_WARMUP_NATIVE', '').lower() in ('1', 'true', 'yes')
+
+def warm_up_single_transaction():
+    # Bypasses the V-value cache, so live entries and the hit/miss counters in
+    # /api/health are untouched when warm-up runs alongside requests (background mode)
+    hybrid_fraud_detection(125.0, "Warm-up Store", "New York, NY", "4532015112830366", datetime.now().isoformat(),
+                           cached=False)
+
+def warm_up_batch():
+    # NATIVE_MIN_ROWS rows take the native-tree path; fewer warm the NumPy traversal
+    scorer.score_features(synthetic_features(NATIVE_MIN_ROWS if MODEL_WARMUP_NATIVE else 64))
+
+def warm_up_csv():
+    import pandas as pd
+    frame = pd.DataFrame(synthetic_features(8, seed=1), columns=FEATURE_COLUMNS)
+    score_csv_frame(pd.read_csv(io.StringIO(frame.to_csv(index=False))))
+
+warmup_steps = [
+    ("single_transaction", warm_up_single_transaction),
+    ("batch", warm_up_batch),
+    ("csv", warm_up_csv)
+]
+if scorer.pool is not None:
+    warmup_steps.append(("inference_pool", scorer.pool.warm_up))
+model_warmup = ModelWarmup(warmup_steps)
+# background: serve /api/health at once and report ready when done; sync: finish before serving; off
+model_warmup.start(os.environ.get('MODEL_WARMUP', 'background').lower())
+
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
@@ -0,0 +1,250 @@
+"""
+Offline micro-benchmarks for the scoring hot paths.
+
+Runs in-process (no server needed) and times:
+
+- per transaction: hybrid_fraud_detection, generate_v_values_from_transaction
+  (cache misses and hits) and validate_card_number
+- per batch of 1 ... 100k rows: batch card validation, feature construction
+  (filling the scorer's feature matrix, as /api/analyze-batch does) and model
+  scoring (FraudScorer.score_features)
+
+Each case reports calls/s, rows/s and p50/p95/p99 call latency, and the run is
+saved as JSON so runs before and after a change can be compared:
+
+    python bench_scoring.py --output before.json
+    python bench_scoring.py --output after.json --compare before.json
+
+Importing app.py sets it up the same way as a server start (stores, model
+artifact), and environment settings such as INFERENCE_BACKEND apply. Its user
+store, transaction history and model artifact go to a temporary directory
+unless USERS_FILE, USERS_DB, TRANSACTION_HISTORY_DB or MODEL_ARTIFACT_DIR are
+set, so benchmark traffic never reaches the checkout's data.
+"""
+import argparse
+import atexit
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000, 100000]
+DEFAULT_OUTPUT = 'bench_results.json'
+
+# Distinct synthetic transactions; more than the V-value cache holds, so cycling
+# through them measures cache misses
+N_INPUTS = 20000
+
+MERCHANTS = ['Amazon', 'Walmart', 'Starbucks', 'Shell Gas Station', 'Test Merchant',
+             'Unknown Vendor', 'xyz123', 'Target', 'Best Buy', 'Quick Cash Online']
+LOCATIONS = ['New York, NY', 'Los Angeles, CA', 'Chicago, IL', 'International',
+             'Foreign Country', 'Online', 'Houston, TX', 'Unknown']
+
+
+def synthetic_transactions(n, seed=0):
+    """n distinct (amount, merchant, location, card_number, timestamp) tuples"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    amounts = np.round(rng.exponential(150, n), 2)
+    merchants = rng.integers(0, len(MERCHANTS), n)
+    locations = rng.integers(0, len(LOCATIONS), n)
+    cards = rng.integers(0, 10, (n, 16))
+    return [
+        (float(amounts[i]), MERCHANTS[merchants[i]], LOCATIONS[locations[i]],
+         ''.join(map(str, cards[i])), (start + timedelta(seconds=37 * i)).isoformat())
+        for i in range(n)
+    ]
+
+
+def summarize(name, batch_size, samples):
+    """Throughput and latency percentiles for per-call durations (seconds)"""
+    samples = np.asarray(samples)
+    total = samples.sum()
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000.0
+    return {
+        "case": name,
+        "batch_size": batch_size,
+        "calls": len(samples),
+        "calls_per_s": round(len(samples) / total, 3),
+        "rows_per_s": round(len(samples) * batch_size / total, 3),
+        "mean_ms": round(samples.mean() * 1000.0, 6),
+        "p50_ms": round(p50, 6),
+        "p95_ms": round(p95, 6),
+        "p99_ms": round(p99, 6)
+    }
+
+
+def time_case(name, batch_size, call, min_time=0.5, min_calls=5, max_calls=20000, warmup_calls=3):
+    """Call call(i) until min_time has passed (within [min_calls, max_calls]) and summarize"""
+    for i in range(warmup_calls):
+        call(i)
+
+    samples = []
+    started = time.perf_counter()
+    i = 0
+    while i < max_calls and (i < min_calls or time.perf_counter() - started < min_time):
+        call_started = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - call_started)
+        i += 1
+    return summarize(name, batch_size, samples)
+
+
+def import_app():
+    """app.py with the stores and artifact it writes in a temporary directory (unless set in the environment)"""
+    directory = tempfile.mkdtemp(prefix='fraud-bench-')
+    # Registered before the app's own atexit handlers, so it runs after their last flush
+    atexit.register(shutil.rmtree, directory, True)
+    os.environ.setdefault('USERS_FILE', os.path.join(directory, 'users.json'))
+    os.environ.setdefault('USERS_DB', os.path.join(directory, 'users.db'))
+    os.environ.setdefault('TRANSACTION_HISTORY_DB', os.path.join(directory, 'transaction_history.db'))
+    os.environ.setdefault('MODEL_ARTIFACT_DIR', os.path.join(directory, 'model_artifacts'))
+    import app
+    return app
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, min_time=0.5, cases=None, log=print):
+    """Run every case (or those named in cases) and return the result dicts"""
+    app = import_app()
+    from card_validation import validate_card_number, validate_card_numbers
+    from scoring import fill_features
+    from warmup import synthetic_features
+
+    transactions = synthetic_transactions(N_INPUTS)
+    v_values = np.random.default_rng(1).normal(0, 2, (N_INPUTS, 28))
+
+    def hybrid(i):
+        app.hybrid_fraud_detection(*transactions[i % N_INPUTS])
+
+    # A fresh input on every call, warm-up calls included; with N_INPUTS above the
+    # cache size, inputs are evicted long before they come round again
+    miss_inputs = itertools.count()
+
+    def v_values_miss(i):
+        app.generate_v_values_from_transaction(*transactions[next(miss_inputs) % N_INPUTS])
+
+    def v_values_hit(i):
+        app.generate_v_values_from_transaction(*transactions[0])
+
+    def card(i):
+        validate_card_number(transactions[i % N_INPUTS][3])
+
+    # (name, call, setup run just before timing the case)
+    single_cases = [
+        ("hybrid_fraud_detection", hybrid, None),
+        # The hybrid case has filled the V-value cache from the same inputs
+        ("generate_v_values", v_values_miss, app._synthesize_v_values.cache_clear),
+        ("generate_v_values_cached", v_values_hit, None),
+        ("validate_card_number", card, None),
+    ]
+
+    def batch_cases(size):
+        cards = [transactions[i % N_INPUTS][3] for i in range(size)]
+        rows = [(transactions[i % N_INPUTS][4], v_values[i % N_INPUTS], transactions[i % N_INPUTS][0])
+                for i in range(size)]
+        features = synthetic_features(size, seed=2)
+
+        def card_batch(i):
+            validate_card_numbers(cards)
+
+        def feature_construction(i):
+            matrix = app.scorer.feature_buffer(size)
+            for row, (timestamp, v, amount) in zip(matrix, rows):
+                fill_features(row, int(datetime.fromisoformat(timestamp).timestamp()), v, amount)
+
+        def scoring(i):
+            app.scorer.score_features(features)
+
+        return [
+            ("validate_card_numbers", card_batch),
+            ("feature_construction", feature_construction),
+            ("score_features", scoring),
+        ]
+
+    results = []
+
+    def record(result):
+        results.append(result)
+        log(f"{result['case']:<26} {result['batch_size']:>7} rows  {result['rows_per_s']:>14,.0f} rows/s  "
+            f"p50 {result['p50_ms']:>10.4f} ms  p95 {result['p95_ms']:>10.4f} ms  p99 {result['p99_ms']:>10.4f} ms")
+
+    for name, call, setup in single_cases:
+        if cases is None or name in cases:
+            if setup is not None:
+                setup()
+            record(time_case(name, 1, call, min_time=min_time))
+
+    for size in sizes:
+        for name, call in batch_cases(size):
+            if cases is None or name in cases:
+                record(time_case(name, size, call, min_time=min_time))
+    return results
+
+
+def run_metadata():
+    """Environment details stored with the results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "inference_backend": os.environ.get('INFERENCE_BACKEND', 'inline')
+    }
+
+
+def compare(results, baseline, log=print):
+    """Print throughput and p50 ratios of results against a baseline run"""
+    previous = {(r['case'], r['batch_size']): r for r in baseline['results']}
+    log(f"\nCompared with {baseline['meta'].get('git_commit')} ({baseline['meta'].get('created_at')}):")
+    for result in results:
+        before = previous.get((result['case'], result['batch_size']))
+        if before is None:
+            continue
+        throughput = result['rows_per_s'] / before['rows_per_s']
+        latency = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('nan')
+        log(f"{result['case']:<26} {result['batch_size']:>7} rows  throughput x{throughput:.2f}  p50 x{latency:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for the scoring hot paths")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated batch sizes (default: %(default)s)")
+    parser.add_argument('--min-time', type=float, default=0.5, help="seconds per case (default: %(default)s)")
+    parser.add_argument('--cases', help="comma-separated case names to run (default: all)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON results file (default: %(default)s)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    cases = set(args.cases.split(',')) if args.cases else None
+
+    print("=== Scoring Benchmarks ===")
+    results = run_benchmarks(sizes=sizes, min_time=args.min_time, cases=cases)
+    report = {"meta": run_metadata(), "results": results}
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Micro-batching for single-transaction scoring.
+
+Under concurrent load every /api/analyze-transaction and /api/predict call would
+run its own one-row forest evaluation. ScoringCoalescer queues those rows for a
+short window (or until a batch limit is reached), scores them as one matrix on a
+background thread and hands each caller its own row's result.
+
+The window and batch limit adapt to load: a window that closes with a single
+request shrinks, so idle traffic stops paying for it, while windows that collect
+several requests grow back toward the configured maximum. A batch that fills up
+raises the batch limit, and batches that stay small lower it again.
+
+The batching thread is started by the first request in each process, so a
+worker forked after import (gunicorn --preload) gets its own, and it is
+restarted if it has died. A caller whose batch is not scored within the timeout
+scores its row inline instead of waiting on a stuck thread.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+import numpy as np
+
+# Number of recent queue-wait samples kept for the percentiles in stats()
+WAIT_SAMPLES = 2048
+
+MIN_BATCH_LIMIT = 8
+
+
+class ScoringCoalescer:
+    """Collects concurrent single-row scoring requests and scores them together"""
+
+    def __init__(self, score_features, window_ms=2.0, max_batch=64, min_window_ms=0.1, timeout_ms=1000.0):
+        self.score_features = score_features
+        self.timeout = timeout_ms / 1000.0
+        self.max_window = window_ms / 1000.0
+        self.min_window = min(min_window_ms / 1000.0, self.max_window)
+        self.max_batch = max(1, int(max_batch))
+
+        # Current adaptive settings
+        self.window = self.max_window
+        self.batch_limit = self.max_batch
+
+        self.requests = 0
+        self.batches = 0
+        self.full_batches = 0
+        self.inline_fallbacks = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._stats_lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def _start_thread(self):
+        """
+        Start the batching thread for this process. A forked worker does not
+        inherit the parent's thread, so it gets a fresh queue and stats too.
+        """
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    self._queue = queue.SimpleQueue()
+                    self._stats_lock = threading.Lock()
+                    self.requests = self.batches = self.full_batches = self.inline_fallbacks = 0
+                    self._waits.clear()
+                self._pid = os.getpid()
+            elif self._thread is not None:
+                print("Scoring coalescer thread died; restarting it")
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name='scoring-coalescer',
+                                            daemon=True)
+            self._thread.start()
+
+    def submit(self, features):
+        """Queue one length-30 feature row; returns a Future of (prediction, probabilities)"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._start_thread()
+        future = Future()
+        self._queue.put((features, time.perf_counter(), future))
+        return future
+
+    def score(self, features):
+        """Score one feature row, waiting for the batch it joins (inline if that takes too long)"""
+        future = self.submit(features)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._stats_lock:
+                self.inline_fallbacks += 1
+            predictions, proba = self.score_features(features[np.newaxis, :])
+            return predictions[0], proba[0]
+
+    def _collect(self, requests):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        first = requests.get()
+        batch = [first]
+        deadline = first[1] + self.window
+
+        while len(batch) < self.batch_limit:
+            try:
+                # Requests that queued up while the last batch was scoring join immediately
+                batch.append(requests.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _adapt(self, batch_size):
+        """Adjust the window and batch limit to the load the last batch saw"""
+        if batch_size >= self.batch_limit:
+            self.batch_limit = min(self.batch_limit * 2, self.max_batch)
+        elif batch_size == 1:
+            self.window = max(self.window / 2, self.min_window)
+        else:
+            self.window = min(self.window * 1.25, self.max_window)
+            if batch_size < self.batch_limit // 4:
+                self.batch_limit = max(self.batch_limit // 2, min(MIN_BATCH_LIMIT, self.max_batch))
+
+    def _run(self, requests):
+        while True:
+            batch = self._collect(requests)
+            started = time.perf_counter()
+
+            try:
+                features = np.stack([item[0] for item in batch])
+                predictions, proba = self.score_features(features)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for i, (_, _, future) in enumerate(batch):
+                    future.set_result((predictions[i], proba[i]))
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                if len(batch) >= self.batch_limit:
+                    self.full_batches += 1
+                self._waits.extend(started - submitted for _, submitted, _ in batch)
+
+            self._adapt(len(batch))
+
+    def stats(self):
+        """Throughput, adaptive settings and queue-wait percentiles (milliseconds)"""
+        with self._stats_lock:
+            waits = np.array(self._waits) * 1000.0
+            requests, batches, full_batches = self.requests, self.batches, self.full_batches
+            inline_fallbacks = self.inline_fallbacks
+
+        if len(waits):
+            p50, p95, p99 = np.percentile(waits, [50, 95, 99])
+            queue_wait = {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                          "p99": round(float(p99), 3), "max": round(float(waits.max()), 3)}
+        else:
+            queue_wait = {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+        return {
+            "requests": requests,
+            "batches": batches,
+            "full_batches": full_batches,
+            "inline_fallbacks": inline_fallbacks,
+            "mean_batch_size": round(requests / batches, 2) if batches else 0.0,
+            "window_ms": round(self.window * 1000.0, 3),
+            "batch_limit": self.batch_limit,
+            "max_window_ms": round(self.max_window * 1000.0, 3),
+            "max_batch": self.max_batch,
+            "queue_depth": self._queue.qsize(),
+            "queue_wait_ms": queue_wait
+        }
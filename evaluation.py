@@ -0,0 +1,253 @@
+"""
+Offline evaluation of the loaded fraud model.
+
+/api/model-evaluation and /api/model-info used to return fixed numbers. The
+evaluator scores a labeled creditcard.csv-format file (Time, V1-V28, Amount,
+Class) with the same compiled forest the API serves, one chunk at a time, so
+the dataset is never held in memory. Per chunk it only updates:
+
+- the confusion matrix at the API's decision rule (fraud when P(fraud) > 0.5)
+- histograms of P(fraud) for fraud and legitimate rows, from which the ROC and
+  precision-recall curves, ROC AUC and average precision are computed at the end
+
+When every leaf of the forest is pure (fully grown trees, as in the shipped
+model), each tree votes 0 or 1 and the fraud probabilities of a 100-tree forest
+are multiples of 0.01, so with the default 1000 bins the curves are exact. With
+impure leaves (e.g. min_samples_leaf > 1) probabilities can fall anywhere, and
+the curves and AUCs are exact only up to the bin width. Feature importances are
+the fitted forest's own feature_importances_ (mean decrease in impurity).
+
+The result is written to EVALUATION_DIR as JSON named after the SHA-256 of the
+model and scaler pickles (like the model artifact directory). The API serves it
+through an EvaluationCache, which rereads the file only when it changes, so a new
+evaluation shows up without a restart; a retrained model shows no numbers until
+it has been evaluated.
+
+    python evaluation.py creditcard.csv    # evaluate fraud_model.pkl + scaler.pkl
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from model_artifacts import ARTIFACT_ROOT, MODEL_FILE, SCALER_FILE, file_sha256, load_forest
+
+EVALUATION_ROOT = 'model_evaluations'
+
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+LABEL_COLUMN = 'Class'
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_BINS = 1000
+
+# Feature importances listed in the evaluation (all are kept in the file)
+TOP_FEATURES = 10
+
+
+def evaluation_path(root, model_sha256, scaler_sha256):
+    """Evaluation file for the model built from these pickles"""
+    return os.path.join(root, f"{model_sha256[:16]}-{scaler_sha256[:16]}.json")
+
+
+def score_bins(fraud_probability, n_bins):
+    """Histogram bin of each probability; bin i holds [i / n_bins, (i + 1) / n_bins)"""
+    # The epsilon keeps probabilities like 0.29 (= 28.999.../100) in their own bin
+    bins = (np.asarray(fraud_probability, dtype=np.float64) * n_bins + 1e-9).astype(np.intp)
+    return np.clip(bins, 0, n_bins - 1)
+
+
+def _ratio(numerator, denominator):
+    return float(numerator) / float(denominator) if denominator else None
+
+
+class EvaluationAccumulator:
+    """Confusion matrix and score histograms, updated chunk by chunk"""
+
+    def __init__(self, n_bins=DEFAULT_BINS):
+        self.n_bins = n_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # [actual, predicted]
+        self.fraud_hist = np.zeros(n_bins, dtype=np.int64)
+        self.legit_hist = np.zeros(n_bins, dtype=np.int64)
+
+    def update(self, labels, fraud_probability):
+        """Add one chunk: true labels (1 = fraud) and the model's P(fraud)"""
+        labels = np.asarray(labels).astype(bool)
+        # Same decision as forest.predict: argmax, ties go to legitimate
+        predicted = np.asarray(fraud_probability) > 0.5
+        self.confusion += np.bincount(labels * 2 + predicted, minlength=4).reshape(2, 2)
+        bins = score_bins(fraud_probability, self.n_bins)
+        self.fraud_hist += np.bincount(bins[labels], minlength=self.n_bins)
+        self.legit_hist += np.bincount(bins[~labels], minlength=self.n_bins)
+
+    def curves(self):
+        """
+        ROC and precision-recall points, one per occupied bin from the highest
+        threshold down (predict fraud when P(fraud) >= threshold).
+        """
+        occupied = np.flatnonzero(self.fraud_hist + self.legit_hist)[::-1]
+        true_positives = np.cumsum(self.fraud_hist[::-1])[self.n_bins - 1 - occupied]
+        false_positives = np.cumsum(self.legit_hist[::-1])[self.n_bins - 1 - occupied]
+        return occupied / self.n_bins, true_positives, false_positives
+
+    def result(self):
+        (tn, fp), (fn, tp) = self.confusion.tolist()
+        total = tn + fp + fn + tp
+        precision, recall = _ratio(tp, tp + fp), _ratio(tp, tp + fn)
+        f1 = None
+        if precision is not None and recall is not None:
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+        thresholds, true_positives, false_positives = self.curves()
+        positives, negatives = tp + fn, tn + fp
+        roc_curve = pr_curve = roc_auc = average_precision = None
+        if positives and negatives:
+            tpr = np.concatenate([[0.0], true_positives / positives])
+            fpr = np.concatenate([[0.0], false_positives / negatives])
+            roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0))
+            curve_precision = true_positives / (true_positives + false_positives)
+            average_precision = float(np.sum(np.diff(tpr) * curve_precision))
+            roc_curve = {"thresholds": thresholds.tolist(), "fpr": fpr[1:].tolist(), "tpr": tpr[1:].tolist()}
+            pr_curve = {"thresholds": thresholds.tolist(), "precision": curve_precision.tolist(),
+                        "recall": tpr[1:].tolist()}
+
+        return {
+            "rows": total,
+            "fraud_rows": positives,
+            "accuracy": _ratio(tp + tn, total),
+            "precision": precision,
+            "recall": recall,
+            "f1_score": f1,
+            "specificity": _ratio(tn, tn + fp),
+            "roc_auc": roc_auc,
+            "average_precision": average_precision,
+            "confusion_matrix": {
+                "true_negatives": tn,
+                "false_positives": fp,
+                "false_negatives": fn,
+                "true_positives": tp
+            },
+            "roc_curve": roc_curve,
+            "pr_curve": pr_curve
+        }
+
+
+def evaluate_csv(forest, path, chunk_size=DEFAULT_CHUNK_SIZE, n_bins=DEFAULT_BINS):
+    """Stream a labeled CSV through the forest; returns the EvaluationAccumulator result"""
+    import pandas as pd
+
+    accumulator = EvaluationAccumulator(n_bins)
+    dtypes = {col: np.float32 for col in FEATURE_COLUMNS}
+    dtypes[LABEL_COLUMN] = np.float32
+    # Same float32 parsing as /api/upload-csv?stream=1 (the default upload parses float64)
+    reader = pd.read_csv(path, usecols=FEATURE_COLUMNS + [LABEL_COLUMN], dtype=dtypes, chunksize=chunk_size)
+    fraud_index = list(forest.classes_).index(1)
+    for chunk in reader:
+        chunk = chunk[chunk[LABEL_COLUMN].notna()]
+        if chunk.empty:
+            continue
+        fraud_probability = forest.predict_proba(chunk[FEATURE_COLUMNS].to_numpy())[:, fraud_index]
+        accumulator.update(chunk[LABEL_COLUMN].to_numpy() == 1, fraud_probability)
+    return accumulator.result()
+
+
+def feature_importances(model_path):
+    """The fitted forest's feature_importances_, by feature name, largest first"""
+    import joblib
+    importances = joblib.load(model_path).feature_importances_
+    ranked = sorted(zip(FEATURE_COLUMNS, importances.tolist()), key=lambda item: item[1], reverse=True)
+    return {name: round(value, 6) for name, value in ranked}
+
+
+def evaluate_model(data_path, model_path=MODEL_FILE, scaler_path=SCALER_FILE, root=EVALUATION_ROOT,
+                   artifact_root=ARTIFACT_ROOT, chunk_size=DEFAULT_CHUNK_SIZE, n_bins=DEFAULT_BINS):
+    """Evaluate the model on data_path and write the result to root; returns (evaluation, path)"""
+    started = time.perf_counter()
+    forest, model = load_forest(model_path, scaler_path, artifact_root)
+    evaluation = evaluate_csv(forest, data_path, chunk_size=chunk_size, n_bins=n_bins)
+    importances = feature_importances(model_path)
+    evaluation.update({
+        "feature_importance": dict(list(importances.items())[:TOP_FEATURES]),
+        "feature_importances": importances,
+        "model": {
+            "model_sha256": model['model_sha256'],
+            "scaler_sha256": model['scaler_sha256'],
+            "n_estimators": forest.n_estimators,
+            "n_features": forest.n_features_in_
+        },
+        "dataset": {
+            "file": os.path.basename(data_path),
+            "sha256": file_sha256(data_path),
+            "bytes": os.path.getsize(data_path)
+        },
+        "evaluated_at": datetime.now().isoformat(),
+        "evaluation_seconds": round(time.perf_counter() - started, 3)
+    })
+
+    path = evaluation_path(root, model['model_sha256'], model['scaler_sha256'])
+    os.makedirs(root, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.evaluation-', dir=root)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(evaluation, f, indent=2)
+        # mkstemp creates 0600; the API may run as another user
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return evaluation, path
+
+
+class EvaluationCache:
+    """The loaded model's stored evaluation, reread when its file changes"""
+
+    def __init__(self, root, model_info):
+        self.path = evaluation_path(root, model_info['model_sha256'], model_info['scaler_sha256'])
+        self._state = (None, None)  # (file signature, evaluation)
+
+    def get(self):
+        """The evaluation, or None if the model has not been evaluated (one stat per call)"""
+        try:
+            info = os.stat(self.path)
+            signature = (info.st_mtime_ns, info.st_size)
+        except FileNotFoundError:
+            self._state = (None, None)
+            return None
+        cached_signature, evaluation = self._state
+        if signature != cached_signature:
+            # Written by evaluate_model through a rename, so never half-written
+            try:
+                with open(self.path, 'r') as f:
+                    evaluation = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read model evaluation {self.path}: {e}")
+                return None
+            self._state = (signature, evaluation)
+        return evaluation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the fraud model on a labeled creditcard.csv-format file")
+    parser.add_argument('data', help="CSV with Time, V1-V28, Amount and Class columns")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--scaler', default=SCALER_FILE)
+    parser.add_argument('--output-dir', default=os.environ.get('EVALUATION_DIR', EVALUATION_ROOT))
+    parser.add_argument('--artifact-dir', default=os.environ.get('MODEL_ARTIFACT_DIR', ARTIFACT_ROOT))
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS)
+    args = parser.parse_args(argv)
+
+    evaluation, path = evaluate_model(args.data, args.model, args.scaler, root=args.output_dir,
+                                      artifact_root=args.artifact_dir, chunk_size=args.chunk_size, n_bins=args.bins)
+    print(f"Evaluated {evaluation['rows']} rows ({evaluation['fraud_rows']} fraud) "
+          f"in {evaluation['evaluation_seconds']} s -> {path}")
+    for name in ('accuracy', 'precision', 'recall', 'f1_score', 'roc_auc', 'average_precision'):
+        value = evaluation[name]
+        print(f"  {name:18s} {'n/a' if value is None else f'{value:.4f}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Flat-array inference engine for the fraud RandomForest.
+
+sklearn's RandomForestClassifier.predict_proba validates its input, dispatches a
+job per tree and walks each tree separately, which dominates the cost of scoring
+a single transaction. CompiledForest copies every tree of a fitted forest into a
+handful of contiguous NumPy arrays once, at load time, and then walks all trees
+for all rows together with vectorized array operations. For large batches, where
+a compiled per-tree loop beats NumPy, it calls each tree's own apply() directly
+and skips the rest of sklearn's per-call machinery.
+
+Split decisions and leaf probabilities follow sklearn exactly (float32 features
+compared against float64 thresholds, NaN routed by missing_go_to_left, per-tree
+probabilities summed in tree order), so results are identical to
+model.predict_proba.
+
+A fitted StandardScaler can be folded into the forest as well: every split
+threshold is moved into raw-feature space at load time, so raw features are
+scored directly and give the same result as scaler.transform followed by
+model.predict_proba, bit for bit.
+"""
+import numpy as np
+
+# Rows scored per traversal pass; keeps the (tree, row) index arrays cache-sized
+MAX_ROWS_PER_PASS = 1024
+
+# From this many rows on, sklearn's compiled Tree.apply is faster than the NumPy walk
+NATIVE_MIN_ROWS = 256
+NATIVE_ROWS_PER_PASS = 8192
+
+
+class CompiledForest:
+    """A fitted RandomForestClassifier stored as flat node arrays"""
+
+    def __init__(self, feature, threshold, children, missing_go_to_left, is_leaf,
+                 value, roots, classes, n_features, native_trees=None, native_loader=None,
+                 scaler_mean=None, scaler_scale=None, lower_bound=None, upper_bound=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.is_leaf = is_leaf
+        self.value = value
+        self.class_values = np.ascontiguousarray(value.T)
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.native_trees = native_trees
+        # Builds native_trees on first use (memory-mapped artifacts, see model_artifacts)
+        self._native_loader = native_loader
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+        self.scaler_folded = lower_bound is not None
+        self.n_estimators = len(roots)
+        self.input_dtype = threshold.dtype
+        self.has_missing_routes = bool(missing_go_to_left.any())
+
+    @classmethod
+    def from_sklearn(cls, forest, scaler=None):
+        """
+        Compile a fitted sklearn RandomForestClassifier.
+        If a fitted StandardScaler is given it is folded into the thresholds and
+        the compiled forest takes unscaled (float64) features.
+        """
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        n_classes = len(forest.classes_)
+        features, thresholds, children, missing, leaves, values, roots = [], [], [], [], [], [], []
+        offset = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Children are stored as (left, right) pairs; leaves point at themselves
+            left = np.where(is_leaf, node_ids, tree.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset)
+            children.append(np.column_stack([left, right]).astype(np.intp))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            leaves.append(is_leaf)
+
+            if hasattr(tree, 'missing_go_to_left'):
+                missing.append(np.asarray(tree.missing_go_to_left, dtype=bool) & ~is_leaf)
+            else:
+                missing.append(np.zeros(n_nodes, dtype=bool))
+
+            # Per-tree class probabilities, normalized the way DecisionTreeClassifier does
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            offset += n_nodes
+
+        feature = np.concatenate(features)
+        threshold = float32_thresholds(np.concatenate(thresholds))
+        n_features = int(forest.n_features_in_)
+        scaler_args = {}
+
+        if scaler is not None:
+            mean, scale = scaler_parameters(scaler, n_features)
+            is_leaf = np.concatenate(leaves)
+            raw_threshold = np.zeros(len(threshold), dtype=np.float64)
+            raw_threshold[~is_leaf] = fold_thresholds(
+                threshold[~is_leaf], mean[feature[~is_leaf]], scale[feature[~is_leaf]]
+            )
+            threshold = raw_threshold
+
+            # Raw values whose scaled float32 value overflows are rejected, like sklearn does
+            float32_max = np.finfo(np.float32).max
+            scaler_args = dict(
+                scaler_mean=mean,
+                scaler_scale=scale,
+                lower_bound=fold_thresholds(np.full(n_features, -np.inf, dtype=np.float32), mean, scale),
+                upper_bound=fold_thresholds(np.full(n_features, float32_max, dtype=np.float32), mean, scale)
+            )
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            children=np.concatenate(children).ravel(),
+            missing_go_to_left=np.concatenate(missing),
+            is_leaf=np.concatenate(leaves),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            n_features=n_features,
+            native_trees=[estimator.tree_ for estimator in forest.estimators_],
+            **scaler_args
+        )
+
+    def _validate(self, X):
+        """Convert input the way sklearn does for tree models (2-D, no infinities)"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2:
+            raise ValueError(f"Expected 2D array, got {X.ndim}D array instead")
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the model is expecting {self.n_features_in_} features as input."
+            )
+        if not self.scorable_rows(X).all():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        return X
+
+    def scorable_rows(self, X):
+        """Boolean mask of the rows predict_proba accepts (no infinite or overflowing values)"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        if self.scaler_folded:
+            return ~((X <= self.lower_bound) | (X > self.upper_bound)).any(axis=1)
+        return ~np.isinf(X).any(axis=1)
+
+    def apply(self, X):
+        """Return the leaf node index reached in every tree, shape (n_estimators, n_rows)"""
+        X = self._validate(X)
+        return np.concatenate(
+            [self._apply(X[start:start + MAX_ROWS_PER_PASS]) for start in range(0, X.shape[0], MAX_ROWS_PER_PASS)]
+            or [np.empty((self.n_estimators, 0), dtype=np.intp)],
+            axis=1
+        )
+
+    def _apply(self, X):
+        n_rows = X.shape[0]
+        # Feature-major layout keeps the values a split reads close together
+        flat_X = np.ascontiguousarray(X.T).ravel()
+        feature_offsets = self.feature * n_rows
+        check_missing = self.has_missing_routes and bool(np.isnan(X).any())
+
+        # One entry per (tree, row); entries drop out of `active` once they reach a leaf
+        leaves = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows, dtype=np.intp), self.n_estimators)
+        active = np.arange(leaves.size, dtype=np.intp)
+        nodes = leaves.copy()
+
+        while active.size:
+            x = flat_X[feature_offsets[nodes] + rows[active]]
+            go_right = ~(x <= self.threshold[nodes])
+            if check_missing:
+                go_right &= ~(np.isnan(x) & self.missing_go_to_left[nodes])
+            nodes = self.children[2 * nodes + go_right]
+            leaves[active] = nodes
+
+            internal = ~self.is_leaf[nodes]
+            active = active[internal]
+            nodes = nodes[internal]
+
+        return leaves.reshape(self.n_estimators, n_rows)
+
+    def _apply_native(self, X):
+        if self.scaler_folded:
+            # Native trees still hold the original thresholds, so scale like sklearn does
+            X = (X - self.scaler_mean) / self.scaler_scale
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        leaves = np.empty((self.n_estimators, X.shape[0]), dtype=np.intp)
+        for i, tree in enumerate(self.native_trees):
+            leaves[i] = tree.apply(X)
+        return leaves + self.roots[:, np.newaxis]
+
+    def _native(self):
+        """sklearn trees for the large-batch path, or None"""
+        if self.native_trees is None and self._native_loader is not None:
+            loader, self._native_loader = self._native_loader, None
+            self.native_trees = loader()
+        return self.native_trees
+
+    def predict_proba(self, X):
+        """Class probabilities, identical to RandomForestClassifier.predict_proba"""
+        X = self._validate(X)
+        n_rows = X.shape[0]
+        # Accumulated class-major: one contiguous 1-D gather per class and tree
+        class_proba = np.zeros((len(self.classes_), n_rows), dtype=np.float64)
+
+        if n_rows >= NATIVE_MIN_ROWS and self._native() is not None:
+            apply_block, rows_per_pass = self._apply_native, NATIVE_ROWS_PER_PASS
+        else:
+            apply_block, rows_per_pass = self._apply, MAX_ROWS_PER_PASS
+
+        for start in range(0, n_rows, rows_per_pass):
+            stop = min(start + rows_per_pass, n_rows)
+            leaves = apply_block(X[start:stop])
+            # Accumulate tree by tree, in the same order as sklearn
+            for class_values, block in zip(self.class_values, class_proba[:, start:stop]):
+                for tree_leaves in leaves:
+                    block += class_values[tree_leaves]
+
+        class_proba /= self.n_estimators
+        return np.ascontiguousarray(class_proba.T)
+
+    def predict(self, X):
+        """Predicted class labels (argmax of predict_proba)"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def float32_thresholds(thresholds):
+    """
+    Round float64 split thresholds down to float32.
+    Trees compare float32 features against float64 thresholds; for any float32 x,
+    x <= t holds exactly when x <= (largest float32 not above t), so comparing in
+    float32 gives the same decisions without promoting every feature value.
+    """
+    rounded = thresholds.astype(np.float32)
+    too_high = rounded.astype(np.float64) > thresholds
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def scaler_parameters(scaler, n_features):
+    """Per-feature (mean, scale) of a fitted StandardScaler; identity where it is disabled"""
+    if scaler.n_features_in_ != n_features:
+        raise ValueError(
+            f"Scaler has {scaler.n_features_in_} features, but the model is expecting {n_features} features."
+        )
+    mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else np.zeros(n_features)
+    scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else np.ones(n_features)
+    return mean, scale
+
+
+def _ordered_keys(values):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = values.view(np.int64)
+    return np.where(bits < 0, bits ^ np.int64(0x7FFFFFFFFFFFFFFF), bits)
+
+
+def _from_ordered_keys(keys):
+    """Inverse of _ordered_keys"""
+    bits = np.where(keys < 0, keys ^ np.int64(0x7FFFFFFFFFFFFFFF), keys)
+    return bits.view(np.float64)
+
+
+def fold_thresholds(thresholds, mean, scale):
+    """
+    Move float32 split thresholds into raw-feature space.
+    sklearn scores raw x as float32((x - mean) / scale) <= threshold. That scaled
+    value never decreases as x grows, so the split is equivalent to x <= t for the
+    largest float64 t that still satisfies it. t is found by bisection over the
+    ordered bit patterns of float64, which makes the folded split exact rather
+    than an approximation like threshold * scale + mean.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    # Invariant: lo always satisfies the split (-inf does), hi never does (+inf)
+    lo = np.full(thresholds.shape, _ordered_keys(np.array([-np.inf]))[0], dtype=np.int64)
+    hi = np.full(thresholds.shape, _ordered_keys(np.array([np.inf]))[0], dtype=np.int64)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for _ in range(64):
+            mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+            x = _from_ordered_keys(mid)
+            scaled = ((x - mean) / scale).astype(np.float32)
+            satisfied = scaled <= thresholds
+            lo = np.where(satisfied, mid, lo)
+            hi = np.where(satisfied, hi, mid)
+
+    return _from_ordered_keys(lo)
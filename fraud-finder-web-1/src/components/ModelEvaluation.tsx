@@ -141,6 +141,17 @@ export const ModelEvaluation = () => {
           </div>
         </CardContent>
       </Card>
+      {/* Not evaluated yet: the server has no evaluation for the loaded model */}
+      {!evaluation && (
+        <Card className="bg-slate-800/50 border-blue-800/30 card-shadow rounded-xl">
+          <CardContent className="flex items-center justify-center py-12">
+            <AlertTriangle className="h-8 w-8 text-yellow-400 mr-3" />
+            <span className="text-blue-200">
+              The loaded model has not been evaluated yet. Run <code>python evaluation.py creditcard.csv</code> on the server to see its metrics.
+            </span>
+          </CardContent>
+        </Card>
+      )}
       {/* Detailed Evaluation */}
       {evaluation && (
         <Card className="bg-slate-800/50 border-blue-800/30 card-shadow rounded-xl">
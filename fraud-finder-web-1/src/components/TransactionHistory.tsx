@@ -1,6 +1,7 @@
 // TransactionHistory.tsx - User's Analysis History
 // -------------------------------------------------
 // Displays transaction analysis history with search, filter, and export features.
+// Search and filters run on the server; pages are loaded with a cursor.
 
 import { useState, useEffect } from "react";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
@@ -23,6 +24,10 @@ import {
 } from "lucide-react";
 import { toast } from "@/hooks/use-toast";
 
+// Records per page and search debounce
+const PAGE_SIZE = 50;
+const SEARCH_DEBOUNCE_MS = 300;
+
 interface TransactionHistoryProps {
   onTransactionSelect?: (transaction: Transaction) => void;
 }
@@ -31,47 +36,43 @@ export const TransactionHistory: React.FC<TransactionHistoryProps> = ({
   onTransactionSelect 
 }) => {
   const [transactions, setTransactions] = useState<Transaction[]>([]);
-  const [filteredTransactions, setFilteredTransactions] = useState<Transaction[]>([]);
+  const [totalCount, setTotalCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [filterStatus, setFilterStatus] = useState<"all" | "fraudulent" | "legitimate">("all");
   const [stats, setStats] = useState<RealTimeStats | null>(null);
 
-  // Load transaction history
+  // Load stats once
   useEffect(() => {
-    loadTransactionHistory();
     loadRealTimeStats();
   }, []);
 
-  // Filter transactions based on search and filter
+  // Reload the first page when the search or filter changes (search is debounced)
   useEffect(() => {
-    let filtered = transactions;
-
-    // Apply search filter
-    if (searchTerm) {
-      filtered = filtered.filter(t => 
-        t.merchant.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        t.location.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        t.id.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-    }
+    const timer = setTimeout(() => {
+      loadTransactionHistory();
+    }, searchTerm ? SEARCH_DEBOUNCE_MS : 0);
+    return () => clearTimeout(timer);
+  }, [searchTerm, filterStatus]);
 
-    // Apply status filter
-    if (filterStatus === "fraudulent") {
-      filtered = filtered.filter(t => !t.isGenuine);
-    } else if (filterStatus === "legitimate") {
-      filtered = filtered.filter(t => t.isGenuine);
-    }
-
-    setFilteredTransactions(filtered);
-  }, [transactions, searchTerm, filterStatus]);
+  const loadPage = (cursor: string | null) =>
+    fraudDetectionService.getTransactionHistory({
+      limit: PAGE_SIZE,
+      cursor,
+      status: filterStatus,
+      search: searchTerm,
+    });
 
   const loadTransactionHistory = async () => {
     try {
-      setLoading(true);
-      const response = await fraudDetectionService.getTransactionHistory();
+      setError(null);
+      const response = await loadPage(null);
       setTransactions(response.transactions || []);
+      setTotalCount(response.total_count || 0);
+      setNextCursor(response.next_cursor);
     } catch (err) {
       setError('Failed to load transaction history');
       console.error('Error loading history:', err);
@@ -80,6 +81,20 @@ export const TransactionHistory: React.FC<TransactionHistoryProps> = ({
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await loadPage(nextCursor);
+      setTransactions(current => [...current, ...(response.transactions || [])]);
+      setNextCursor(response.next_cursor);
+    } catch (err) {
+      console.error('Error loading more history:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadRealTimeStats = async () => {
     try {
       const response = await fraudDetectionService.getRealTimeStats();
@@ -246,19 +261,19 @@ export const TransactionHistory: React.FC<TransactionHistoryProps> = ({
 
             {/* Results Count */}
             <div className="text-sm text-blue-200">
-              Showing {filteredTransactions.length} of {transactions.length} transactions
+              Showing {transactions.length} of {totalCount} transactions
             </div>
 
             {/* Transaction List */}
             <div className="space-y-3 max-h-96 overflow-y-auto">
-              {filteredTransactions.length === 0 ? (
+              {transactions.length === 0 ? (
                 <div className="text-center py-8 text-blue-200">
                   <History className="h-12 w-12 mx-auto mb-4 text-gray-400" />
                   <p>No transactions found</p>
                   <p className="text-sm text-gray-400">Try adjusting your search or filters</p>
                 </div>
               ) : (
-                filteredTransactions.map((transaction) => (
+                transactions.map((transaction) => (
                   <Card 
                     key={transaction.id} 
                     className="bg-slate-700/30 border-slate-600/30 hover:bg-slate-700/50 cursor-pointer transition-colors"
@@ -308,6 +323,13 @@ export const TransactionHistory: React.FC<TransactionHistoryProps> = ({
                   </Card>
                 ))
               )}
+              {nextCursor && (
+                <div className="text-center">
+                  <Button onClick={loadMore} disabled={loadingMore} variant="outline" size="sm">
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </Button>
+                </div>
+              )}
             </div>
           </div>
         </CardContent>
@@ -57,17 +57,49 @@ export interface ModelEvaluation {
     feature: string;
     importance: number;
   }>;
-  rocAuc: number;
-  prAuc: number;
+  rocAuc: number | null;
+  prAuc: number | null;
+}
+
+// Raw /api/model-evaluation payload; evaluated is false until the server has
+// run evaluation.py for the loaded model
+interface ModelEvaluationResponse {
+  evaluated: boolean;
+  message?: string;
+  accuracy: number;
+  precision: number;
+  recall: number;
+  f1_score: number;
+  roc_auc: number | null;
+  average_precision: number | null;
+  confusion_matrix: {
+    true_negatives: number;
+    false_positives: number;
+    false_negatives: number;
+    true_positives: number;
+  };
+  feature_importance: Record<string, number>;
 }
 
 export interface TransactionHistory {
   transactions: Transaction[];
-  totalCount: number;
-  fraudulentCount: number;
-  genuineCount: number;
-  averageAmount: number;
-  totalAmount: number;
+  total_count: number;
+  next_cursor: string | null;
+  has_more: boolean;
+}
+
+// Server-side filters and cursor for one page of history
+export interface TransactionHistoryQuery {
+  limit?: number;
+  cursor?: string | null;
+  status?: "all" | "fraudulent" | "legitimate";
+  minRisk?: number;
+  maxRisk?: number;
+  minAmount?: number;
+  maxAmount?: number;
+  since?: string;
+  until?: string;
+  search?: string;
 }
 
 export interface RealTimeStats {
@@ -175,7 +207,8 @@ class FraudDetectionService {
     return response.json();
   }
 
-  async getModelEvaluation(): Promise<ModelEvaluation> {
+  // Resolves to null when the loaded model has not been evaluated yet
+  async getModelEvaluation(): Promise<ModelEvaluation | null> {
     const response = await fetch(`${API_BASE_URL}/model-evaluation`, {
       method: 'GET',
       headers: this.getHeaders(),
@@ -185,11 +218,50 @@ class FraudDetectionService {
       throw new Error('Failed to get model evaluation');
     }
 
-    return response.json();
+    const data: ModelEvaluationResponse = await response.json();
+    if (!data.evaluated) {
+      return null;
+    }
+    return {
+      accuracy: data.accuracy,
+      precision: data.precision,
+      recall: data.recall,
+      f1Score: data.f1_score,
+      confusionMatrix: {
+        trueNegatives: data.confusion_matrix.true_negatives,
+        falsePositives: data.confusion_matrix.false_positives,
+        falseNegatives: data.confusion_matrix.false_negatives,
+        truePositives: data.confusion_matrix.true_positives,
+      },
+      featureImportance: Object.entries(data.feature_importance || {}).map(
+        ([feature, importance]) => ({ feature, importance })
+      ),
+      rocAuc: data.roc_auc,
+      prAuc: data.average_precision,
+    };
   }
 
-  async getTransactionHistory(): Promise<TransactionHistory> {
-    const response = await fetch(`${API_BASE_URL}/transaction-history`, {
+  async getTransactionHistory(query: TransactionHistoryQuery = {}): Promise<TransactionHistory> {
+    const params = new URLSearchParams();
+    const values: Record<string, string | number | null | undefined> = {
+      limit: query.limit,
+      cursor: query.cursor,
+      status: query.status,
+      min_risk: query.minRisk,
+      max_risk: query.maxRisk,
+      min_amount: query.minAmount,
+      max_amount: query.maxAmount,
+      since: query.since,
+      until: query.until,
+      search: query.search,
+    };
+    for (const [key, value] of Object.entries(values)) {
+      if (value !== undefined && value !== null && value !== '') {
+        params.append(key, String(value));
+      }
+    }
+
+    const response = await fetch(`${API_BASE_URL}/transaction-history?${params.toString()}`, {
       method: 'GET',
       headers: this.getHeaders(),
     });
@@ -201,8 +273,13 @@ class FraudDetectionService {
     return response.json();
   }
 
-  async exportTransactionHistory(): Promise<Blob> {
-    const response = await fetch(`${API_BASE_URL}/export-history`, {
+  // The export is streamed as a file; format 'parquet' or 'arrow' needs pyarrow on the server
+  async exportTransactionHistory(format: 'csv' | 'parquet' | 'arrow' = 'csv', gzip = false): Promise<Blob> {
+    const params = new URLSearchParams({ format });
+    if (gzip) {
+      params.append('compress', 'gzip');
+    }
+    const response = await fetch(`${API_BASE_URL}/export-history?${params.toString()}`, {
       method: 'GET',
       headers: this.getHeaders(),
     });
@@ -0,0 +1,164 @@
+"""
+Streaming transaction-history export.
+
+The export endpoint used to build the whole CSV in a StringIO and return it as
+a string inside a JSON object. These generators produce the file piece by piece
+from batches of history records instead, so the response is a real file
+download whose memory use does not depend on the history size. CSV output can
+be gzip-compressed on the fly; Parquet and Arrow IPC output are available when
+pyarrow is installed.
+"""
+import csv
+import io
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: columnar export formats are disabled without it
+    pa = None
+    pq = None
+
+CSV_HEADER = [
+    'Transaction ID', 'Amount', 'Merchant', 'Location', 'Timestamp',
+    'Card Number', 'Fraud Probability', 'Risk Score', 'Is Genuine',
+    'Factors', 'Analyzed At'
+]
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def available_formats():
+    """Export formats supported by this installation"""
+    return ['csv'] + (['parquet', 'arrow'] if pa is not None else [])
+
+
+def csv_row(transaction):
+    """One history record as a CSV row (columns of CSV_HEADER)"""
+    return [
+        transaction.get('id', ''),
+        transaction.get('amount', ''),
+        transaction.get('merchant', ''),
+        transaction.get('location', ''),
+        transaction.get('timestamp', ''),
+        transaction.get('cardNumber', ''),
+        transaction.get('fraudProbability', ''),
+        transaction.get('riskScore', ''),
+        'Yes' if transaction.get('isGenuine', False) else 'No',
+        '; '.join(transaction.get('factors', [])),
+        transaction.get('analyzed_at', '')
+    ]
+
+
+def csv_chunks(batches):
+    """CSV text, one chunk per batch of records (the first chunk starts with the header)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEADER)
+
+    for batch in batches:
+        writer.writerows(csv_row(transaction) for transaction in batch)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+    if output.tell():
+        yield output.getvalue()  # header only, for an empty history
+
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _record_batch(batch):
+    """pyarrow RecordBatch for a list of history records"""
+    def number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    columns = {
+        'id': [str(t.get('id', '')) for t in batch],
+        'amount': [number(t.get('amount')) for t in batch],
+        'merchant': [str(t.get('merchant', '')) for t in batch],
+        'location': [str(t.get('location', '')) for t in batch],
+        'timestamp': [str(t.get('timestamp', '')) for t in batch],
+        'cardNumber': [str(t.get('cardNumber', '')) for t in batch],
+        'fraudProbability': [number(t.get('fraudProbability')) for t in batch],
+        'riskScore': [number(t.get('riskScore')) for t in batch],
+        'isGenuine': [bool(t.get('isGenuine', False)) for t in batch],
+        'factors': [[str(f) for f in t.get('factors', [])] for t in batch],
+        'analyzed_at': [str(t.get('analyzed_at', '')) for t in batch],
+    }
+    return pa.RecordBatch.from_pydict(columns, schema=arrow_schema())
+
+
+def arrow_schema():
+    return pa.schema([
+        ('id', pa.string()),
+        ('amount', pa.float64()),
+        ('merchant', pa.string()),
+        ('location', pa.string()),
+        ('timestamp', pa.string()),
+        ('cardNumber', pa.string()),
+        ('fraudProbability', pa.float64()),
+        ('riskScore', pa.float64()),
+        ('isGenuine', pa.bool_()),
+        ('factors', pa.list_(pa.string())),
+        ('analyzed_at', pa.string()),
+    ])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def columnar_chunks(batches, fmt):
+    """Parquet (one row group per batch) or Arrow IPC stream bytes for batches of records"""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow exports")
+
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, arrow_schema(), compression='snappy')
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_stream(sink, arrow_schema())
+        write = writer.write_batch
+
+    try:
+        for batch in batches:
+            write(_record_batch(batch))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,502 @@
+"""
+Transaction history storage.
+
+History used to live in one transaction_history.json holding every user's
+records: each scored transaction re-read and re-wrote the whole file, and two
+gunicorn workers writing at once could lose each other's records. HistoryStore
+keeps the records in an SQLite database in WAL mode instead. Appends are single
+inserts, per-user reads go through an index on (user_email, analyzed_at, id) and
+never touch other users' rows, and SQLite's locking serializes concurrent writers.
+HistoryWriter batches appends into group commits, optionally in the background.
+
+Per-user statistics for /api/real-time-stats are maintained incrementally in
+the same transactions: running totals (records, fraudulent records, sum of risk
+scores) and a ring of per-minute activity counts covering the last 24 hours.
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Records kept per user (older ones are trimmed on append)
+MAX_RECORDS_PER_USER = 1000
+
+# Recent-activity window covered by the per-minute ring (one slot per minute)
+ACTIVITY_WINDOW_MINUTES = 24 * 60
+
+EPOCH = datetime(1970, 1, 1)
+
+# How long a writer waits for another process's lock before failing (milliseconds)
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_email TEXT NOT NULL,
+    analyzed_at TEXT NOT NULL,
+    amount REAL,
+    risk_score REAL,
+    is_genuine INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_time ON transactions (user_email, analyzed_at, id);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_email, id);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_email TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    fraudulent INTEGER NOT NULL,
+    risk_sum REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_activity (
+    user_email TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    minute INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_email, slot)
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row_values(user_email, record):
+    """Column values for one history record; the full record is kept as JSON"""
+    return (
+        user_email,
+        str(record.get('analyzed_at', '')),
+        record.get('amount'),
+        record.get('riskScore'),
+        None if record.get('isGenuine') is None else int(bool(record.get('isGenuine'))),
+        json.dumps(record)
+    )
+
+
+def _number(value):
+    """Numeric value of a stored risk score (missing or malformed counts as 0)"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _epoch_minute(analyzed_at):
+    """Minute index of an analyzed_at timestamp (local time, as written), or None"""
+    try:
+        analyzed = datetime.fromisoformat(analyzed_at).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+    return int((analyzed - EPOCH).total_seconds() // 60)
+
+
+def encode_cursor(analyzed_at, row_id):
+    """Opaque pagination cursor for the position after (analyzed_at, id)"""
+    return base64.urlsafe_b64encode(json.dumps([analyzed_at, row_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(analyzed_at, id) from encode_cursor; raises ValueError for anything else"""
+    try:
+        analyzed_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(analyzed_at, str) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor")
+    return analyzed_at, row_id
+
+
+class HistoryStore:
+    """SQLite-backed per-user transaction history"""
+
+    def __init__(self, path, max_records_per_user=MAX_RECORDS_PER_USER):
+        self.path = path
+        self.max_records_per_user = max_records_per_user
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+        # Databases created before the stats tables existed get them built once
+        if connection.execute("SELECT 1 FROM store_meta WHERE key = 'stats_built'").fetchone() is None:
+            self.rebuild_stats()
+
+    def _connection(self):
+        """One connection per thread; transactions are managed explicitly"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            # WAL with synchronous=NORMAL survives process crashes; only an OS crash
+            # can drop the most recent commits
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def append(self, user_email, record):
+        """Add one record to a user's history"""
+        self.append_many([(user_email, record)])
+
+    def append_many(self, entries):
+        """Add (user_email, record) pairs in one transaction, then trim each user's history"""
+        if not entries:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(connection, entries)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _insert(self, connection, entries):
+        rows = [_row_values(user_email, record) for user_email, record in entries]
+        connection.executemany(
+            "INSERT INTO transactions (user_email, analyzed_at, amount, risk_score, is_genuine, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._update_stats(connection, [(row[0], row[1], row[3], row[4]) for row in rows], 1)
+        for user_email in {user_email for user_email, _ in entries}:
+            self._trim(connection, user_email)
+
+    def _trim(self, connection, user_email):
+        """Keep only the most recent max_records_per_user records of a user"""
+        cutoff = connection.execute(
+            "SELECT id FROM transactions WHERE user_email = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (user_email, self.max_records_per_user)
+        ).fetchone()
+        if cutoff is None:
+            return
+
+        trimmed = connection.execute(
+            "SELECT user_email, analyzed_at, risk_score, is_genuine FROM transactions "
+            "WHERE user_email = ? AND id <= ?", (user_email, cutoff[0])
+        ).fetchall()
+        connection.execute("DELETE FROM transactions WHERE user_email = ? AND id <= ?", (user_email, cutoff[0]))
+        self._update_stats(connection, trimmed, -1)
+
+    def _update_stats(self, connection, rows, sign):
+        """
+        Add (sign=1) or remove (sign=-1) (user_email, analyzed_at, risk_score, is_genuine)
+        rows from the running totals and the per-minute activity ring
+        """
+        totals = defaultdict(lambda: [0, 0, 0.0])
+        minutes = defaultdict(int)
+        oldest_minute = _epoch_minute(datetime.now().isoformat()) - ACTIVITY_WINDOW_MINUTES
+
+        for user_email, analyzed_at, risk_score, is_genuine in rows:
+            user_totals = totals[user_email]
+            user_totals[0] += 1
+            user_totals[1] += 1 if is_genuine == 0 else 0  # missing isGenuine counts as genuine
+            user_totals[2] += _number(risk_score)
+
+            minute = _epoch_minute(analyzed_at)
+            if minute is not None and minute > oldest_minute:
+                minutes[(user_email, minute)] += 1
+
+        connection.executemany(
+            "INSERT INTO user_stats (user_email, total, fraudulent, risk_sum) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_email) DO UPDATE SET total = total + excluded.total, "
+            "fraudulent = fraudulent + excluded.fraudulent, risk_sum = risk_sum + excluded.risk_sum",
+            [(user_email, sign * total, sign * fraudulent, sign * risk_sum)
+             for user_email, (total, fraudulent, risk_sum) in totals.items()]
+        )
+
+        if sign > 0:
+            # A slot still holding an older minute is reset before counting the new one
+            connection.executemany(
+                "INSERT INTO user_activity (user_email, slot, minute, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_email, slot) DO UPDATE SET "
+                "count = CASE WHEN minute = excluded.minute THEN count + excluded.count ELSE excluded.count END, "
+                "minute = excluded.minute WHERE excluded.minute >= minute",
+                [(user_email, minute % ACTIVITY_WINDOW_MINUTES, minute, count)
+                 for (user_email, minute), count in minutes.items()]
+            )
+        else:
+            connection.executemany(
+                "UPDATE user_activity SET count = count - ? WHERE user_email = ? AND slot = ? AND minute = ?",
+                [(count, user_email, minute % ACTIVITY_WINDOW_MINUTES, minute)
+                 for (user_email, minute), count in minutes.items()]
+            )
+
+    def user_stats(self, user_email):
+        """
+        Running totals for a user: total, fraudulent and risk_sum over the stored
+        records, and recent, the records analyzed in the last 24 hours (minute resolution)
+        """
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT total, fraudulent, risk_sum FROM user_stats WHERE user_email = ?", (user_email,)).fetchone()
+        total, fraudulent, risk_sum = row if row else (0, 0, 0.0)
+
+        oldest_minute = _epoch_minute(datetime.now().isoformat()) - ACTIVITY_WINDOW_MINUTES
+        recent = connection.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM user_activity WHERE user_email = ? AND minute > ?",
+            (user_email, oldest_minute)).fetchone()[0]
+
+        return {"total": total, "fraudulent": fraudulent, "risk_sum": risk_sum, "recent": recent}
+
+    def rebuild_stats(self):
+        """Recompute every user's totals and activity ring from the stored records"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM user_stats")
+            connection.execute("DELETE FROM user_activity")
+            rows = connection.execute(
+                "SELECT user_email, analyzed_at, risk_score, is_genuine FROM transactions").fetchall()
+            self._update_stats(connection, rows, 1)
+            connection.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('stats_built', ?)",
+                               (datetime.now().isoformat(),))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def user_history(self, user_email, newest_first=True):
+        """A user's records, most recently analyzed first (or in insertion order)"""
+        if newest_first:
+            query = ("SELECT data FROM transactions WHERE user_email = ? "
+                     "ORDER BY analyzed_at DESC, id DESC")
+        else:
+            query = "SELECT data FROM transactions WHERE user_email = ? ORDER BY id"
+        rows = self._connection().execute(query, (user_email,))
+        return [json.loads(data) for (data,) in rows]
+
+    def history_page(self, user_email, limit, cursor=None, is_genuine=None, min_risk=None, max_risk=None,
+                     min_amount=None, max_amount=None, since=None, until=None, search=None):
+        """
+        One page of a user's records, most recently analyzed first.
+
+        cursor is the next_cursor of the previous page. Filters are optional:
+        is_genuine (bool), risk-score and amount ranges (inclusive), an analyzed_at
+        window (since inclusive, until exclusive; ISO strings in the stored local
+        time) and a case-insensitive search over merchant, location and id.
+        Returns (records, next_cursor, total_matching); next_cursor is None on the last page.
+        """
+        conditions = ["user_email = ?"]
+        params = [user_email]
+
+        if is_genuine is not None:
+            conditions.append("COALESCE(is_genuine, 1) = ?")  # missing isGenuine counts as genuine
+            params.append(int(bool(is_genuine)))
+        for column, operator, value in (("risk_score", ">=", min_risk), ("risk_score", "<=", max_risk),
+                                        ("amount", ">=", min_amount), ("amount", "<=", max_amount),
+                                        ("analyzed_at", ">=", since), ("analyzed_at", "<", until)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        if search:
+            pattern = '%' + search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(" + " OR ".join(
+                f"lower(json_extract(data, '$.{field}')) LIKE ? ESCAPE '\\'" for field in ('merchant', 'location', 'id')) + ")")
+            params.extend([pattern] * 3)
+
+        connection = self._connection()
+        where = " AND ".join(conditions)
+        total = connection.execute(f"SELECT COUNT(*) FROM transactions WHERE {where}", params).fetchone()[0]
+
+        if cursor is not None:
+            analyzed_at, row_id = decode_cursor(cursor)
+            where += " AND (analyzed_at, id) < (?, ?)"
+            params = params + [analyzed_at, row_id]
+
+        # One extra row tells whether another page follows
+        rows = connection.execute(
+            f"SELECT id, analyzed_at, data FROM transactions WHERE {where} "
+            "ORDER BY analyzed_at DESC, id DESC LIMIT ?", params + [limit + 1]
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [json.loads(data) for _, _, data in rows], next_cursor, total
+
+    def iter_history(self, user_email, batch_size=1000):
+        """
+        A user's records in insertion order, yielded as lists of at most batch_size
+        records, so exports never hold the whole history in memory
+        """
+        connection = self._connection()
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                "SELECT id, data FROM transactions WHERE user_email = ? AND id > ? ORDER BY id LIMIT ?",
+                (user_email, last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [json.loads(data) for _, data in rows]
+            last_id = rows[-1][0]
+
+    def count(self, user_email):
+        """Number of records stored for a user"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM transactions WHERE user_email = ?", (user_email,)).fetchone()
+        return row[0]
+
+    def migrate_json(self, json_path):
+        """
+        One-time import of a legacy transaction_history.json ({email: [records]}).
+        The import runs in one transaction and is recorded in store_meta, so only one
+        worker performs it; the file is then renamed to <name>.migrated.
+        """
+        if not os.path.exists(json_path):
+            return 0
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            done = connection.execute(
+                "SELECT value FROM store_meta WHERE key = 'json_migrated'").fetchone()
+            imported = 0
+            if done is None:
+                with open(json_path, 'r') as f:
+                    history = json.load(f)
+                entries = [(user_email, record) for user_email, records in history.items()
+                           for record in records]
+                self._insert(connection, entries)
+                connection.execute(
+                    "INSERT INTO store_meta (key, value) VALUES ('json_migrated', ?)", (json_path,))
+                imported = len(entries)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except FileNotFoundError:
+            pass  # another worker renamed it first
+        return imported
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer in front of a HistoryStore.
+
+    durability='sync' commits each write() call as one group commit before it
+    returns, so a batch request costs one transaction instead of one per record.
+    durability='async' queues records in memory and a background thread commits
+    them every flush_interval_ms, or as soon as half of max_pending records are
+    queued. A crash can lose at most the queued records: when the queue reaches
+    max_pending the writer flushes inline instead of letting it grow. While
+    commits keep failing (database locked, disk full) the queue stays capped at
+    max_pending by dropping its oldest records, which are counted in stats().
+    """
+
+    def __init__(self, store, durability='sync', flush_interval_ms=100, max_pending=5000):
+        if durability not in ('sync', 'async'):
+            raise ValueError(f"durability must be 'sync' or 'async', got {durability!r}")
+        self.store = store
+        self.durability = durability
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max(1, int(max_pending))
+
+        self.flushes = 0
+        self.flushed_records = 0
+        self.errors = 0
+        self.dropped_records = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+
+        self._pending = []
+        self._lock = threading.Lock()
+        # Serializes commits so records reach the store in the order they were written
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+
+        if durability == 'async':
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, entries):
+        """
+        Record (user_email, record) pairs. In async mode records are accepted once
+        queued, so a failed inline flush is left to the flusher to retry.
+        """
+        if not entries:
+            return
+        if self.durability == 'sync':
+            with self._flush_lock:
+                self._commit(entries)
+            return
+
+        with self._lock:
+            self._pending.extend(entries)
+            depth = len(self._pending)
+            self.max_depth = max(self.max_depth, depth)
+        if depth >= self.max_pending:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"History flush failed, will retry: {e}")
+        elif depth * 2 >= self.max_pending:
+            self._wake.set()
+
+    def flush(self):
+        """Commit everything queued so far"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._commit(batch)
+            except Exception:
+                # Put the batch back in front of anything queued meanwhile and retry
+                # later, keeping only the newest max_pending records
+                with self._lock:
+                    self._pending[:0] = batch
+                    self.errors += 1
+                    dropped = len(self._pending) - self.max_pending
+                    if dropped > 0:
+                        del self._pending[:dropped]
+                        self.dropped_records += dropped
+                raise
+
+    def _commit(self, entries):
+        started = time.perf_counter()
+        self.store.append_many(entries)
+        with self._lock:
+            self.flushes += 1
+            self.flushed_records += len(entries)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000.0
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"History flush failed, will retry: {e}")
+
+    def close(self):
+        """Flush queued records (registered with atexit by the app)"""
+        self.flush()
+
+    def stats(self):
+        """Queue depth and flush counters"""
+        with self._lock:
+            return {
+                "durability": self.durability,
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self.max_depth,
+                "max_pending": self.max_pending,
+                "flush_interval_ms": round(self.flush_interval * 1000.0, 3),
+                "flushes": self.flushes,
+                "flushed_records": self.flushed_records,
+                "mean_flush_size": round(self.flushed_records / self.flushes, 2) if self.flushes else 0.0,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "errors": self.errors,
+                "dropped_records": self.dropped_records
+            }
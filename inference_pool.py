@@ -0,0 +1,138 @@
+"""
+Process-pool inference backend.
+
+Scoring runs inline in the Flask handler, so a large /api/analyze-batch or CSV
+upload holds the GIL for the whole forest evaluation and every other request on
+that worker waits. ProcessInferencePool forks a fixed set of scoring processes
+that inherit the already-loaded forest (its memory-mapped arrays stay shared,
+read-only), splits large feature matrices across them and hands the caller a
+result it waits on without holding the GIL.
+
+The workers are forked when the pool is created, which must happen at startup
+before the app starts its own background threads: a child forked from a
+multithreaded process can deadlock on a lock one of those threads held. For the
+same reason the pool is never re-forked later. If a worker dies, or the pool was
+created in another process (a parent that imported the app before forking, as
+with gunicorn --preload), large matrices are scored inline and stats() says why.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# Set in the parent before the workers are forked; each worker scores with its inherited copy
+_forest = None
+_barrier = None
+
+
+def _init_worker(barrier):
+    """Runs once in each worker: pay the first-call costs before taking requests"""
+    global _barrier
+    _barrier = barrier
+    _forest.predict_proba(np.zeros((1, _forest.n_features_in_)))
+
+
+def _score(features):
+    return _forest.predict_proba(features)
+
+
+def _ping(timeout):
+    """Held until every worker has taken one, so each worker is known to be up"""
+    _barrier.wait(timeout)
+    return os.getpid()
+
+
+class ProcessInferencePool:
+    """Scores large feature matrices on a pool of forked processes"""
+
+    def __init__(self, forest, workers=None, min_rows=1024):
+        global _forest
+        _forest = forest
+        self.forest = forest
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        # Matrices smaller than this are scored inline; larger ones are split into
+        # chunks of at least this many rows, one per worker at most
+        self.min_rows = max(1, int(min_rows))
+
+        self.tasks = 0
+        self.rows = 0
+        self.broken = False
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context('fork')  # ValueError where fork is unavailable
+
+        # Build the native trees (importing sklearn) once here so the workers inherit
+        # them, instead of each paying for the import and keeping a private copy
+        forest._native()
+        self._executor = self._start()
+
+    def _start(self):
+        barrier = self._context.Barrier(self.workers)
+        executor = ProcessPoolExecutor(self.workers, mp_context=self._context,
+                                       initializer=_init_worker, initargs=(barrier,))
+        # With fork, the first submission forks every worker at once
+        executor.submit(os.getpid)
+        return executor
+
+    def _usable_executor(self):
+        """The executor, or None if it is broken or belongs to the process this one was forked from"""
+        if self._pid != os.getpid():
+            return None
+        return self._executor
+
+    def warm_up(self, timeout=60.0):
+        """Wait until every worker has initialized; returns their pids (none if the pool is unusable)"""
+        executor = self._usable_executor()
+        if executor is None:
+            return []
+        futures = [executor.submit(_ping, timeout) for _ in range(self.workers)]
+        return sorted(future.result(timeout) for future in futures)
+
+    def predict_proba(self, features):
+        """Class probabilities for an (N, n_features) matrix, like CompiledForest.predict_proba"""
+        n_rows = len(features)
+        executor = self._usable_executor()
+        if n_rows < self.min_rows or executor is None:
+            return self.forest.predict_proba(features)
+
+        chunks = max(1, min(self.workers, n_rows // self.min_rows))
+        try:
+            futures = [executor.submit(_score, part) for part in np.array_split(features, chunks)]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory). Forking a new pool from this
+            # (by now multithreaded) process could deadlock, so score inline from now on
+            self._close(executor)
+            return self.forest.predict_proba(features)
+
+        with self._lock:
+            self.tasks += len(futures)
+            self.rows += n_rows
+        return results[0] if chunks == 1 else np.concatenate(results)
+
+    def _close(self, broken):
+        with self._lock:
+            if self._executor is not broken:
+                return  # another thread already closed it
+            self._executor = None
+            self.broken = True
+        print('Inference pool broken; scoring inline until this worker is restarted')
+        broken.shutdown(wait=False)
+
+    def shutdown(self):
+        executor = self._usable_executor()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "min_rows": self.min_rows,
+                "tasks": self.tasks,
+                "rows": self.rows,
+                "broken": self.broken,
+                "inherited": self._pid != os.getpid()
+            }
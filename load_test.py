@@ -0,0 +1,421 @@
+"""
+Concurrency load test for the fraud detection API.
+
+Drives the app with a mix of requests at one or more concurrency levels and
+reports throughput, error rate and p50/p95/p99 latency per request type, plus the
+server-side stage timings the app returns in Server-Timing headers. Targets:
+
+    python load_test.py                                  # in-process (Flask test client)
+    python load_test.py --url http://127.0.0.1:5000      # a running server
+    python load_test.py --spawn                          # start `python app.py` for the run
+    python load_test.py --spawn --server-cmd "gunicorn -w 4 -b 127.0.0.1:{port} app:app"
+
+Closed-loop mode: each of --concurrency clients sends the next request as soon as
+the previous one returns, picking its type from --mix (single transactions,
+batches, CSV uploads and authenticated history reads).
+
+Replay mode (--replay creditcard.csv --rate 200) sends the dataset's rows as
+/api/analyze-transaction requests at a fixed rate. Latency there is measured
+from each request's scheduled send time, so it includes any queueing when the
+app cannot keep up.
+
+In-process runs share one Python process (and its GIL) with the clients, so
+use --spawn or --url to size a real deployment. They keep the users, history
+and model artifact they create in a temporary directory unless USERS_FILE,
+USERS_DB, TRANSACTION_HISTORY_DB or MODEL_ARTIFACT_DIR are set.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+from bench_scoring import import_app, synthetic_transactions
+from warmup import synthetic_features
+
+DEFAULT_MIX = 'single=60,batch=15,csv=5,history=20'
+REQUEST_KINDS = ('single', 'batch', 'csv', 'history')
+
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+LOADTEST_EMAIL = 'loadtest@example.com'
+LOADTEST_PASSWORD = 'loadtest-password'
+
+
+def parse_mix(text):
+    """'single=60,batch=20' -> [('single', 60.0), ('batch', 20.0)]"""
+    mix = []
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request type in mix: {kind!r} (expected one of {', '.join(REQUEST_KINDS)})")
+        mix.append((kind, float(weight or 1)))
+    if not mix or sum(weight for _, weight in mix) <= 0:
+        raise ValueError("The request mix needs at least one positive weight")
+    return mix
+
+
+def parse_server_timing(header):
+    """'score;dur=1.2, persist;dur=0.4' -> {'score': 1.2, 'persist': 0.4} (ms)"""
+    timings = {}
+    for metric in (header or '').split(','):
+        name, *params = [item.strip() for item in metric.split(';')]
+        for param in params:
+            key, _, value = param.partition('=')
+            if name and key == 'dur':
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+class InProcessTransport:
+    """Requests through Flask's test client, one client per thread"""
+
+    def __init__(self):
+        self.app = import_app().app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, csv_text=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        kwargs = {"method": method, "headers": headers or {}}
+        if json_body is not None:
+            kwargs["json"] = json_body
+        if csv_text is not None:
+            kwargs["data"] = {"file": (io.BytesIO(csv_text.encode('utf-8')), 'loadtest.csv')}
+            kwargs["content_type"] = 'multipart/form-data'
+        # Closing the response finishes a streamed one, which is when the app records its metrics
+        with client.open(path, **kwargs) as response:
+            return response.status_code, response.headers.get('Server-Timing'), response.get_data()
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server (standard library only)"""
+
+    def __init__(self, base_url, timeout=60.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, json_body=None, csv_text=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if csv_text is not None:
+            boundary = uuid.uuid4().hex
+            data = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="loadtest.csv"\r\n'
+                    f'Content-Type: text/csv\r\n\r\n{csv_text}\r\n--{boundary}--\r\n').encode('utf-8')
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers.get('Server-Timing'), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Server-Timing'), e.read()
+
+
+def authenticate(transport, email=LOADTEST_EMAIL, password=LOADTEST_PASSWORD):
+    """Register (or log in) the load-test user; returns the Authorization headers"""
+    status, _, _ = transport.request('POST', '/api/register', json_body={
+        "email": email, "password": password, "name": "Load Test"})
+    if status not in (200, 201, 409):
+        raise RuntimeError(f"Registering the load-test user failed with HTTP {status}")
+
+    status, _, body = transport.request('POST', '/api/login', json_body={"email": email, "password": password})
+    if status != 200:
+        raise RuntimeError(f"Logging in the load-test user failed with HTTP {status}")
+    return {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+
+
+class Workload:
+    """Builds and sends each type of request"""
+
+    def __init__(self, transport, auth_headers, batch_size=100, csv_rows=1000, seed=0):
+        self.transport = transport
+        self.headers = auth_headers
+        self.batch_size = batch_size
+        self.transactions = [{
+            "amount": amount, "merchant": merchant, "location": location,
+            "cardNumber": card_number, "timestamp": timestamp
+        } for amount, merchant, location, card_number, timestamp in synthetic_transactions(5000, seed=seed)]
+
+        frame = synthetic_features(csv_rows, seed=seed)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(FEATURE_COLUMNS)
+        writer.writerows(frame.round(6).tolist())
+        self.csv_text = output.getvalue()
+
+    def send(self, kind, i):
+        """Send request number i of the given type; returns (status, Server-Timing header, body)"""
+        if kind == 'single':
+            return self.transport.request('POST', '/api/analyze-transaction', headers=self.headers,
+                                          json_body=self.transactions[i % len(self.transactions)])
+        if kind == 'batch':
+            start = (i * self.batch_size) % len(self.transactions)
+            batch = [self.transactions[(start + k) % len(self.transactions)] for k in range(self.batch_size)]
+            return self.transport.request('POST', '/api/analyze-batch', headers=self.headers,
+                                          json_body={"transactions": batch})
+        if kind == 'csv':
+            return self.transport.request('POST', '/api/upload-csv', headers=self.headers, csv_text=self.csv_text)
+        return self.transport.request('GET', '/api/transaction-history?limit=50', headers=self.headers)
+
+    def replay_row(self, row):
+        """Send one creditcard.csv row (Time, V1-V28, Amount) as a model-input transaction"""
+        return self.transport.request('POST', '/api/analyze-transaction', headers=self.headers, json_body={
+            "time": row[0], "v_values": row[1:29], "amount": row[29]})
+
+
+class Recorder:
+    """Thread-safe collection of (kind, latency_ms, ok, server timings) samples"""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, started, result):
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        if isinstance(result, Exception):
+            sample = (kind, latency_ms, False, {})
+        else:
+            status, server_timing, _ = result
+            sample = (kind, latency_ms, 200 <= status < 300, parse_server_timing(server_timing))
+        with self._lock:
+            self.samples.append(sample)
+
+
+def _send(workload, kind, i):
+    try:
+        return workload.send(kind, i)
+    except Exception as e:
+        return e
+
+
+def run_closed_loop(workload, mix, concurrency, duration=10.0, max_requests=None, seed=0):
+    """concurrency clients send requests back to back for duration seconds; returns (samples, elapsed)"""
+    recorder = Recorder()
+    kinds = [kind for kind, _ in mix]
+    weights = [weight for _, weight in mix]
+    counter = iter(range(10 ** 12))
+    counter_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            with counter_lock:
+                i = next(counter)
+            if max_requests is not None and i >= max_requests:
+                return
+            kind = rng.choices(kinds, weights)[0]
+            started = time.perf_counter()
+            recorder.record(kind, started, _send(workload, kind, i))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.samples, time.perf_counter() - started
+
+
+def read_replay_rows(path, limit=None):
+    """Rows of a creditcard.csv-format file as [Time, V1..V28, Amount] float lists, streamed"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        try:
+            columns = [header.index(name) for name in FEATURE_COLUMNS]
+        except ValueError:
+            raise ValueError(f"{path} needs the columns {', '.join(FEATURE_COLUMNS)}")
+        for n, row in enumerate(reader):
+            if limit is not None and n >= limit:
+                return
+            yield [float(row[column]) for column in columns]
+
+
+def run_replay(workload, rows, rate, concurrency, max_seconds=None):
+    """Send rows at rate requests/s using concurrency senders; returns (samples, elapsed)"""
+    recorder = Recorder()
+
+    def send(row, scheduled):
+        try:
+            result = workload.replay_row(row)
+        except Exception as e:
+            result = e
+        recorder.record('replay', scheduled, result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for n, row in enumerate(rows):
+            scheduled = started + n / rate
+            if max_seconds is not None and scheduled - started > max_seconds:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, row, scheduled)
+    return recorder.samples, time.perf_counter() - started
+
+
+def summarize_samples(samples, elapsed):
+    """Throughput, error rate, latency percentiles and server stage timings"""
+    latencies = np.array([latency for _, latency, _, _ in samples]) if samples else np.zeros(0)
+    errors = sum(1 for _, _, ok, _ in samples if not ok)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 6) if samples else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed > 0 else 0.0
+    }
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update(mean_ms=round(float(latencies.mean()), 3), p50_ms=round(float(p50), 3),
+                       p95_ms=round(float(p95), 3), p99_ms=round(float(p99), 3))
+
+    stages = {}
+    for _, _, _, timings in samples:
+        for stage, duration in timings.items():
+            stages.setdefault(stage, []).append(duration)
+    summary["server_timing"] = {
+        stage: {"count": len(durations), "mean_ms": round(float(np.mean(durations)), 3),
+                "p95_ms": round(float(np.percentile(durations, 95)), 3)}
+        for stage, durations in sorted(stages.items())
+    }
+    return summary
+
+
+def level_report(samples, elapsed):
+    """Overall and per-request-type summaries for one run"""
+    by_kind = {}
+    for sample in samples:
+        by_kind.setdefault(sample[0], []).append(sample)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize_samples(samples, elapsed),
+        "by_type": {kind: summarize_samples(kind_samples, elapsed) for kind, kind_samples in sorted(by_kind.items())}
+    }
+
+
+def print_level(label, report):
+    print(f"\n--- {label} ({report['elapsed_s']} s) ---")
+    rows = [('overall', report['overall'])] + list(report['by_type'].items())
+    for name, summary in rows:
+        if not summary['requests']:
+            continue
+        print(f"{name:<10} {summary['requests']:>7} req  {summary['throughput_rps']:>9.1f} req/s  "
+              f"errors {summary['error_rate'] * 100:>5.1f}%  p50 {summary['p50_ms']:>9.2f} ms  "
+              f"p95 {summary['p95_ms']:>9.2f} ms  p99 {summary['p99_ms']:>9.2f} ms")
+    for stage, timing in report['overall']['server_timing'].items():
+        print(f"  server {stage:<20} mean {timing['mean_ms']:>9.3f} ms  p95 {timing['p95_ms']:>9.3f} ms  (n={timing['count']})")
+
+
+def spawn_server(port, command=None, ready_timeout=120.0):
+    """Start the app (python app.py, or command with {port}) and wait for /api/ready"""
+    env = dict(os.environ, PORT=str(port))
+    args = command.format(port=port).split() if command else [sys.executable, 'app.py']
+    process = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + ready_timeout
+    url = f'http://127.0.0.1:{port}/api/ready'
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before becoming ready")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return process
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"Server was not ready within {ready_timeout} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrency load test for the fraud detection API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help="base URL of a running server (default: in-process test client)")
+    target.add_argument('--spawn', action='store_true', help="start the server for the run")
+    parser.add_argument('--server-cmd', help="command for --spawn, with {port} (default: python app.py)")
+    parser.add_argument('--port', type=int, default=5055, help="port for --spawn (default: %(default)s)")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated client counts (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per level (default: %(default)s)")
+    parser.add_argument('--requests', type=int, help="stop each level after this many requests")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="request mix weights (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=100, help="transactions per batch request")
+    parser.add_argument('--csv-rows', type=int, default=1000, help="rows per CSV upload")
+    parser.add_argument('--replay', help="creditcard.csv-format file to replay instead of the mix")
+    parser.add_argument('--rate', type=float, default=100.0, help="replay requests per second (default: %(default)s)")
+    parser.add_argument('--limit', type=int, help="replay at most this many rows")
+    parser.add_argument('--output', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(',') if level]
+    mix = parse_mix(args.mix)
+
+    server = None
+    try:
+        if args.spawn:
+            server = spawn_server(args.port, args.server_cmd)
+            transport = HttpTransport(f'http://127.0.0.1:{args.port}')
+        elif args.url:
+            transport = HttpTransport(args.url)
+        else:
+            transport = InProcessTransport()
+
+        workload = Workload(transport, authenticate(transport), batch_size=args.batch_size, csv_rows=args.csv_rows)
+        target_name = args.url or ('spawned server' if args.spawn else 'in-process')
+        print(f"=== Load Test ({target_name}) ===")
+
+        results = []
+        for concurrency in levels:
+            if args.replay:
+                rows = read_replay_rows(args.replay, args.limit)
+                samples, elapsed = run_replay(workload, rows, args.rate, concurrency, max_seconds=args.duration)
+                label = f"replay at {args.rate:g}/s, concurrency {concurrency}"
+            else:
+                samples, elapsed = run_closed_loop(workload, mix, concurrency, args.duration, args.requests)
+                label = f"concurrency {concurrency}"
+            report = level_report(samples, elapsed)
+            report["concurrency"] = concurrency
+            print_level(label, report)
+            results.append(report)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "target": target_name,
+                "mode": "replay" if args.replay else "mix",
+                "mix": dict(mix),
+                "rate": args.rate if args.replay else None,
+                "levels": results
+            }, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
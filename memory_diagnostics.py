@@ -0,0 +1,145 @@
+"""
+Memory accounting and tracemalloc snapshots.
+
+Workers were OOM-killed during large CSV uploads and history exports with no
+way to tell which allocations were responsible. Two tools:
+
+- Per-request accounting (recorded by metrics.Metrics next to latency): how
+  much each request raised the process's peak RSS, and, while tracemalloc is
+  tracing, the Python heap peak above its level when the request started. Both
+  are process-wide, so with concurrent requests in one worker a request can be
+  charged for its neighbours' allocations.
+- SnapshotStore, behind the admin endpoints: takes tracemalloc snapshots and
+  reports the top allocating source lines, or the lines that grew most since an
+  earlier snapshot, optionally only for app.py or the project's own modules.
+
+Snapshots are kept in the worker that took them, so with several workers the
+diff must reach the same worker (its pid is in every response).
+"""
+import itertools
+import linecache
+import os
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: no peak-RSS accounting
+    resource = None
+
+# Histogram buckets for per-request byte counts: 64 KiB ... 4 GiB
+BYTE_BUCKETS = tuple(float(4 ** k * 65536) for k in range(9))
+
+# ru_maxrss is in KiB on Linux and bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+SNAPSHOT_SCOPES = ('app', 'project', 'all')
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc), or None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_status():
+    """RSS and tracemalloc figures for this process"""
+    status = {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "tracing": tracemalloc.is_tracing()
+    }
+    if status["tracing"]:
+        current, peak = tracemalloc.get_traced_memory()
+        status.update(traced_bytes=current, traced_peak_bytes=peak,
+                      traceback_limit=tracemalloc.get_traceback_limit())
+    return status
+
+
+class SnapshotStore:
+    """tracemalloc snapshots of this process, kept for diffing"""
+
+    def __init__(self, project_root, app_file='app.py', max_snapshots=5):
+        self.project_root = os.path.abspath(project_root)
+        self.app_file = os.path.join(self.project_root, app_file)
+        self.max_snapshots = max_snapshots
+        self._snapshots = {}  # id -> (taken_at, snapshot)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _filters(self, scope):
+        if scope not in SNAPSHOT_SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(SNAPSHOT_SCOPES)}")
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+        if scope == 'app':
+            filters.append(tracemalloc.Filter(True, self.app_file))
+        elif scope == 'project':
+            filters.append(tracemalloc.Filter(True, os.path.join(self.project_root, '*')))
+        return filters
+
+    def take(self, frames=1):
+        """Snapshot the heap (starting tracemalloc first if needed); returns (id, snapshot)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (datetime.now().isoformat(), snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+        return snapshot_id, snapshot
+
+    def get(self, snapshot_id):
+        with self._lock:
+            if snapshot_id not in self._snapshots:
+                raise KeyError(snapshot_id)
+            return self._snapshots[snapshot_id]
+
+    def latest_id(self):
+        with self._lock:
+            return max(self._snapshots) if self._snapshots else None
+
+    def ids(self):
+        with self._lock:
+            return [{"id": snapshot_id, "taken_at": taken_at}
+                    for snapshot_id, (taken_at, _) in sorted(self._snapshots.items())]
+
+    def top(self, snapshot, scope='app', limit=20):
+        """Largest allocations by source line"""
+        stats = snapshot.filter_traces(self._filters(scope)).statistics('lineno')
+        return [self._line(stat.traceback[0], size=stat.size, count=stat.count) for stat in stats[:limit]]
+
+    def diff(self, base_snapshot, snapshot, scope='app', limit=20):
+        """Source lines whose allocations changed most between two snapshots"""
+        filters = self._filters(scope)
+        stats = snapshot.filter_traces(filters).compare_to(base_snapshot.filter_traces(filters), 'lineno')
+        return [self._line(stat.traceback[0], size=stat.size, count=stat.count,
+                           size_diff=stat.size_diff, count_diff=stat.count_diff)
+                for stat in stats[:limit]]
+
+    def _line(self, frame, **figures):
+        filename = frame.filename
+        if filename.startswith(self.project_root + os.sep):
+            filename = os.path.relpath(filename, self.project_root)
+        return {"file": filename, "line": frame.lineno,
+                "code": linecache.getline(frame.filename, frame.lineno).strip(), **figures}
+
+    def stop(self):
+        """Stop tracing and drop every snapshot"""
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
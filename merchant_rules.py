@@ -0,0 +1,161 @@
+"""
+Merchant and location text rules shared by the hybrid detector and V-value synthesis.
+
+Both consumers used to rebuild the merchant whitelist and keyword lists on every
+call, scan the whitelist linearly and run a separate substring loop per keyword
+list. MerchantAnalyzer is built once at startup: the whitelist is a frozenset and
+all keyword lists are compiled into one Aho-Corasick automaton, so a single pass
+over the merchant (and location) string finds every keyword of every class.
+"""
+from collections import deque, namedtuple
+from functools import lru_cache
+
+# Known legitimate online merchants (whitelist)
+LEGITIMATE_MERCHANTS = frozenset([
+    'netflix.com', 'amazon.com', 'spotify.com', 'youtube.com', 'google.com',
+    'apple.com', 'microsoft.com', 'facebook.com', 'twitter.com', 'instagram.com',
+    'linkedin.com', 'github.com', 'stackoverflow.com', 'reddit.com', 'discord.com',
+    'zoom.us', 'slack.com', 'dropbox.com', 'googleplay.com', 'itunes.com',
+    'steam.com', 'origin.com', 'battle.net', 'playstation.com', 'xbox.com',
+    'nintendo.com', 'hulu.com', 'disneyplus.com', 'hbo.com', 'paramount.com',
+    'peacock.com', 'crunchyroll.com', 'funimation.com', 'vrv.com', 'roku.com',
+    'walmart.com', 'target.com', 'bestbuy.com', 'homedepot.com', 'lowes.com',
+    'costco.com', 'samsclub.com', 'kroger.com', 'safeway.com', 'albertsons.com',
+    'publix.com', 'wegmans.com', 'traderjoes.com', 'wholefoods.com', 'sprouts.com',
+    'starbucks.com', 'mcdonalds.com', 'burgerking.com', 'wendys.com', 'tacobell.com',
+    'dominos.com', 'pizzahut.com', 'subway.com', 'chipotle.com', 'panera.com',
+    'chickfila.com', 'kfc.com', 'popeyes.com', 'arbys.com', 'sonic.com',
+    'dunkindonuts.com', 'krispykreme.com', 'cinnabon.com', 'baskinrobbins.com',
+    'coldstone.com', 'benjerry.com', 'haagendazs.com', 'talenti.com', 'bluebell.com'
+])
+
+# Keyword classes matched as substrings of the lower-cased merchant name
+SUSPICIOUS_MERCHANT_WORDS = ['unknown', 'test', 'suspicious', 'fraud', 'fake', 'invalid', 'dummy', 'sample']
+
+# Made-up sounding names (common patterns)
+SUSPICIOUS_PATTERNS = [
+    'inc', 'corp', 'llc', 'ltd', 'co', 'company', 'business', 'enterprise',
+    'group', 'associates', 'partners', 'services', 'solutions', 'tech',
+    'digital', 'online', 'web', 'net', 'cyber', 'virtual'
+]
+
+GENERIC_NAMES = ['store', 'shop', 'market', 'mart', 'center', 'place', 'spot']
+
+# Domain endings that exempt an all-lower/all-upper name from the format check
+DOMAIN_SUFFIXES = ['.com', '.org', '.net']
+
+# Keyword classes matched as substrings of the lower-cased location
+FOREIGN_INDICATORS = ['international', 'foreign', 'overseas', 'abroad']
+LOCAL_INDICATORS = ['local']
+
+MERCHANT_KEYWORDS = {
+    'suspicious': SUSPICIOUS_MERCHANT_WORDS,
+    'pattern': SUSPICIOUS_PATTERNS,
+    'generic': GENERIC_NAMES,
+    'domain': DOMAIN_SUFFIXES,
+}
+
+LOCATION_KEYWORDS = {
+    'foreign': FOREIGN_INDICATORS,
+    'local': LOCAL_INDICATORS,
+}
+
+# Distinct (merchant, location) pairs whose analysis is kept in memory
+ANALYSIS_CACHE_SIZE = 4096
+
+MerchantFeatures = namedtuple('MerchantFeatures', [
+    'whitelisted',          # exact match against LEGITIMATE_MERCHANTS
+    'suspicious_keywords',  # SUSPICIOUS_MERCHANT_WORDS found in the name
+    'pattern_count',        # number of distinct SUSPICIOUS_PATTERNS found in the name
+    'short_name',           # three characters or fewer
+    'unusual_format',       # all lower or all upper case and not a domain
+    'repeated_characters',  # longer than three characters but at most two distinct ones
+    'has_digits',
+    'generic_name',         # contains a GENERIC_NAMES word and is at most ten characters
+    'foreign_location',     # location contains a FOREIGN_INDICATORS word
+    'local_location',       # location contains 'local'
+    'merchant_keywords',    # every keyword found in the name
+    'location_keywords',    # every keyword found in the location
+])
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every (class, keyword) contained in a string"""
+
+    def __init__(self, keyword_classes):
+        transitions = [{}]
+        outputs = [set()]
+
+        # Trie of all keywords
+        for keyword_class, keywords in keyword_classes.items():
+            for keyword in keywords:
+                state = 0
+                for char in keyword:
+                    if char not in transitions[state]:
+                        transitions.append({})
+                        outputs.append(set())
+                        transitions[state][char] = len(transitions) - 1
+                    state = transitions[state][char]
+                outputs[state].add((keyword_class, keyword))
+
+        # Failure links, folded into the transition table so matching never backtracks
+        fail = [0] * len(transitions)
+        delta = [dict(transitions[0])] + [None] * (len(transitions) - 1)
+        pending = deque(transitions[0].values())
+        while pending:
+            state = pending.popleft()
+            outputs[state] |= outputs[fail[state]]
+            delta[state] = dict(delta[fail[state]])
+            for char, child in transitions[state].items():
+                fail[child] = delta[fail[state]].get(char, 0)
+                delta[state][char] = child
+                pending.append(child)
+
+        self.delta = delta
+        self.outputs = [frozenset(output) for output in outputs]
+
+    def find(self, text):
+        """Return the set of (class, keyword) pairs occurring anywhere in text"""
+        delta = self.delta
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+
+class MerchantAnalyzer:
+    """Computes the merchant and location features used by the rule-based scorers"""
+
+    def __init__(self, cache_size=ANALYSIS_CACHE_SIZE):
+        self.merchant_automaton = KeywordAutomaton(MERCHANT_KEYWORDS)
+        self.location_automaton = KeywordAutomaton(LOCATION_KEYWORDS)
+        self.analyze = lru_cache(maxsize=cache_size)(self._analyze)
+
+    def _analyze(self, merchant, location):
+        merchant_lower = merchant.lower().strip()
+        merchant_matches = self.merchant_automaton.find(merchant_lower)
+        location_matches = self.location_automaton.find(location.lower())
+
+        def keywords(matches, keyword_class):
+            return frozenset(keyword for found_class, keyword in matches if found_class == keyword_class)
+
+        is_domain = bool(keywords(merchant_matches, 'domain'))
+
+        return MerchantFeatures(
+            whitelisted=merchant_lower in LEGITIMATE_MERCHANTS,
+            suspicious_keywords=keywords(merchant_matches, 'suspicious'),
+            pattern_count=len(keywords(merchant_matches, 'pattern')),
+            short_name=len(merchant_lower) <= 3,
+            unusual_format=(merchant.islower() or merchant.isupper()) and not is_domain,
+            repeated_characters=len(set(merchant_lower)) <= 2 and len(merchant_lower) > 3,
+            has_digits=any(char.isdigit() for char in merchant),
+            generic_name=bool(keywords(merchant_matches, 'generic')) and len(merchant_lower) <= 10,
+            foreign_location=bool(keywords(location_matches, 'foreign')),
+            local_location=bool(keywords(location_matches, 'local')),
+            merchant_keywords=frozenset(keyword for _, keyword in merchant_matches),
+            location_keywords=frozenset(keyword for _, keyword in location_matches)
+        )
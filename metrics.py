@@ -0,0 +1,376 @@
+"""
+Request and stage latency metrics in Prometheus text format.
+
+Every request's latency is recorded per endpoint, along with the time spent in
+named stages of its work (rule scoring, V-value synthesis, the model, history
+persistence, ...). Counters track the rows scored and the fraud verdicts given.
+Stage timings are also returned to the caller in a Server-Timing header.
+
+A streamed response (NDJSON upload, history export) is generated after its
+headers are sent, so it is recorded when the response is closed: its latency
+covers the whole body, and the stages and verdicts counted while generating it
+are included, as is the memory it allocates. Its Server-Timing header can only
+carry the stages before the headers, and reports that time as "headers" instead
+of "total".
+
+With memory accounting on, each request also records how much it raised the
+process's peak RSS and, while tracemalloc is tracing, its Python heap peak above
+the level it started at (see memory_diagnostics).
+
+Each process keeps its own counters and histograms. When METRICS_DIR is set,
+each process also writes a snapshot to METRICS_DIR/metrics_<pid>_<id>.json about
+once a second (and on exit), and /api/metrics sums every snapshot in the
+directory. Prometheus then sees totals for all gunicorn workers, whichever
+worker answers the scrape. Snapshots of exited workers are kept so counters never
+go backwards; clear the directory when the server (not a worker) restarts.
+
+Timers only add a couple of perf_counter() calls and dict updates per stage, and
+nothing is recorded outside a request (warm-up, benchmarks).
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+import numpy as np
+from flask import Response, g, has_request_context, request
+from memory_diagnostics import BYTE_BUCKETS, peak_rss_bytes
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FLUSH_INTERVAL = 1.0
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}  # label values tuple -> float
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def merge(self, totals, snapshot):
+        for labels, value in snapshot:
+            labels = tuple(labels)
+            totals[labels] = totals.get(labels, 0) + value
+
+    def render(self, totals):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values tuple -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, labels, value):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def snapshot(self):
+        return [[list(labels), list(counts), total] for labels, (counts, total) in self.values.items()]
+
+    def merge(self, totals, snapshot):
+        for labels, counts, total in snapshot:
+            labels = tuple(labels)
+            entry = totals.get(labels)
+            if entry is None:
+                totals[labels] = [list(counts), total]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+
+    def render(self, totals):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _server_timing(stages, name, duration):
+    """Server-Timing header value: each stage, then the named overall duration (ms)"""
+    timings = [f"{stage};dur={stage_duration * 1000.0:.3f}" for stage, stage_duration in stages.items()]
+    timings.append(f"{name};dur={duration * 1000.0:.3f}")
+    return ', '.join(timings)
+
+
+class StageClock:
+    """Times consecutive stages of one piece of work: call lap(name) at the end of each stage"""
+
+    __slots__ = ('stages', 'last')
+
+    def __init__(self, stages):
+        self.stages = stages
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self.last)
+        self.last = now
+
+
+class _NoClock:
+    """Stand-in clock outside a request"""
+
+    def lap(self, name):
+        pass
+
+
+class _Stage:
+    """Context manager timing one stage of the current request"""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if has_request_context():
+            stages = g.setdefault('metric_stages', {})
+            stages[self.name] = stages.get(self.name, 0.0) + (time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Request/stage latency histograms and scoring counters for a Flask app"""
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL, memory=True):
+        self.requests = Counter('fraud_http_requests_total', 'HTTP requests handled',
+                                ('endpoint', 'method', 'status'))
+        self.request_duration = Histogram('fraud_http_request_duration_seconds', 'HTTP request latency',
+                                          ('endpoint', 'method'))
+        self.stage_duration = Histogram('fraud_stage_duration_seconds', 'Time spent in each stage of a request',
+                                        ('endpoint', 'stage'))
+        self.rows_scored = Counter('fraud_rows_scored_total', 'Transactions scored by the model', ('endpoint',))
+        self.verdicts = Counter('fraud_verdicts_total', 'Fraud verdicts given', ('endpoint', 'verdict'))
+        self.rss_growth = Histogram('fraud_request_peak_rss_growth_bytes',
+                                    'Growth of the process peak RSS during a request', ('endpoint',), BYTE_BUCKETS)
+        self.heap_peak = Histogram('fraud_request_heap_peak_bytes',
+                                   'Python heap peak above its start-of-request level (while tracemalloc traces)',
+                                   ('endpoint',), BYTE_BUCKETS)
+        self.collectors = [self.requests, self.request_duration, self.stage_duration, self.rows_scored, self.verdicts,
+                           self.rss_growth, self.heap_peak]
+        self.memory = memory and peak_rss_bytes() is not None
+
+        self._lock = threading.Lock()
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._pid = None
+        self._path = None
+        self._dirty = False
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self._flush_quietly)
+
+    def _start_writer(self):
+        """
+        Give this process its own snapshot file and flush thread. Runs on the first
+        request in each process, so workers forked after import (gunicorn --preload)
+        do not share the parent's file or inherit its counts.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                for collector in self.collectors:
+                    collector.values.clear()
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"metrics_{self._pid}_{uuid.uuid4().hex[:8]}.json")
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    # Recording
+
+    def stage(self, name):
+        """Context manager timing a stage of the current request"""
+        return _Stage(name)
+
+    def stage_clock(self):
+        """StageClock for the current request (a no-op outside a request)"""
+        if not has_request_context():
+            return _NoClock()
+        return StageClock(g.setdefault('metric_stages', {}))
+
+    def count_verdicts(self, fraud_flags):
+        """Count scored rows and fraud verdicts (truthy flags) for the current request"""
+        if not has_request_context():
+            return
+        g.metric_rows = g.get('metric_rows', 0) + len(fraud_flags)
+        g.metric_fraud = g.get('metric_fraud', 0) + int(np.count_nonzero(fraud_flags))
+
+    def _before_request(self):
+        if self.memory:
+            g.metric_peak_rss = peak_rss_bytes()
+            if tracemalloc.is_tracing():
+                # The peak is process-wide: concurrent requests reset each other's
+                g.metric_heap = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+        g.metric_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.get('metric_started')
+        if started is None:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (endpoint, request.method, str(response.status_code))
+
+        if response.is_streamed:
+            # The body has not been generated yet. The generator still sees this g
+            # (stream_with_context), but the context is gone when the response closes
+            state = g._get_current_object()
+            response.call_on_close(lambda: self._record(state, labels))
+            response.headers['Server-Timing'] = _server_timing(g.get('metric_stages') or {}, 'headers',
+                                                               time.perf_counter() - started)
+            return response
+
+        duration, stages = self._record(g, labels)
+        response.headers['Server-Timing'] = _server_timing(stages, 'total', duration)
+        return response
+
+    def _record(self, state, labels):
+        """Record a finished request from its g; returns (duration, stages)"""
+        duration = time.perf_counter() - state.metric_started
+        endpoint, method, status = labels
+        stages = state.get('metric_stages') or {}
+        rows = state.get('metric_rows', 0)
+        rss_growth = heap_peak = None
+        if self.memory and 'metric_peak_rss' in state:
+            rss_growth = peak_rss_bytes() - state.metric_peak_rss
+            if 'metric_heap' in state and tracemalloc.is_tracing():
+                heap_peak = max(0, tracemalloc.get_traced_memory()[1] - state.metric_heap)
+
+        if self.directory and self._pid != os.getpid():
+            self._start_writer()
+
+        with self._lock:
+            self.requests.inc(labels)
+            self.request_duration.observe((endpoint, method), duration)
+            for stage, stage_duration in stages.items():
+                self.stage_duration.observe((endpoint, stage), stage_duration)
+            if rows:
+                fraud = state.get('metric_fraud', 0)
+                self.rows_scored.inc((endpoint,), rows)
+                if fraud:
+                    self.verdicts.inc((endpoint, 'fraud'), fraud)
+                if rows - fraud:
+                    self.verdicts.inc((endpoint, 'legitimate'), rows - fraud)
+            if rss_growth is not None:
+                self.rss_growth.observe((endpoint,), rss_growth)
+            if heap_peak is not None:
+                self.heap_peak.observe((endpoint,), heap_peak)
+            self._dirty = True
+        return duration, stages
+
+    # Export
+
+    def snapshot(self):
+        with self._lock:
+            return {collector.name: collector.snapshot() for collector in self.collectors}
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to aggregate"""
+        if self._path is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            self._dirty = False
+        data = self.snapshot()
+        fd, temp_path = tempfile.mkstemp(prefix='.metrics-', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self._path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _flush_quietly(self):
+        if not self._dirty:
+            return
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"Could not write metrics snapshot: {e}")
+
+    def _flush_loop(self):
+        while self._pid == os.getpid():
+            time.sleep(self.flush_interval)
+            self._flush_quietly()
+
+    def _snapshots(self):
+        """Snapshots of every process: this one live, the others from METRICS_DIR"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+                if path == self._path:
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # being replaced or removed
+        return snapshots
+
+    def render(self):
+        """All metrics, summed over processes, in Prometheus text format"""
+        snapshots = self._snapshots()
+        lines = []
+        for collector in self.collectors:
+            totals = {}
+            for snapshot in snapshots:
+                collector.merge(totals, snapshot.get(collector.name, []))
+            lines.extend(collector.render(totals))
+        return '\n'.join(lines) + '\n'
+
+    def response(self):
+        return Response(self.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,215 @@
+"""
+Memory-mapped model artifacts.
+
+Every worker used to unpickle fraud_model.pkl and scaler.pkl into its own
+private copy of the forest. The compiled forest (see forest_engine) is stored
+instead as a directory of raw .npy arrays plus a meta.json, and workers open
+the arrays with mmap, so all workers on a host share one page-cache copy and
+loading takes no parsing at all.
+
+The artifact directory is named after the SHA-256 of the pickles it was built
+from, so a new model is picked up (and rebuilt) automatically. Directories are
+written under a temporary name and renamed into place, so a worker never sees a
+half-written artifact.
+
+    python model_artifacts.py    # build artifacts ahead of time (e.g. at deploy)
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from forest_engine import CompiledForest
+
+ARTIFACT_FORMAT_VERSION = 1
+
+MODEL_FILE = 'fraud_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+ARTIFACT_ROOT = 'model_artifacts'
+
+# CompiledForest arrays stored in every artifact
+FOREST_ARRAYS = ['feature', 'threshold', 'children', 'missing_go_to_left', 'is_leaf', 'value', 'roots', 'classes_']
+SCALER_ARRAYS = ['scaler_mean', 'scaler_scale', 'lower_bound', 'upper_bound']
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_path(root, model_sha256, scaler_sha256):
+    """Directory holding the artifact built from these pickles"""
+    return os.path.join(root, f"{model_sha256[:16]}-{scaler_sha256[:16]}-v{ARTIFACT_FORMAT_VERSION}")
+
+
+def save_artifacts(forest, directory, meta):
+    """
+    Write a CompiledForest (built by from_sklearn, with native trees) to directory.
+    The files are written to a temporary sibling directory that is renamed into
+    place; if another process got there first its artifact is kept.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix='.artifact-', dir=parent)
+
+    try:
+        arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+        if forest.scaler_folded:
+            arrays.update({name: getattr(forest, name) for name in SCALER_ARRAYS})
+
+        # sklearn's own node arrays, for the compiled Tree.apply path on large batches
+        states = [tree.__getstate__() for tree in forest.native_trees]
+        arrays['native_nodes'] = np.concatenate([state['nodes'] for state in states])
+        arrays['native_values'] = np.concatenate([state['values'] for state in states])
+
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+        meta = dict(meta,
+                    format_version=ARTIFACT_FORMAT_VERSION,
+                    n_features=int(forest.n_features_in_),
+                    n_estimators=int(forest.n_estimators),
+                    node_count=int(len(forest.feature)),
+                    scaler_folded=forest.scaler_folded,
+                    arrays=sorted(arrays),
+                    native={
+                        "n_classes": int(forest.native_trees[0].n_classes[0]),
+                        "node_counts": [int(state['node_count']) for state in states],
+                        "max_depths": [int(state['max_depth']) for state in states]
+                    })
+        with open(os.path.join(temp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        # mkdtemp creates 0700; workers or sidecars running as other users map these files
+        os.chmod(temp_dir, 0o755)
+        os.rename(temp_dir, directory)
+    except OSError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(directory, 'meta.json')):
+            raise
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+
+def load_artifacts(directory):
+    """Open an artifact directory as a CompiledForest whose arrays are memory-mapped"""
+    with open(os.path.join(directory, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {meta.get('format_version')}")
+
+    def array(name):
+        # Plain ndarray view of the read-only mapping (skips np.memmap's per-operation overhead)
+        mapped = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r', allow_pickle=False)
+        return mapped.view(np.ndarray)
+
+    scaler_args = {}
+    if meta['scaler_folded']:
+        scaler_args = {name: array(name) for name in SCALER_ARRAYS}
+
+    native = meta['native']
+    nodes, values = array('native_nodes'), array('native_values')
+
+    forest = CompiledForest(
+        feature=array('feature'),
+        threshold=array('threshold'),
+        children=array('children'),
+        missing_go_to_left=array('missing_go_to_left'),
+        is_leaf=array('is_leaf'),
+        value=array('value'),
+        roots=array('roots'),
+        classes=array('classes_'),
+        n_features=meta['n_features'],
+        native_loader=lambda: rebuild_native_trees(nodes, values, meta['n_features'], native['n_classes'],
+                                                   native['node_counts'], native['max_depths']),
+        **scaler_args
+    )
+    return forest, meta
+
+
+def rebuild_native_trees(nodes, values, n_features, n_classes, node_counts, max_depths):
+    """
+    sklearn Tree objects for the large-batch path, or None if this sklearn cannot
+    load them (not installed, or a different node layout); scoring then stays on
+    the NumPy traversal, which gives the same results.
+    """
+    try:
+        from sklearn.tree._tree import Tree
+    except ImportError:
+        return None
+
+    trees = []
+    offset = 0
+    try:
+        for node_count, max_depth in zip(node_counts, max_depths):
+            tree = Tree(n_features, np.array([n_classes], dtype=np.intp), 1)
+            tree.__setstate__({
+                'max_depth': max_depth,
+                'node_count': node_count,
+                'nodes': np.array(nodes[offset:offset + node_count]),
+                'values': np.array(values[offset:offset + node_count])
+            })
+            trees.append(tree)
+            offset += node_count
+    except (ValueError, TypeError) as e:
+        print(f"Model artifact: native trees unavailable ({e}); using the NumPy traversal")
+        return None
+    return trees
+
+
+def load_forest(model_path=MODEL_FILE, scaler_path=SCALER_FILE, root=ARTIFACT_ROOT):
+    """
+    The compiled, scaler-folded forest for these pickles, memory-mapped from its
+    artifact directory (built from the pickles first if it does not exist yet).
+    Returns (forest, info) where info describes the artifact and the load time.
+    """
+    started = time.perf_counter()
+    model_sha256, scaler_sha256 = file_sha256(model_path), file_sha256(scaler_path)
+    directory = artifact_path(root, model_sha256, scaler_sha256)
+    built = False
+
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        import joblib
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        compiled = CompiledForest.from_sklearn(model, scaler=scaler)
+        meta = {
+            "model_file": os.path.basename(model_path),
+            "scaler_file": os.path.basename(scaler_path),
+            "model_sha256": model_sha256,
+            "scaler_sha256": scaler_sha256,
+            "created_at": datetime.now().isoformat()
+        }
+        try:
+            save_artifacts(compiled, directory, meta)
+        except OSError as e:
+            # Read-only deployment: serve the in-memory forest (private to this worker)
+            print(f"Model artifact could not be written to {directory}: {e}")
+            return compiled, dict(meta, artifact=None, format_version=None, built_at_startup=True,
+                                  load_ms=round((time.perf_counter() - started) * 1000.0, 3))
+        built = True
+
+    forest, meta = load_artifacts(directory)
+    info = {
+        "artifact": os.path.basename(directory),
+        "format_version": meta['format_version'],
+        "model_sha256": meta['model_sha256'],
+        "scaler_sha256": meta['scaler_sha256'],
+        "created_at": meta['created_at'],
+        "built_at_startup": built,
+        "load_ms": round((time.perf_counter() - started) * 1000.0, 3)
+    }
+    return forest, info
+
+
+if __name__ == "__main__":
+    forest, info = load_forest()
+    print(json.dumps(info, indent=2))
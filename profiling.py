@@ -0,0 +1,127 @@
+"""
+Opt-in per-request profiling.
+
+When enabled (PROFILING=true), a request is run under cProfile if either:
+
+- the caller sends an X-Profile header and is authorized: the header holds
+  PROFILE_TOKEN, or the request carries a JWT whose user is in ADMIN_EMAILS
+- it is picked by sampling: one request in every PROFILE_SAMPLE_RATE
+
+Each profiled request writes a .prof file (load it with pstats or snakeviz) and
+a .txt summary of the top functions by cumulative and own time to PROFILE_DIR,
+and the response names them in an X-Profile-Id header. Only one request is
+profiled at a time; others run normally meanwhile.
+
+When profiling is disabled no request hooks are installed, so it costs nothing.
+For streamed responses only the work before the response starts is profiled.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+from datetime import datetime
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+PROFILE_HEADER = 'X-Profile'
+
+# Functions listed per ordering in the .txt summary
+SUMMARY_TOP = 30
+
+
+class RequestProfiler:
+    """cProfile hook for authorized or sampled requests"""
+
+    def __init__(self, directory='profiles', sample_rate=0, token=None, admin_emails=(), top=SUMMARY_TOP):
+        self.directory = directory
+        self.sample_rate = max(0, int(sample_rate))
+        self.token = token or None
+        self.admin_emails = frozenset(email.lower() for email in admin_emails)
+        self.top = top
+        self.profiled = 0
+        self._counter = itertools.count()
+        self._busy = threading.Lock()  # one profiler at a time
+
+    def init_app(self, app):
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _reason(self):
+        """Why this request should be profiled ('header' or 'sample'), or None"""
+        header = request.headers.get(PROFILE_HEADER)
+        if header and self._authorized(header):
+            return 'header'
+        if self.sample_rate and next(self._counter) % self.sample_rate == 0:
+            return 'sample'
+        return None
+
+    def _authorized(self, header):
+        if self.token and hmac.compare_digest(header.encode('utf-8'), self.token.encode('utf-8')):
+            return True
+        if self.admin_emails:
+            try:
+                verify_jwt_in_request(optional=True)
+                identity = get_jwt_identity()
+            except Exception:
+                return False
+            return bool(identity) and identity.lower() in self.admin_emails
+        return False
+
+    def _before_request(self):
+        reason = self._reason()
+        if reason is None or not self._busy.acquire(blocking=False):
+            return
+        profile = cProfile.Profile()
+        g.request_profile = (profile, reason, time.perf_counter())
+        profile.enable()
+
+    def _after_request(self, response):
+        active = g.pop('request_profile', None)
+        if active is None:
+            return response
+        profile, reason, started = active
+        profile.disable()
+        duration = time.perf_counter() - started
+        self._busy.release()
+
+        try:
+            profile_id = self._write(profile, reason, duration, response.status_code)
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError as e:
+            print(f"Could not write request profile: {e}")
+        return response
+
+    def _teardown_request(self, exc):
+        # The request failed before after_request: stop profiling without writing
+        active = g.pop('request_profile', None)
+        if active is not None:
+            active[0].disable()
+            self._busy.release()
+
+    def _write(self, profile, reason, duration, status):
+        """Write <id>.prof and <id>.txt; returns the id"""
+        self.profiled += 1
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}-{os.getpid()}-{self.profiled}"
+        base = os.path.join(self.directory, profile_id)
+        profile.dump_stats(base + '.prof')
+
+        summary = io.StringIO()
+        summary.write(f"{request.method} {request.full_path.rstrip('?')} -> {status}\n")
+        summary.write(f"profiled because: {reason}; wall time {duration * 1000.0:.3f} ms\n\n")
+        stats = pstats.Stats(profile, stream=summary)
+        stats.strip_dirs()
+        summary.write(f"Top {self.top} by cumulative time\n")
+        stats.sort_stats('cumulative').print_stats(self.top)
+        summary.write(f"Top {self.top} by own time\n")
+        stats.sort_stats('tottime').print_stats(self.top)
+        with open(base + '.txt', 'w') as f:
+            f.write(summary.getvalue())
+        return profile_id
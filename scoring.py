@@ -0,0 +1,98 @@
+"""
+Shared scoring core for every endpoint that runs the fraud model.
+
+Endpoints used to build `[time] + v_values + [amount]` lists, turn them into
+arrays and call predict() and predict_proba() separately, which evaluated the
+forest twice. FraudScorer writes features straight into reusable per-thread
+buffers, runs the probability pass once and takes the label from its argmax.
+"""
+import threading
+import numpy as np
+from coalescer import ScoringCoalescer
+from inference_pool import ProcessInferencePool
+
+N_FEATURES = 30
+N_V_VALUES = 28
+
+# Largest batch whose feature buffer is kept for reuse by a thread
+MAX_BUFFERED_ROWS = 4096
+
+ML_FRAUD_FACTOR = "ML Model: High fraud probability"
+ML_LEGITIMATE_FACTOR = "ML Model: Legitimate transaction pattern"
+
+
+def ml_factor(prediction):
+    """Risk factor text for a model prediction"""
+    return ML_FRAUD_FACTOR if prediction == 1 else ML_LEGITIMATE_FACTOR
+
+
+def fill_features(row, time, v_values, amount):
+    """Write one transaction into a length-30 feature row: [Time, V1, ..., V28, Amount]"""
+    row[0] = time
+    row[1:N_V_VALUES + 1] = v_values
+    row[N_FEATURES - 1] = amount
+    return row
+
+
+class FraudScorer:
+    """Scores feature rows with a compiled forest (see forest_engine.CompiledForest)"""
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.classes_ = forest.classes_
+        self.coalescer = None
+        self.pool = None
+        self._local = threading.local()
+
+    def enable_coalescing(self, window_ms=2.0, max_batch=64, timeout_ms=1000.0):
+        """Score concurrent single transactions together (see coalescer.ScoringCoalescer)"""
+        self.coalescer = ScoringCoalescer(self.score_features, window_ms=window_ms, max_batch=max_batch,
+                                          timeout_ms=timeout_ms)
+
+    def enable_process_pool(self, workers=None, min_rows=1024):
+        """Score large matrices on forked worker processes (see inference_pool.ProcessInferencePool)"""
+        self.pool = ProcessInferencePool(self.forest, workers=workers, min_rows=min_rows)
+
+    def feature_buffer(self, n_rows):
+        """
+        Return an (n_rows, 30) float64 array for the caller to fill.
+        Small batches reuse a per-thread buffer, so the returned array is only
+        valid until the same thread asks for another one.
+        """
+        if n_rows > MAX_BUFFERED_ROWS:
+            return np.empty((n_rows, N_FEATURES), dtype=np.float64)
+
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or len(buffer) < n_rows:
+            capacity = 1
+            while capacity < n_rows:
+                capacity *= 2
+            buffer = np.empty((capacity, N_FEATURES), dtype=np.float64)
+            self._local.buffer = buffer
+        return buffer[:n_rows]
+
+    def score_features(self, features):
+        """
+        Score an (N, 30) raw feature matrix with a single probability pass.
+        Returns (predictions, probabilities); predictions are the argmax labels.
+        """
+        engine = self.pool if self.pool is not None else self.forest
+        proba = engine.predict_proba(features)
+        predictions = self.classes_.take(np.argmax(proba, axis=1))
+        return predictions, proba
+
+    def score_transaction(self, time, v_values, amount):
+        """Score one transaction; returns (prediction, [p_legitimate, p_fraud])"""
+        features = self.feature_buffer(1)
+        fill_features(features[0], time, v_values, amount)
+
+        # Rows the model rejects are scored inline so the error stays with their caller
+        if self.coalescer is not None and self.scorable_rows(features)[0]:
+            return self.coalescer.score(features[0].copy())
+
+        predictions, proba = self.score_features(features)
+        return predictions[0], proba[0]
+
+    def scorable_rows(self, features):
+        """Boolean mask of rows the model can score (no infinite or overflowing values)"""
+        return self.forest.scorable_rows(features)
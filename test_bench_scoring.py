@@ -0,0 +1,56 @@
+import numpy as np
+from bench_scoring import summarize, time_case, compare, synthetic_transactions, run_benchmarks
+
+def test_summarize_percentiles():
+    """Throughput and percentiles come from the per-call samples"""
+    samples = [0.001] * 98 + [0.010, 0.020]
+    result = summarize("case", 100, samples)
+    print(result)
+
+    assert result['calls'] == 100
+    assert result['p50_ms'] == 1.0
+    assert abs(result['rows_per_s'] - 100 * 100 / sum(samples)) < 1e-3
+    assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'] <= 20.0
+
+def test_time_case_limits_calls():
+    """Cases run at least min_calls and at most max_calls times, after the warm-up calls"""
+    calls = []
+    result = time_case("noop", 1, calls.append, min_time=10.0, min_calls=5, max_calls=50, warmup_calls=3)
+    assert result['calls'] == 50 and len(calls) == 53
+
+    calls = []
+    result = time_case("noop", 1, calls.append, min_time=0.0, min_calls=5, warmup_calls=0)
+    assert result['calls'] == 5 and calls == [0, 1, 2, 3, 4]
+
+def test_compare_reports_ratios():
+    baseline = {"meta": {"git_commit": "abc1234", "created_at": "2024-01-01T00:00:00"},
+                "results": [summarize("score_features", 1000, [0.002] * 10)]}
+    lines = []
+    compare([summarize("score_features", 1000, [0.001] * 10)], baseline, log=lines.append)
+    print("\n".join(lines))
+    assert "throughput x2.00" in lines[-1] and "p50 x0.50" in lines[-1]
+
+def test_synthetic_transactions_are_distinct():
+    transactions = synthetic_transactions(1000)
+    assert len(set(transactions)) == 1000
+    assert all(len(card) == 16 and card.isdigit() for _, _, _, card, _ in transactions)
+    assert np.all(np.array([amount for amount, _, _, _, _ in transactions]) >= 0)
+
+def test_v_value_miss_case_only_misses():
+    """The uncached V-value case never hits entries left by the hybrid case or its own warm-up"""
+    from test_csv_upload import import_app
+    app = import_app()
+    results = run_benchmarks(sizes=(), min_time=0.05, log=lambda line: None,
+                             cases=['hybrid_fraud_detection', 'generate_v_values'])
+    info = app._synthesize_v_values.cache_info()
+    print(f"Miss case: {results[1]['calls']} calls, cache {info}")
+    assert info.hits == 0 and info.misses == results[1]['calls'] + 3
+
+if __name__ == "__main__":
+    print("=== Benchmark Harness Test ===")
+    test_summarize_percentiles()
+    test_time_case_limits_calls()
+    test_compare_reports_ratios()
+    test_synthetic_transactions_are_distinct()
+    test_v_value_miss_case_only_misses()
+    print("\n✅ Benchmark harness works!")
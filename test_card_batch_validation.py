@@ -0,0 +1,34 @@
+import random
+from card_validation import validate_card_number, validate_card_numbers, TEST_CARDS, COMMON_TEST_NUMBERS
+
+def sample_cards(n_cards=5000, seed=0):
+    """Random cards plus the patterns the validator looks for"""
+    rng = random.Random(seed)
+    cards = ['', None, '123', '4532-0151-1283-0366', '4532 0151 1283 0366', 'abcd' * 4,
+             '1234123412341234', '0101010101010101', '5555555555555555', '2222222222222222']
+    cards += COMMON_TEST_NUMBERS + TEST_CARDS
+    for _ in range(n_cards):
+        kind = rng.random()
+        if kind < 0.4:
+            card = ''.join(rng.choice('0123456789') for _ in range(16))
+        elif kind < 0.6:
+            card = ''.join(rng.choice('012') for _ in range(16))
+        elif kind < 0.8:
+            card = ''.join(rng.choice('0123456789') for _ in range(4)) * 4
+        else:
+            card = rng.choice('0123456789') * 4 + ''.join(rng.choice('0123456789') for _ in range(12))
+        cards.append(card)
+    return cards
+
+def test_batch_matches_single():
+    """validate_card_numbers must give exactly what validate_card_number gives per card"""
+    cards = sample_cards()
+    expected = [validate_card_number(card) for card in cards]
+    actual = validate_card_numbers(cards)
+    print(f"{len(cards)} cards, {sum(1 for result in expected if result[1])} with risk")
+    assert actual == expected
+
+if __name__ == "__main__":
+    print("=== Batch Card Validation Test ===")
+    test_batch_matches_single()
+    print("\n✅ Batch card validation matches validate_card_number!")
@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import tempfile
+import numpy as np
+
+def import_app():
+    """app.py with its stores, artifacts and warm-up kept out of the working directory"""
+    directory = tempfile.mkdtemp()
+    os.environ.setdefault('USERS_FILE', os.path.join(directory, 'users.json'))
+    os.environ.setdefault('TRANSACTION_HISTORY_DB', os.path.join(directory, 'history.db'))
+    os.environ.setdefault('USERS_DB', os.path.join(directory, 'users.db'))
+    os.environ.setdefault('MODEL_ARTIFACT_DIR', os.path.join(directory, 'model_artifacts'))
+    os.environ.setdefault('EVALUATION_DIR', os.path.join(directory, 'model_evaluations'))
+    os.environ.setdefault('MODEL_WARMUP', 'off')
+    import app
+    return app
+
+def csv_upload(rows):
+    columns = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+    lines = [','.join(columns)] + [','.join(str(value) for value in row) for row in rows]
+    return io.BytesIO(('\n'.join(lines) + '\n').encode('utf-8'))
+
+def test_stream_skips_malformed_row():
+    """A non-numeric cell skips only its row in stream mode, as it does without streaming"""
+    app = import_app()
+    from flask_jwt_extended import create_access_token
+    with app.app.app_context():
+        token = create_access_token(identity='csv@example.com')
+    client = app.app.test_client()
+
+    rng = np.random.default_rng(0)
+    rows = [[round(value, 4) for value in rng.normal(0, 2, 30)] for _ in range(5)]
+    rows[2][7] = 'abc'
+
+    rows_scored = app.metrics.rows_scored.values
+    bodies = {}
+    for stream in ('1', ''):
+        before = rows_scored.get(('/api/upload-csv',), 0)
+        with client.post(f'/api/upload-csv?stream={stream}',
+                         headers={'Authorization': f'Bearer {token}'},
+                         data={'file': (csv_upload(rows), 'upload.csv')},
+                         content_type='multipart/form-data') as response:
+            assert response.status_code == 200
+            bodies[stream] = response.get_data(as_text=True)
+        # Counted once the response is closed, including rows scored while it streamed
+        assert rows_scored[('/api/upload-csv',)] == before + 4
+
+    lines = [json.loads(line) for line in bodies['1'].splitlines()]
+    print(f"Stream summary: {lines[-1]}")
+    assert lines[-1] == {"message": "Successfully processed 4 transactions", "total_rows": 5, "processed_rows": 4}
+    streamed = lines[:-1]
+    assert [result['merchant'] for result in streamed] == ['Transaction_0', 'Transaction_1',
+                                                           'Transaction_3', 'Transaction_4']
+
+    batch = json.loads(bodies[''])['results']
+    assert [result['merchant'] for result in batch] == [result['merchant'] for result in streamed]
+    assert [result['isGenuine'] for result in batch] == [result['isGenuine'] for result in streamed]
+
+if __name__ == "__main__":
+    print("=== CSV Upload Test ===")
+    test_stream_skips_malformed_row()
+    print("\n✅ Malformed CSV rows are skipped!")
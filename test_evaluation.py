@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, confusion_matrix, roc_auc_score
+from evaluation import EvaluationAccumulator, FEATURE_COLUMNS, evaluate_model, evaluation_path, EvaluationCache
+from model_artifacts import load_forest
+
+def labeled_csv(path, n_rows, seed=0):
+    """creditcard.csv-format file whose labels loosely follow the model's scores"""
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.uniform(0, 172800, n_rows),
+        rng.normal(0, 4, (n_rows, 28)),
+        rng.exponential(200, n_rows)
+    ]).astype(np.float32)
+    frame = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+    frame['Class'] = 0
+    frame.to_csv(path, index=False)
+    return frame
+
+def test_accumulator_matches_sklearn():
+    """Chunked histogram metrics equal sklearn's on the whole data (scores are multiples of 0.01)"""
+    rng = np.random.default_rng(1)
+    labels = rng.random(5000) < 0.3
+    scores = np.clip(np.round(rng.normal(0.35 + 0.3 * labels, 0.2), 2), 0, 1)
+
+    accumulator = EvaluationAccumulator()
+    for start in range(0, len(labels), 700):
+        accumulator.update(labels[start:start + 700], scores[start:start + 700])
+    result = accumulator.result()
+    print(f"ROC AUC {result['roc_auc']:.6f}, AP {result['average_precision']:.6f}")
+
+    (tn, fp), (fn, tp) = confusion_matrix(labels, scores > 0.5)
+    assert result['confusion_matrix'] == {"true_negatives": tn, "false_positives": fp,
+                                          "false_negatives": fn, "true_positives": tp}
+    assert abs(result['roc_auc'] - roc_auc_score(labels, scores)) < 1e-12
+    assert abs(result['average_precision'] - average_precision_score(labels, scores)) < 1e-12
+    assert result['roc_curve']['tpr'][-1] == 1.0 and result['roc_curve']['fpr'][-1] == 1.0
+
+def test_evaluation_cached_by_model_hash():
+    """evaluate_model streams a CSV and stores the result where EvaluationCache finds it"""
+    directory = tempfile.mkdtemp()
+    try:
+        data_path = os.path.join(directory, 'labeled.csv')
+        frame = labeled_csv(data_path, 3000)
+        forest, info = load_forest(root=os.path.join(directory, 'artifacts'))
+        # Label as fraud what the model flags, plus some noise, so every metric is defined
+        frame['Class'] = (forest.predict(frame[FEATURE_COLUMNS].to_numpy()) == 1).astype(int)
+        frame.loc[::50, 'Class'] = 1 - frame.loc[::50, 'Class']
+        frame.to_csv(data_path, index=False)
+
+        root = os.path.join(directory, 'evaluations')
+        cache = EvaluationCache(root, info)
+        assert cache.get() is None
+        evaluation, path = evaluate_model(data_path, root=root, artifact_root=os.path.join(directory, 'artifacts'),
+                                          chunk_size=512)
+        print(f"Evaluation: accuracy {evaluation['accuracy']:.4f}, stored in {os.path.basename(path)}")
+        assert evaluation['rows'] == 3000 and evaluation['fraud_rows'] == int(frame['Class'].sum())
+        assert abs(evaluation['accuracy'] - (1 - 60 / 3000)) < 1e-12
+        assert len(evaluation['feature_importances']) == 30 and len(evaluation['feature_importance']) == 10
+        assert abs(sum(evaluation['feature_importances'].values()) - 1.0) < 1e-4
+
+        assert cache.get() == evaluation
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+        assert EvaluationCache(root, dict(info, model_sha256='0' * 64)).get() is None
+
+        # A new evaluation of the same model is picked up without a new cache
+        with open(path) as f:
+            stored = json.load(f)
+        stored['evaluated_at'] = 'later'
+        with open(path, 'w') as f:
+            json.dump(stored, f)
+        os.utime(path, ns=(0, 1))
+        assert cache.get()['evaluated_at'] == 'later'
+    finally:
+        shutil.rmtree(directory)
+
+def test_endpoints_serve_new_evaluation_without_restart():
+    """Before an evaluation the endpoint says so (200, evaluated false); a new one is served at once"""
+    from test_csv_upload import import_app
+    app = import_app()
+    from flask_jwt_extended import create_access_token
+    with app.app.app_context():
+        token = create_access_token(identity='eval@example.com')
+    client = app.app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    path = evaluation_path(app.EVALUATION_DIR, app.model_artifact['model_sha256'], app.model_artifact['scaler_sha256'])
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        response = client.get('/api/model-evaluation', headers=headers)
+        assert response.status_code == 200 and response.get_json()['evaluated'] is False
+        assert client.get('/api/model-info', headers=headers).get_json()['accuracy'] is None
+
+        os.makedirs(app.EVALUATION_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"accuracy": 0.5, "confusion_matrix": {}, "feature_importance": {}}, f)
+        body = client.get('/api/model-evaluation', headers=headers).get_json()
+        assert body['evaluated'] is True and body['accuracy'] == 0.5
+        assert client.get('/api/model-info', headers=headers).get_json()['accuracy'] == 0.5
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+if __name__ == "__main__":
+    print("=== Model Evaluation Test ===")
+    test_accumulator_matches_sklearn()
+    test_evaluation_cached_by_model_hash()
+    test_endpoints_serve_new_evaluation_without_restart()
+    print("\n✅ Model evaluation is computed and cached!")
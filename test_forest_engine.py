@@ -0,0 +1,83 @@
+import joblib
+import numpy as np
+from forest_engine import CompiledForest
+
+def load_test_data(n_rows=2000, seed=0):
+    """Load the model and scaler and build scaled, realistic-looking feature rows"""
+    model = joblib.load('fraud_model.pkl')
+    scaler = joblib.load('scaler.pkl')
+
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.uniform(0, 172800, n_rows),      # Time
+        rng.normal(0, 4, (n_rows, 28)),      # V1-V28
+        rng.exponential(200, n_rows)         # Amount
+    ])
+    return model, scaler, scaler.transform(features)
+
+def test_compiled_forest_matches_sklearn():
+    """Compiled forest must return exactly what sklearn returns, for single rows and batches"""
+    model, scaler, features = load_test_data()
+    forest = CompiledForest.from_sklearn(model)
+
+    for n_rows in (1, 7, 300, len(features)):
+        batch = features[:n_rows]
+        expected = model.predict_proba(batch)
+        actual = forest.predict_proba(batch)
+        print(f"{n_rows} rows: max difference {np.abs(expected - actual).max()}")
+        assert np.array_equal(expected, actual)
+        assert np.array_equal(model.predict(batch), forest.predict(batch))
+
+def test_compiled_forest_missing_values():
+    """NaN features follow the same missing-value routes as sklearn"""
+    model, scaler, features = load_test_data(n_rows=500, seed=1)
+    features[::3, 4] = np.nan
+    features[::5, 14] = np.nan
+    forest = CompiledForest.from_sklearn(model)
+
+    assert np.array_equal(model.predict_proba(features[:50]), forest.predict_proba(features[:50]))
+    assert np.array_equal(model.predict_proba(features), forest.predict_proba(features))
+
+def test_folded_scaler_matches_sklearn():
+    """Raw features through the folded forest must match scaler.transform + predict_proba bit for bit"""
+    model, scaler, features = load_test_data(n_rows=1000, seed=2)
+    raw = scaler.inverse_transform(features)
+    raw[::7, 3] = np.nan
+    forest = CompiledForest.from_sklearn(model, scaler=scaler)
+
+    # Also probe every folded threshold exactly and one float64 step either side
+    internal = ~forest.is_leaf
+    edges = np.repeat(raw[:1], 3 * internal.sum(), axis=0)
+    for k, (j, t) in enumerate(zip(forest.feature[internal], forest.threshold[internal])):
+        edges[3 * k, j] = t
+        edges[3 * k + 1, j] = np.nextafter(t, np.inf)
+        edges[3 * k + 2, j] = np.nextafter(t, -np.inf)
+
+    for batch in (raw[:1], raw[:100], raw, edges):
+        expected = model.predict_proba(scaler.transform(batch))
+        actual = forest.predict_proba(batch)
+        print(f"{len(batch)} raw rows: identical = {np.array_equal(expected, actual)}")
+        assert np.array_equal(expected, actual)
+
+def test_compiled_forest_rejects_bad_input():
+    """Infinite values and wrong feature counts raise ValueError like sklearn"""
+    model, scaler, features = load_test_data(n_rows=1)
+    forest = CompiledForest.from_sklearn(model)
+    folded = CompiledForest.from_sklearn(model, scaler=scaler)
+
+    for engine, bad in ((forest, np.full((1, 30), np.inf)), (forest, np.zeros((1, 29))),
+                        (folded, np.full((1, 30), 1e300))):
+        try:
+            engine.predict_proba(bad)
+        except ValueError as e:
+            print(f"Rejected as expected: {e}")
+        else:
+            raise AssertionError("Expected ValueError")
+
+if __name__ == "__main__":
+    print("=== Compiled Forest Test ===")
+    test_compiled_forest_matches_sklearn()
+    test_compiled_forest_missing_values()
+    test_folded_scaler_matches_sklearn()
+    test_compiled_forest_rejects_bad_input()
+    print("\n✅ Compiled forest matches sklearn!")
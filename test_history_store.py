@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from history_store import HistoryStore, HistoryWriter
+
+def record(i, analyzed_at=None):
+    return {"id": f"txn_{i}", "amount": float(i), "riskScore": i % 100, "isGenuine": i % 3 != 0,
+            "analyzed_at": analyzed_at or f"2024-06-15T10:{i // 60 % 60:02d}:{i % 60:02d}"}
+
+def test_append_trim_and_order():
+    """Records come back newest first, per user, trimmed to the per-user limit"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'), max_records_per_user=5)
+        for i in range(8):
+            store.append('a@example.com', record(i))
+        store.append('b@example.com', record(100))
+
+        history = store.user_history('a@example.com')
+        print(f"a@example.com: {[r['id'] for r in history]}")
+        assert [r['id'] for r in history] == ['txn_7', 'txn_6', 'txn_5', 'txn_4', 'txn_3']
+        assert [r['id'] for r in store.user_history('a@example.com', newest_first=False)][0] == 'txn_3'
+        assert store.count('b@example.com') == 1
+
+def test_concurrent_writers():
+    """Writers on separate threads (separate connections) do not lose records"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+
+        def write(user):
+            for i in range(50):
+                store.append(user, record(i))
+
+        threads = [threading.Thread(target=write, args=(f"user{t}@example.com",)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(store.count(f"user{t}@example.com") == 50 for t in range(4))
+
+def test_json_migration():
+    """The legacy JSON file is imported once and renamed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'transaction_history.json')
+        with open(json_path, 'w') as f:
+            json.dump({'a@example.com': [record(1), record(2)], 'b@example.com': [record(3)]}, f)
+
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+        assert store.migrate_json(json_path) == 3
+        assert not os.path.exists(json_path) and os.path.exists(json_path + '.migrated')
+        assert store.migrate_json(json_path) == 0
+        assert [r['id'] for r in store.user_history('a@example.com')] == ['txn_2', 'txn_1']
+
+def test_history_writer():
+    """Sync writes are committed on return; async writes are committed by the flusher"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+
+        sync_writer = HistoryWriter(store)
+        sync_writer.write([('a@example.com', record(i)) for i in range(100)])
+        assert store.count('a@example.com') == 100
+        assert sync_writer.stats()['flushes'] == 1
+
+        async_writer = HistoryWriter(store, durability='async', flush_interval_ms=20, max_pending=1000)
+        async_writer.write([('b@example.com', record(i)) for i in range(10)])
+        deadline = time.time() + 5
+        while store.count('b@example.com') < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        stats = async_writer.stats()
+        print(f"Async writer: {stats}")
+        assert store.count('b@example.com') == 10 and stats['queue_depth'] == 0
+
+        # Reaching max_pending flushes inline, bounding what a crash can lose
+        async_writer = HistoryWriter(store, durability='async', flush_interval_ms=60000, max_pending=50)
+        async_writer.write([('c@example.com', record(i)) for i in range(60)])
+        assert store.count('c@example.com') == 60
+
+def test_history_writer_bounded_while_store_fails():
+    """A failing store neither grows the async queue past max_pending nor fails accepted writes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+        append_many = store.append_many
+
+        def locked(entries):
+            raise RuntimeError("database is locked")
+        store.append_many = locked
+
+        writer = HistoryWriter(store, durability='async', flush_interval_ms=60000, max_pending=50)
+        for start in range(0, 200, 20):
+            writer.write([('d@example.com', record(i)) for i in range(start, start + 20)])
+        stats = writer.stats()
+        print(f"Writer while failing: {stats}")
+        assert stats['queue_depth'] <= 50 and stats['errors'] > 0
+        assert stats['dropped_records'] == 200 - stats['queue_depth']
+
+        # Once the store recovers, the newest records are committed
+        store.append_many = append_many
+        writer.flush()
+        ids = [r['id'] for r in store.user_history('d@example.com')]
+        assert len(ids) == stats['queue_depth'] and ids[0] == 'txn_199'
+
+def brute_force_stats(history):
+    """What /api/real-time-stats used to compute by scanning every record"""
+    yesterday = datetime.now() - timedelta(days=1)
+    return {
+        "total": len(history),
+        "fraudulent": len([t for t in history if not t.get('isGenuine', True)]),
+        "risk_sum": float(sum(t.get('riskScore', 0) for t in history)),
+        "recent": len([t for t in history if datetime.fromisoformat(t['analyzed_at']) > yesterday])
+    }
+
+def test_incremental_stats():
+    """Running totals follow inserts and trims and survive a rebuild from the records"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        store = HistoryStore(path, max_records_per_user=50)
+        now = datetime.now()
+        for i in range(120):
+            # Spread records over the last three days, oldest first
+            analyzed_at = (now - timedelta(minutes=(120 - i) * 40 + 1)).isoformat()
+            store.append('a@example.com', record(i, analyzed_at))
+        store.append_many([('b@example.com', record(i, now.isoformat())) for i in range(5)])
+
+        for user in ('a@example.com', 'b@example.com'):
+            stats = store.user_stats(user)
+            print(f"{user}: {stats}")
+            assert stats == brute_force_stats(store.user_history(user))
+
+        before = store.user_stats('a@example.com')
+        store.rebuild_stats()
+        assert HistoryStore(path, max_records_per_user=50).user_stats('a@example.com') == before
+
+def test_history_pages():
+    """Cursor pages cover the filtered history exactly once, newest first"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+        # Equal analyzed_at values are ordered by insertion (the cursor includes the id)
+        store.append_many([('a@example.com', dict(record(i, f"2024-06-15T10:00:{i // 4:02d}"), merchant=f"Shop {i}"))
+                           for i in range(45)])
+
+        expected = [r['id'] for r in store.user_history('a@example.com') if not r['isGenuine']]
+        seen, cursor = [], None
+        while True:
+            page, cursor, total = store.history_page('a@example.com', 7, cursor=cursor, is_genuine=False)
+            seen.extend(r['id'] for r in page)
+            if cursor is None:
+                break
+        print(f"{len(seen)} fraudulent records over {-(-len(seen) // 7)} pages")
+        assert seen == expected and total == len(expected)
+
+        page, _, total = store.history_page('a@example.com', 100, min_amount=10, max_amount=19, search='shop 1')
+        assert total == 10 and {r['id'] for r in page} == {f"txn_{i}" for i in range(10, 20)}
+
+        try:
+            store.history_page('a@example.com', 10, cursor='not-a-cursor')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError for a malformed cursor")
+
+if __name__ == "__main__":
+    print("=== History Store Test ===")
+    test_append_trim_and_order()
+    test_concurrent_writers()
+    test_json_migration()
+    test_history_writer()
+    test_history_writer_bounded_while_store_fails()
+    test_incremental_stats()
+    test_history_pages()
+    print("\n✅ History store works!")
@@ -0,0 +1,87 @@
+import os
+import signal
+import numpy as np
+from model_artifacts import load_forest
+from scoring import FraudScorer
+from warmup import synthetic_features
+
+def make_scorer(workers=2, min_rows=200):
+    forest, info = load_forest()
+    scorer = FraudScorer(forest)
+    scorer.enable_process_pool(workers=workers, min_rows=min_rows)
+    return forest, scorer
+
+def test_pool_matches_inline_scoring():
+    """Matrices split across worker processes score exactly like the inline forest"""
+    forest, scorer = make_scorer()
+    try:
+        pids = scorer.pool.warm_up()
+        print(f"Workers: {pids}")
+        assert len(set(pids)) == 2 and os.getpid() not in pids
+
+        features = synthetic_features(1000, seed=4)
+        features[::11, 6] = np.nan
+        for n_rows in (1, 150, 450, 1000):
+            predictions, proba = scorer.score_features(features[:n_rows])
+            assert np.array_equal(forest.predict_proba(features[:n_rows]), proba)
+
+        # Only the batches of at least min_rows went to the pool (450 -> 2 chunks, 1000 -> 2)
+        stats = scorer.pool.stats()
+        print(f"Pool stats: {stats}")
+        assert stats['rows'] == 1450 and stats['tasks'] == 4
+    finally:
+        scorer.pool.shutdown()
+
+def test_pool_reports_bad_input():
+    """Rows the model rejects raise ValueError in the caller, as with inline scoring"""
+    forest, scorer = make_scorer()
+    try:
+        try:
+            scorer.score_features(np.full((500, 30), np.inf))
+        except ValueError as e:
+            print(f"Rejected as expected: {e}")
+        else:
+            raise AssertionError("Expected ValueError")
+    finally:
+        scorer.pool.shutdown()
+
+def test_dead_worker_falls_back_to_inline_scoring():
+    """A killed worker breaks the pool; it is not re-forked and batches are scored inline"""
+    forest, scorer = make_scorer()
+    try:
+        os.kill(scorer.pool.warm_up()[0], signal.SIGKILL)
+        features = synthetic_features(800, seed=5)
+
+        predictions, proba = scorer.score_features(features)
+        assert np.array_equal(forest.predict_proba(features), proba)
+        assert scorer.pool.stats()['broken'] and scorer.pool._executor is None
+
+        predictions, proba = scorer.score_features(features)
+        assert np.array_equal(forest.predict_proba(features), proba)
+        assert scorer.pool.warm_up() == [] and scorer.pool.stats()['rows'] == 0
+    finally:
+        scorer.pool.shutdown()
+
+def test_pool_of_another_process_is_not_used():
+    """A worker forked from the process that created the pool scores inline"""
+    forest, scorer = make_scorer()
+    try:
+        scorer.pool.warm_up()
+        created_by = scorer.pool._pid
+        scorer.pool._pid = -1  # as seen from a forked worker
+        features = synthetic_features(800, seed=6)
+        predictions, proba = scorer.score_features(features)
+        assert np.array_equal(forest.predict_proba(features), proba)
+        stats = scorer.pool.stats()
+        assert stats['inherited'] and stats['rows'] == 0 and scorer.pool.warm_up() == []
+        scorer.pool._pid = created_by
+    finally:
+        scorer.pool.shutdown()
+
+if __name__ == "__main__":
+    print("=== Inference Pool Test ===")
+    test_pool_matches_inline_scoring()
+    test_pool_reports_bad_input()
+    test_dead_worker_falls_back_to_inline_scoring()
+    test_pool_of_another_process_is_not_used()
+    print("\n✅ Inference pool matches inline scoring!")
@@ -0,0 +1,73 @@
+import csv
+import os
+import tempfile
+from load_test import InProcessTransport, authenticate, parse_mix, parse_server_timing, read_replay_rows, run_closed_loop, level_report, FEATURE_COLUMNS
+
+class EchoWorkload:
+    """Answers every request with 200, or 500 for CSV uploads, and fixed stage timings"""
+
+    def send(self, kind, i):
+        return (500 if kind == 'csv' else 200), 'score;dur=1.5, persist;dur=0.5', b'{}'
+
+def test_parse_mix():
+    assert parse_mix('single=60,batch=20') == [('single', 60.0), ('batch', 20.0)]
+    assert parse_mix('history') == [('history', 1.0)]
+    for bad in ('unknown=1', 'single=0'):
+        try:
+            parse_mix(bad)
+        except ValueError as e:
+            print(f"Rejected as expected: {e}")
+        else:
+            raise AssertionError("Expected ValueError")
+
+def test_parse_server_timing():
+    assert parse_server_timing('score;dur=1.2, persist;desc="db";dur=0.4') == {'score': 1.2, 'persist': 0.4}
+    assert parse_server_timing('cache;desc=hit, total;dur=bad') == {}
+    assert parse_server_timing(None) == {}
+
+def test_closed_loop_report():
+    """Per-type counts, error rates and server stage timings are reported for a level"""
+    samples, elapsed = run_closed_loop(EchoWorkload(), [('single', 1), ('csv', 1)], concurrency=3,
+                                       duration=5.0, max_requests=200)
+    report = level_report(samples, elapsed)
+    print(report['overall'])
+
+    assert report['overall']['requests'] == 200
+    assert report['by_type']['csv']['error_rate'] == 1.0
+    assert report['by_type']['single']['errors'] == 0
+    assert report['overall']['errors'] == report['by_type']['csv']['requests']
+    assert report['overall']['server_timing']['score'] == {'count': 200, 'mean_ms': 1.5, 'p95_ms': 1.5}
+
+def test_read_replay_rows():
+    """Replay rows are read in model column order, whatever the file's column order"""
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Class'] + FEATURE_COLUMNS[::-1])
+            for n in range(5):
+                writer.writerow([0] + [float(n * 100 + k) for k in range(30)][::-1])
+
+        rows = list(read_replay_rows(path, limit=3))
+        assert len(rows) == 3
+        assert rows[2] == [float(200 + k) for k in range(30)]
+    finally:
+        os.remove(path)
+
+def test_in_process_run_keeps_data_out_of_checkout():
+    """The in-process target registers its user and writes history outside the working directory"""
+    transport = InProcessTransport()
+    headers = authenticate(transport)
+    assert 'Authorization' in headers
+    import app
+    for path in (app.USERS_FILE, app.USERS_DB, app.TRANSACTION_HISTORY_DB, app.MODEL_ARTIFACT_DIR):
+        assert not os.path.abspath(path).startswith(os.getcwd() + os.sep), path
+
+if __name__ == "__main__":
+    print("=== Load Test Harness Test ===")
+    test_parse_mix()
+    test_parse_server_timing()
+    test_closed_loop_report()
+    test_read_replay_rows()
+    test_in_process_run_keeps_data_out_of_checkout()
+    print("\n✅ Load test harness works!")
@@ -0,0 +1,96 @@
+import os
+import tracemalloc
+from flask import Flask, Response, jsonify, stream_with_context
+from metrics import Metrics
+from memory_diagnostics import SnapshotStore, memory_status
+
+retained = []
+
+def make_app():
+    """Small Flask app with memory accounting, like app.py"""
+    app = Flask(__name__)
+    metrics = Metrics()
+    metrics.init_app(app)
+
+    @app.route("/allocate")
+    def allocate():
+        retained.append([str(i) * 10 for i in range(20000)])
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        # Allocates only while the body is generated, like a streamed upload or export
+        def generate():
+            for _ in range(3):
+                retained.append([str(i) * 10 for i in range(20000)])
+                yield "chunk\n"
+        return Response(stream_with_context(generate()), mimetype='text/plain')
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return metrics.response()
+
+    return app
+
+def test_requests_record_memory_alongside_latency():
+    """Each request observes peak-RSS growth, and heap peak while tracemalloc traces"""
+    client = make_app().test_client()
+    client.get('/allocate')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fraud_request_peak_rss_growth_bytes_count{endpoint="/allocate"} 1' in text
+    assert 'fraud_request_heap_peak_bytes_count' not in text
+
+    tracemalloc.start()
+    try:
+        client.get('/allocate')
+        text = client.get('/metrics').get_data(as_text=True)
+    finally:
+        tracemalloc.stop()
+        retained.clear()
+    heap = [line for line in text.splitlines() if line.startswith('fraud_request_heap_peak_bytes_sum{endpoint="/allocate"}')]
+    print(heap[0])
+    assert float(heap[0].rsplit(' ', 1)[1]) > 1000000
+
+def test_streamed_response_memory_is_measured():
+    """A streamed body's allocations count toward its request's heap peak"""
+    client = make_app().test_client()
+    tracemalloc.start()
+    try:
+        with client.get('/stream') as response:
+            assert response.get_data(as_text=True).count("chunk") == 3
+        text = client.get('/metrics').get_data(as_text=True)
+    finally:
+        tracemalloc.stop()
+        retained.clear()
+    assert 'fraud_request_peak_rss_growth_bytes_count{endpoint="/stream"} 1' in text
+    heap = [line for line in text.splitlines() if line.startswith('fraud_request_heap_peak_bytes_sum{endpoint="/stream"}')]
+    print(heap[0])
+    assert float(heap[0].rsplit(' ', 1)[1]) > 3000000
+
+def test_snapshot_diff_points_at_allocating_line():
+    """A diff between snapshots names the source line that allocated the growth"""
+    store = SnapshotStore(os.path.dirname(os.path.abspath(__file__)), app_file=os.path.basename(__file__))
+    client = make_app().test_client()
+    try:
+        base_id, base = store.take()
+        assert memory_status()["tracing"]
+        client.get('/allocate')
+        snapshot_id, snapshot = store.take()
+        assert store.latest_id() == snapshot_id and [s["id"] for s in store.ids()] == [base_id, snapshot_id]
+
+        top = store.diff(base, snapshot, scope='app', limit=5)
+        print(f"Top line: {top[0]}")
+        assert top[0]["file"] == os.path.basename(__file__)
+        assert "retained.append" in top[0]["code"] and top[0]["size_diff"] > 1000000
+        assert all(line["file"] == os.path.basename(__file__) for line in store.top(snapshot, 'app'))
+    finally:
+        store.stop()
+        retained.clear()
+    assert not tracemalloc.is_tracing() and store.ids() == []
+
+if __name__ == "__main__":
+    print("=== Memory Diagnostics Test ===")
+    test_requests_record_memory_alongside_latency()
+    test_streamed_response_memory_is_measured()
+    test_snapshot_diff_points_at_allocating_line()
+    print("\n✅ Memory accounting and snapshot diffs work!")
@@ -0,0 +1,47 @@
+import random
+from merchant_rules import (MerchantAnalyzer, KeywordAutomaton, MERCHANT_KEYWORDS,
+                            LEGITIMATE_MERCHANTS, SUSPICIOUS_PATTERNS)
+
+def random_names(n_names=5000, seed=0):
+    """Merchant-like strings built from keywords, whitelist entries and filler"""
+    fragments = ['netflix.com', 'Amazon.com', 'inc', 'corp', 'co', 'company', 'Store', 'mart',
+                 '.net', '.org', 'TEST', 'unknown', 'aaaa', 'x', '42', 'web', ' ', 'Joe', 'cafe', 'ß']
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n_names):
+        name = ''.join(rng.choice(fragments) for _ in range(rng.randint(0, 4)))
+        names.append(name.upper() if rng.random() < 0.3 else name)
+    return names
+
+def test_automaton_finds_every_keyword():
+    """One automaton pass must find exactly the keywords a substring scan finds"""
+    automaton = KeywordAutomaton(MERCHANT_KEYWORDS)
+    for name in random_names():
+        text = name.lower()
+        expected = {(keyword_class, keyword) for keyword_class, keywords in MERCHANT_KEYWORDS.items()
+                    for keyword in keywords if keyword in text}
+        assert automaton.find(text) == expected, name
+
+def test_merchant_features():
+    """Features reproduce the original per-call list checks"""
+    analyzer = MerchantAnalyzer()
+    for name in random_names(seed=1):
+        lower = name.lower().strip()
+        features = analyzer.analyze(name, 'International')
+        assert features.whitelisted == (lower in LEGITIMATE_MERCHANTS)
+        assert features.pattern_count == sum(1 for pattern in SUSPICIOUS_PATTERNS if pattern in lower)
+        assert features.unusual_format == ((name.islower() or name.isupper()) and
+                                           not any(d in lower for d in ('.com', '.org', '.net')))
+        assert features.foreign_location and not features.local_location
+
+    features = analyzer.analyze('Test Company 7', 'local store')
+    print(f"'Test Company 7': {features}")
+    assert features.suspicious_keywords == {'test'}
+    assert features.pattern_count == 2  # 'co' and 'company'
+    assert features.has_digits and features.local_location
+
+if __name__ == "__main__":
+    print("=== Merchant Rules Test ===")
+    test_automaton_finds_every_keyword()
+    test_merchant_features()
+    print("\n✅ Merchant rules match the original checks!")
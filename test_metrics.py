@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+import numpy as np
+from flask import Flask, Response, jsonify, stream_with_context
+from metrics import Metrics
+
+def make_app(directory=None):
+    """Small Flask app instrumented like app.py"""
+    app = Flask(__name__)
+    metrics = Metrics(directory=directory)
+    metrics.init_app(app)
+
+    @app.route("/score")
+    def score():
+        clock = metrics.stage_clock()
+        clock.lap('rules')
+        with metrics.stage('model'):
+            predictions = np.array([0, 1, 1, 0, 0])
+        metrics.count_verdicts(predictions == 1)
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            for _ in range(2):
+                with metrics.stage('model'):
+                    predictions = np.array([1, 0, 0])
+                metrics.count_verdicts(predictions == 1)
+                yield "chunk\n"
+        return Response(stream_with_context(generate()), mimetype='text/plain')
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return metrics.response()
+
+    return app, metrics
+
+def metric_lines(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+def test_stage_timings_and_counters():
+    """Requests record latency, stage histograms, Server-Timing and verdict counters"""
+    app, metrics = make_app()
+    client = app.test_client()
+    for _ in range(3):
+        response = client.get('/score')
+    print(f"Server-Timing: {response.headers['Server-Timing']}")
+    assert [t.split(';')[0] for t in response.headers['Server-Timing'].split(', ')] == ['rules', 'model', 'total']
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fraud_http_requests_total{endpoint="/score",method="GET",status="200"} 3' in text
+    assert 'fraud_rows_scored_total{endpoint="/score"} 15' in text
+    assert 'fraud_verdicts_total{endpoint="/score",verdict="fraud"} 6' in text
+    assert 'fraud_verdicts_total{endpoint="/score",verdict="legitimate"} 9' in text
+    assert 'fraud_stage_duration_seconds_count{endpoint="/score",stage="model"} 3' in text
+
+    # Buckets are cumulative and end with +Inf equal to the count
+    buckets = metric_lines(text, 'fraud_http_request_duration_seconds_bucket{endpoint="/score"')
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 3 and 'le="+Inf"' in buckets[-1]
+
+def test_streamed_response_recorded_when_closed():
+    """Stages and verdicts counted while a streamed body is generated are recorded once it closes"""
+    app, metrics = make_app()
+    client = app.test_client()
+    response = client.get('/stream')
+    print(f"Server-Timing: {response.headers['Server-Timing']}")
+    assert [t.split(';')[0] for t in response.headers['Server-Timing'].split(', ')] == ['headers']
+    assert response.get_data(as_text=True) == "chunk\nchunk\n"
+    assert not metrics.requests.values
+    response.close()
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fraud_http_requests_total{endpoint="/stream",method="GET",status="200"} 1' in text
+    assert 'fraud_rows_scored_total{endpoint="/stream"} 6' in text
+    assert 'fraud_verdicts_total{endpoint="/stream",verdict="fraud"} 2' in text
+    assert 'fraud_stage_duration_seconds_count{endpoint="/stream",stage="model"} 1' in text
+
+def test_no_recording_outside_requests():
+    """Stage timers and counters are no-ops outside a request (warm-up, benchmarks)"""
+    app, metrics = make_app()
+    metrics.stage_clock().lap('rules')
+    with metrics.stage('model'):
+        pass
+    metrics.count_verdicts([True])
+    assert all(not collector.values for collector in metrics.collectors)
+
+def test_metrics_aggregate_across_processes():
+    """With a shared METRICS_DIR, each worker's snapshot is included in the totals"""
+    directory = tempfile.mkdtemp()
+    try:
+        worker_a, metrics_a = make_app(directory)
+        worker_b, metrics_b = make_app(directory)
+        worker_a.test_client().get('/score')
+        worker_a.test_client().get('/score')
+        worker_b.test_client().get('/score')
+        metrics_a.flush()
+
+        text = worker_b.test_client().get('/metrics').get_data(as_text=True)
+        print("\n".join(metric_lines(text, 'fraud_rows_scored_total')))
+        assert 'fraud_rows_scored_total{endpoint="/score"} 15' in text
+        assert 'fraud_http_request_duration_seconds_count{endpoint="/score",method="GET"} 3' in text
+        metrics_b.flush()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    print("=== Metrics Test ===")
+    test_stage_timings_and_counters()
+    test_streamed_response_recorded_when_closed()
+    test_no_recording_outside_requests()
+    test_metrics_aggregate_across_processes()
+    print("\n✅ Metrics are recorded and aggregated!")
@@ -0,0 +1,63 @@
+import os
+import shutil
+import stat
+import tempfile
+import joblib
+import numpy as np
+from forest_engine import CompiledForest, NATIVE_MIN_ROWS
+from model_artifacts import load_forest
+
+def raw_features(n_rows, seed=0):
+    """Unscaled, realistic-looking feature rows [Time, V1-V28, Amount]"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 172800, n_rows),
+        rng.normal(0, 4, (n_rows, 28)),
+        rng.exponential(200, n_rows)
+    ])
+
+def test_artifact_matches_sklearn_build():
+    """A memory-mapped artifact must score exactly like a forest compiled from the pickles"""
+    root = tempfile.mkdtemp()
+    try:
+        reference = CompiledForest.from_sklearn(joblib.load('fraud_model.pkl'), scaler=joblib.load('scaler.pkl'))
+
+        forest, info = load_forest(root=root)
+        print(f"Built {info['artifact']} in {info['load_ms']} ms")
+        assert info['built_at_startup']
+        assert isinstance(forest.threshold, np.ndarray)
+
+        features = raw_features(NATIVE_MIN_ROWS * 4)
+        features[::9, 5] = np.nan
+        for n_rows in (1, 100, len(features)):
+            assert np.array_equal(reference.predict_proba(features[:n_rows]), forest.predict_proba(features[:n_rows]))
+
+        # Large batches rebuilt sklearn's trees from the stored node arrays
+        assert forest.native_trees is not None
+    finally:
+        shutil.rmtree(root)
+
+def test_artifact_reused_on_restart():
+    """A second load maps the existing artifact instead of rebuilding it"""
+    root = tempfile.mkdtemp()
+    try:
+        first, first_info = load_forest(root=root)
+        second, second_info = load_forest(root=root)
+        print(f"First load {first_info['load_ms']} ms, second load {second_info['load_ms']} ms")
+
+        assert not second_info['built_at_startup']
+        # Readable by other users, like the pickles it was built from
+        assert stat.S_IMODE(os.stat(os.path.join(root, first_info['artifact'])).st_mode) == 0o755
+        assert second_info['artifact'] == first_info['artifact']
+        assert os.listdir(root) == [first_info['artifact']]
+
+        features = raw_features(50, seed=1)
+        assert np.array_equal(first.predict_proba(features), second.predict_proba(features))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    print("=== Model Artifact Test ===")
+    test_artifact_matches_sklearn_build()
+    test_artifact_reused_on_restart()
+    print("\n✅ Model artifacts match the pickled model!")
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token
+from profiling import RequestProfiler
+
+def make_app(directory, **options):
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-for-request-profiling'
+    JWTManager(app)
+    if options:
+        RequestProfiler(directory=directory, **options).init_app(app)
+
+    @app.route("/work")
+    def work():
+        return jsonify({"total": sum(i * i for i in range(10000))})
+
+    return app
+
+def test_authorized_header_profiles_request():
+    """X-Profile with the token or an admin JWT writes a profile; other callers are ignored"""
+    directory = tempfile.mkdtemp()
+    try:
+        app = make_app(directory, token='s3cret', admin_emails=['Admin@example.com'])
+        with app.app_context():
+            admin = create_access_token(identity='admin@example.com')
+            user = create_access_token(identity='user@example.com')
+        client = app.test_client()
+
+        ignored = [
+            client.get('/work', headers={'X-Profile': 'wrong'}),
+            client.get('/work', headers={'X-Profile': '1', 'Authorization': f'Bearer {user}'}),
+            client.get('/work'),
+        ]
+        assert all('X-Profile-Id' not in response.headers for response in ignored)
+        assert os.listdir(directory) == []
+
+        by_token = client.get('/work', headers={'X-Profile': 's3cret'})
+        by_admin = client.get('/work', headers={'X-Profile': '1', 'Authorization': f'Bearer {admin}'})
+        for response in (by_token, by_admin):
+            profile_id = response.headers['X-Profile-Id']
+            print(f"Profile: {profile_id}")
+            assert os.path.exists(os.path.join(directory, profile_id + '.prof'))
+            with open(os.path.join(directory, profile_id + '.txt')) as f:
+                summary = f.read()
+            assert summary.startswith('GET /work -> 200') and 'profiled because: header' in summary
+            assert 'work' in summary
+    finally:
+        shutil.rmtree(directory)
+
+def test_sampling_profiles_one_in_n():
+    directory = tempfile.mkdtemp()
+    try:
+        client = make_app(directory, sample_rate=3).test_client()
+        profiled = [bool(client.get('/work').headers.get('X-Profile-Id')) for _ in range(9)]
+        assert profiled == [True, False, False] * 3
+        assert len(os.listdir(directory)) == 6
+    finally:
+        shutil.rmtree(directory)
+
+def test_disabled_installs_no_hooks():
+    """Without a profiler the app has no extra request hooks at all"""
+    app = make_app(None)
+    assert not any(app.before_request_funcs.values())
+    assert not any(app.after_request_funcs.values())
+
+if __name__ == "__main__":
+    print("=== Request Profiling Test ===")
+    test_authorized_header_profiles_request()
+    test_sampling_profiles_one_in_n()
+    test_disabled_installs_no_hooks()
+    print("\n✅ Request profiling works!")
@@ -0,0 +1,72 @@
+import os
+import stat
+import tempfile
+import threading
+from user_store import JsonUserStore, SqliteUserStore, UserExistsError, open_user_store
+
+def register_concurrently(make_store, n_threads=8):
+    """Each thread uses its own store instance, like separate workers sharing the files"""
+    errors = []
+
+    def register(i):
+        store = make_store()
+        try:
+            store.create(f"user{i}@example.com", {"email": f"user{i}@example.com", "name": str(i)})
+            store.create("same@example.com", {"email": "same@example.com", "name": str(i)})
+        except UserExistsError:
+            errors.append(i)
+
+    threads = [threading.Thread(target=register, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def test_json_store_concurrent_registration():
+    """Concurrent registrations through separate JSON stores are all kept"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        errors = register_concurrently(lambda: JsonUserStore(path))
+        store = JsonUserStore(path)
+        print(f"JSON store: {len(store.all_users())} users, {len(errors)} duplicate registrations rejected")
+        assert len(errors) == 7
+        assert all(store.get(f"user{i}@example.com") for i in range(8))
+
+def test_json_store_sees_other_writers():
+    """A cached store picks up users written by another store (another worker)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        first, second = JsonUserStore(path), JsonUserStore(path)
+        assert first.get("a@example.com") is None
+        second.create("a@example.com", {"email": "a@example.com"})
+        assert first.get("a@example.com") == {"email": "a@example.com"}
+
+def test_json_store_keeps_file_mode():
+    """Rewriting users.json keeps its permissions (new files get 0644)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        store = JsonUserStore(path)
+        store.create("a@example.com", {"email": "a@example.com"})
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+        os.chmod(path, 0o640)
+        store.create("b@example.com", {"email": "b@example.com"})
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+def test_sqlite_store():
+    """SQLite backend: concurrent registration and import from users.json"""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, db_path = os.path.join(tmp, 'users.json'), os.path.join(tmp, 'users.db')
+        JsonUserStore(json_path).create("old@example.com", {"email": "old@example.com"})
+
+        store = open_user_store('sqlite', json_path, db_path)
+        assert store.get("old@example.com") == {"email": "old@example.com"}
+        assert len(register_concurrently(lambda: SqliteUserStore(db_path))) == 7
+
+if __name__ == "__main__":
+    print("=== User Store Test ===")
+    test_json_store_concurrent_registration()
+    test_json_store_sees_other_writers()
+    test_json_store_keeps_file_mode()
+    test_sqlite_store()
+    print("\n✅ User stores work!")
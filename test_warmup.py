@@ -0,0 +1,84 @@
+import numpy as np
+from forest_engine import NATIVE_MIN_ROWS
+from model_artifacts import load_forest
+from scoring import FraudScorer
+from warmup import ModelWarmup, synthetic_features
+
+def test_warmup_reports_ready_after_steps():
+    """Background warm-up scores the model and only then reports ready, with step timings"""
+    forest, info = load_forest()
+    scorer = FraudScorer(forest)
+    warmup = ModelWarmup([
+        ("single", lambda: scorer.score_features(synthetic_features(1))),
+        ("batch", lambda: scorer.score_features(synthetic_features(NATIVE_MIN_ROWS)))
+    ])
+    assert not warmup.ready
+
+    warmup.start('background')
+    assert warmup.wait(60)
+    status = warmup.status()
+    print(f"Warm-up: {status['timings_ms']}")
+
+    assert warmup.ready and status['state'] == 'done'
+    assert set(status['timings_ms']) == {'single', 'batch', 'total'}
+    # The batch step rebuilt the native trees used by large batches
+    assert forest.native_trees is not None
+
+def test_failed_warmup_is_not_ready():
+    """A failing step stops the warm-up and leaves the worker not ready"""
+    calls = []
+
+    def fail():
+        raise RuntimeError("model unavailable")
+
+    warmup = ModelWarmup([("fail", fail), ("after", lambda: calls.append(1))])
+    warmup.start('sync')
+    status = warmup.status()
+
+    assert not warmup.ready and status['state'] == 'failed'
+    assert status['error'] == "model unavailable"
+    assert calls == []
+
+def test_warmup_modes():
+    """'off' is ready at once; unknown modes are rejected"""
+    warmup = ModelWarmup([])
+    warmup.start('off')
+    assert warmup.ready and warmup.status()['state'] == 'skipped'
+
+    try:
+        ModelWarmup([]).start('later')
+    except ValueError as e:
+        print(f"Rejected as expected: {e}")
+    else:
+        raise AssertionError("Expected ValueError")
+
+def test_synthetic_features_are_scorable():
+    features = synthetic_features(100)
+    assert features.shape == (100, 30)
+    assert np.isfinite(features).all()
+
+def test_app_warmup_leaves_no_trace():
+    """The app's warm-up leaves the V-value cache and its stats alone and does not rebuild native trees by default"""
+    from test_csv_upload import import_app
+    app = import_app()
+    native_before = app.forest.native_trees
+    # A live request's entry, cached before a background warm-up runs
+    app.generate_v_values_from_transaction(42.0, "Corner Shop", "Boston, MA", "4111111111111111", "2024-06-15T10:00:00")
+    before = app.v_value_cache_stats()
+    warmup = ModelWarmup(app.warmup_steps)
+    warmup.run()
+    assert warmup.state == 'done'
+    assert app.v_value_cache_stats() == before
+    app.generate_v_values_from_transaction(42.0, "Corner Shop", "Boston, MA", "4111111111111111", "2024-06-15T10:00:00")
+    assert app.v_value_cache_stats()['hits'] == before['hits'] + 1
+    if not app.MODEL_WARMUP_NATIVE and native_before is None:
+        assert app.forest.native_trees is None
+
+if __name__ == "__main__":
+    print("=== Model Warm-up Test ===")
+    test_warmup_reports_ready_after_steps()
+    test_failed_warmup_is_not_ready()
+    test_warmup_modes()
+    test_synthetic_features_are_scorable()
+    test_app_warmup_leaves_no_trace()
+    print("\n✅ Model warm-up works!")
@@ -0,0 +1,273 @@
+"""
+Training pipeline for the fraud model.
+
+Reproduces the training cells of credit-card-dataset.ipynb as a repeatable
+command:
+
+1. load creditcard.csv with explicit dtypes (float32 features, int8 labels),
+   about half the memory of pandas' float64 default
+2. downsample the legitimate transactions to the number of frauds with
+   sklearn's resample (random_state 42), combine and shuffle
+3. fit the StandardScaler on the balanced features and hold out 20% for testing
+4. cross-validate the notebook's RandomForestClassifier, or with --search run a
+   grid search over forest hyperparameters, on the training part
+5. fit the final forest on the training part and score it on the held-out part
+
+Cross-validation and the search run in parallel on every core (each fit of a
+candidate on a fold is one job). The stratified folds are computed once and
+reused for every candidate, so all candidates are compared on the same splits.
+The final forest builds its trees in parallel too.
+
+Each run writes a new version directory under models/ holding fraud_model.pkl,
+scaler.pkl and metadata.json (data hash, parameters, CV and test scores,
+library versions). --install also copies the pickles to where the API loads
+them; its model artifact is rebuilt on the next start (see model_artifacts).
+
+    python train.py creditcard.csv                   # notebook parameters
+    python train.py creditcard.csv --search --install
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+import joblib
+import numpy as np
+from model_artifacts import MODEL_FILE, SCALER_FILE, file_sha256
+
+MODELS_ROOT = 'models'
+
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+LABEL_COLUMN = 'Class'
+
+RANDOM_STATE = 42
+
+# The notebook's forest
+DEFAULT_PARAMS = {"n_estimators": 100}
+
+# Hyperparameters tried by --search
+SEARCH_GRID = {
+    "n_estimators": [100, 300],
+    "max_depth": [None, 12],
+    "min_samples_leaf": [1, 3],
+    "max_features": ["sqrt", 0.3]
+}
+
+# Scores reported for cross-validation; the first one picks the search winner
+CV_SCORING = ('average_precision', 'roc_auc', 'f1', 'precision', 'recall', 'accuracy')
+
+
+def load_dataset(path):
+    """creditcard.csv as (float32 feature frame, int8 label series)"""
+    import pandas as pd
+    dtypes = {col: np.float32 for col in FEATURE_COLUMNS}
+    dtypes[LABEL_COLUMN] = np.int8
+    frame = pd.read_csv(path, usecols=FEATURE_COLUMNS + [LABEL_COLUMN], dtype=dtypes)
+    return frame[FEATURE_COLUMNS], frame[LABEL_COLUMN]
+
+
+def downsample(features, labels, random_state=RANDOM_STATE):
+    """Balance the classes like the notebook: as many legitimate rows as frauds, shuffled"""
+    import pandas as pd
+    from sklearn.utils import resample
+
+    frame = features.assign(**{LABEL_COLUMN: labels})
+    legit = frame[frame[LABEL_COLUMN] == 0]
+    fraud = frame[frame[LABEL_COLUMN] == 1]
+    legit_downsampled = resample(legit, replace=False, n_samples=len(fraud), random_state=random_state)
+    balanced = pd.concat([legit_downsampled, fraud]).sample(frac=1, random_state=random_state)
+    return balanced[FEATURE_COLUMNS], balanced[LABEL_COLUMN]
+
+
+def make_folds(labels, n_splits=5, random_state=RANDOM_STATE):
+    """Stratified (train, test) index pairs, shared by every candidate"""
+    from sklearn.model_selection import StratifiedKFold
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return list(splitter.split(np.zeros(len(labels)), labels))
+
+
+def _cv_summary(scores):
+    """{score name: per-fold scores} -> {score name: {mean, std}}"""
+    return {name: {"mean": round(float(np.mean(values)), 6), "std": round(float(np.std(values)), 6)}
+            for name, values in scores.items()}
+
+
+def cross_validate_forest(features, labels, params, folds, n_jobs=-1, random_state=RANDOM_STATE):
+    """CV scores of one forest configuration, folds fitted in parallel"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import cross_validate
+    forest = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    results = cross_validate(forest, features, labels, cv=folds, scoring=CV_SCORING, n_jobs=n_jobs)
+    return _cv_summary({name: results[f'test_{name}'] for name in CV_SCORING})
+
+
+def search_forest(features, labels, grid, folds, n_jobs=-1, random_state=RANDOM_STATE):
+    """Grid search (every candidate x fold fit in parallel); returns (best params, per-candidate scores)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import GridSearchCV
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=random_state, n_jobs=1),
+        grid, scoring=CV_SCORING, refit=False, cv=folds, n_jobs=n_jobs
+    )
+    search.fit(features, labels)
+    results = search.cv_results_
+    candidates = [{"params": params,
+                   "scores": _cv_summary({name: [results[f'split{k}_test_{name}'][index] for k in range(len(folds))]
+                                          for name in CV_SCORING})}
+                  for index, params in enumerate(results['params'])]
+    candidates.sort(key=lambda candidate: candidate["scores"][CV_SCORING[0]]["mean"], reverse=True)
+    return candidates[0]["params"], candidates
+
+
+def held_out_scores(labels, predicted, fraud_probability):
+    """Held-out scores of the final model"""
+    from sklearn.metrics import (accuracy_score, average_precision_score, confusion_matrix, f1_score,
+                                 precision_score, recall_score, roc_auc_score)
+    (tn, fp), (fn, tp) = confusion_matrix(labels, predicted, labels=[0, 1]).tolist()
+    return {
+        "accuracy": round(float(accuracy_score(labels, predicted)), 6),
+        "precision": round(float(precision_score(labels, predicted, zero_division=0)), 6),
+        "recall": round(float(recall_score(labels, predicted, zero_division=0)), 6),
+        "f1_score": round(float(f1_score(labels, predicted, zero_division=0)), 6),
+        "roc_auc": round(float(roc_auc_score(labels, fraud_probability)), 6),
+        "average_precision": round(float(average_precision_score(labels, fraud_probability)), 6),
+        "confusion_matrix": {"true_negatives": tn, "false_positives": fp,
+                             "false_negatives": fn, "true_positives": tp}
+    }
+
+
+def library_versions():
+    import pandas
+    import sklearn
+    return {"scikit-learn": sklearn.__version__, "numpy": np.__version__,
+            "pandas": pandas.__version__, "joblib": joblib.__version__}
+
+
+def train(data_path, root=MODELS_ROOT, search=False, params=None, grid=None, n_splits=5,
+          test_size=0.2, n_jobs=-1, random_state=RANDOM_STATE):
+    """Run the pipeline and write a new model version; returns (version directory, metadata)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    timings = {}
+    started = last = time.perf_counter()
+
+    def lap(name):
+        nonlocal last
+        now = time.perf_counter()
+        timings[name] = round(now - last, 3)
+        last = now
+
+    features, labels = load_dataset(data_path)
+    class_counts = {str(label): int(count) for label, count in labels.value_counts().sort_index().items()}
+    lap('load')
+
+    features, labels = downsample(features, labels, random_state)
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(features).astype(np.float32)
+    X_train, X_test, y_train, y_test = train_test_split(
+        scaled, labels.to_numpy(), test_size=test_size, random_state=random_state)
+    folds = make_folds(y_train, n_splits, random_state)
+    lap('prepare')
+
+    params = dict(DEFAULT_PARAMS if params is None else params)
+    candidates = None
+    if search:
+        params, candidates = search_forest(X_train, y_train, grid or SEARCH_GRID, folds, n_jobs, random_state)
+        cv_scores = candidates[0]["scores"]
+    else:
+        cv_scores = cross_validate_forest(X_train, y_train, params, folds, n_jobs, random_state)
+    lap('search' if search else 'cross_validation')
+
+    model = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs, **params)
+    model.fit(X_train, y_train)
+    # Pickle a forest that predicts in one thread, like the notebook's
+    model.set_params(n_jobs=None)
+    fraud_probability = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+    scores = held_out_scores(y_test, model.predict(X_test), fraud_probability)
+    lap('fit')
+
+    # Write into a temporary directory, then rename it to its version
+    os.makedirs(root, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix='.model-', dir=root)
+    try:
+        joblib.dump(model, os.path.join(temp_dir, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(temp_dir, SCALER_FILE))
+        model_sha256 = file_sha256(os.path.join(temp_dir, MODEL_FILE))
+        timings['total'] = round(time.perf_counter() - started, 3)
+        version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{model_sha256[:8]}"
+        metadata = {
+            "version": version,
+            "created_at": datetime.now().isoformat(),
+            "model_sha256": model_sha256,
+            "scaler_sha256": file_sha256(os.path.join(temp_dir, SCALER_FILE)),
+            "dataset": {
+                "file": os.path.basename(data_path),
+                "sha256": file_sha256(data_path),
+                "rows": sum(class_counts.values()),
+                "class_counts": class_counts,
+                "balanced_rows": len(labels),
+                "train_rows": len(y_train),
+                "test_rows": len(y_test)
+            },
+            "random_state": random_state,
+            "params": params,
+            "cv": {"folds": n_splits, "scores": cv_scores},
+            "search": candidates,
+            "test": scores,
+            "feature_importances": {name: round(float(value), 6)
+                                    for name, value in zip(FEATURE_COLUMNS, model.feature_importances_)},
+            "libraries": library_versions(),
+            "timings_seconds": timings
+        }
+        with open(os.path.join(temp_dir, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        directory = os.path.join(root, version)
+        # mkdtemp creates 0700; the API may run as another user
+        os.chmod(temp_dir, 0o755)
+        os.rename(temp_dir, directory)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return directory, metadata
+
+
+def install(directory, model_path=MODEL_FILE, scaler_path=SCALER_FILE):
+    """Copy a version's pickles to the paths the API loads"""
+    for source, target in ((MODEL_FILE, model_path), (SCALER_FILE, scaler_path)):
+        temp_path = target + '.tmp'
+        shutil.copyfile(os.path.join(directory, source), temp_path)
+        os.replace(temp_path, target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the fraud model from a creditcard.csv-format file")
+    parser.add_argument('data', help="CSV with Time, V1-V28, Amount and Class columns")
+    parser.add_argument('--output-dir', default=MODELS_ROOT, help="Where model versions are written")
+    parser.add_argument('--search', action='store_true', help="Grid-search forest hyperparameters")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel jobs (-1: all cores)")
+    parser.add_argument('--seed', type=int, default=RANDOM_STATE)
+    parser.add_argument('--install', action='store_true',
+                        help=f"Copy the new model to {MODEL_FILE} and {SCALER_FILE}")
+    args = parser.parse_args(argv)
+
+    directory, metadata = train(args.data, root=args.output_dir, search=args.search, n_splits=args.folds,
+                                test_size=args.test_size, n_jobs=args.jobs, random_state=args.seed)
+    print(f"Model {metadata['version']} written to {directory} in {metadata['timings_seconds']['total']} s")
+    print(f"  params               {metadata['params']}")
+    for name, score in metadata['cv']['scores'].items():
+        print(f"  cv {name:17s} {score['mean']:.4f} ± {score['std']:.4f}")
+    for name in ('accuracy', 'precision', 'recall', 'f1_score', 'roc_auc'):
+        print(f"  test {name:15s} {metadata['test'][name]:.4f}")
+    if args.install:
+        install(directory)
+        print(f"Installed as {MODEL_FILE} and {SCALER_FILE}; evaluate it with: python evaluation.py {args.data}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+User account storage.
+
+login, register and profile used to parse the whole users.json on every
+request, and register rewrote it without any locking, so two registrations on
+different workers could overwrite each other. Both stores here give keyed
+lookups without per-request parsing and safe concurrent registration:
+
+- JsonUserStore keeps users.json as the source of truth with an in-process
+  cache that is reloaded only when the file's mtime/size change, and writes
+  through a temporary file renamed into place under an inter-process lock.
+- SqliteUserStore keeps users in an SQLite table keyed by email.
+"""
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+# Cache hits re-check the file at most this often (seconds); misses always re-check,
+# so a user registered on another worker can log in immediately
+REVALIDATE_INTERVAL = 1.0
+
+BUSY_TIMEOUT_MS = 5000
+
+
+class UserExistsError(Exception):
+    """Raised by create() when the email is already registered"""
+
+
+class JsonUserStore:
+    """users.json ({email: user}) with an mtime-validated cache"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._users = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _revalidate(self):
+        """Reload the cache if the file changed since it was read (call with self._lock held)"""
+        self._checked_at = time.monotonic()
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        if signature is None:
+            users = {}
+        else:
+            with open(self.path, 'r') as f:
+                users = json.load(f)
+        self._users = users
+        self._signature = signature
+
+    def get(self, email):
+        """The user dict for email, or None"""
+        with self._lock:
+            user = self._users.get(email)
+            if user is None or time.monotonic() - self._checked_at > REVALIDATE_INTERVAL:
+                self._revalidate()
+                user = self._users.get(email)
+            return user
+
+    def create(self, email, user):
+        """Add a user; raises UserExistsError if the email is taken"""
+        with self._lock, self._file_lock():
+            # Another worker may have written since our last read
+            self._revalidate()
+            if email in self._users:
+                raise UserExistsError(email)
+
+            users = dict(self._users)
+            users[email] = user
+            self._write(users)
+            self._users = users
+            self._signature = self._file_signature()
+
+    def _write(self, users):
+        """Write to a temporary file in the same directory and rename it over users.json"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.users-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(users, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file as 0600; keep users.json's own mode
+            try:
+                mode = stat.S_IMODE(os.stat(self.path).st_mode)
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path)
+
+    def all_users(self):
+        """Every user ({email: user}), e.g. for migration"""
+        with self._lock:
+            self._revalidate()
+            return dict(self._users)
+
+
+class _FileLock:
+    """Exclusive flock on a side file, held across the read-check-write of create()"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+class SqliteUserStore:
+    """Users in an SQLite table keyed by email"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS users (email TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.connection = connection
+        return connection
+
+    def get(self, email):
+        """The user dict for email, or None"""
+        row = self._connection().execute("SELECT data FROM users WHERE email = ?", (email,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, email, user):
+        """Add a user; raises UserExistsError if the email is taken"""
+        try:
+            self._connection().execute(
+                "INSERT INTO users (email, data) VALUES (?, ?)", (email, json.dumps(user)))
+        except sqlite3.IntegrityError:
+            raise UserExistsError(email)
+
+    def import_users(self, users):
+        """Copy {email: user} into the table, keeping existing rows; returns the number added"""
+        connection = self._connection()
+        before = connection.total_changes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR IGNORE INTO users (email, data) VALUES (?, ?)",
+                [(email, json.dumps(user)) for email, user in users.items()])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return connection.total_changes - before
+
+
+def open_user_store(backend, json_path, db_path):
+    """
+    Create the configured store. The SQLite backend imports any users from the
+    JSON file that it does not have yet, so switching backends keeps accounts.
+    """
+    if backend == 'json':
+        return JsonUserStore(json_path)
+    if backend == 'sqlite':
+        store = SqliteUserStore(db_path)
+        if os.path.exists(json_path):
+            store.import_users(JsonUserStore(json_path).all_users())
+        return store
+    raise ValueError(f"Unknown user store backend: {backend!r} (expected 'json' or 'sqlite')")